@@ -0,0 +1,337 @@
+'''
+A* point to point shortest paths with ALT (A*, Landmarks, Triangle
+inequality) lower bounds.
+
+Dijkstra from s to t settles every node closer to s than t is: a whole "ball"
+around s. A* settles nodes in order of  dist(s, x) + h(x)  where h(x) is a
+LOWER BOUND on dist(x, t), so it heads towards t and settles far fewer nodes.
+(h = 0 everywhere is just Dijkstra.)
+
+ALT gets h from a few precomputed LANDMARKS L. With d(L, x) and d(x, L)
+known for every x (one Dijkstra on G and one on reverse(G) per landmark), the
+triangle inequality gives 2 lower bounds for every landmark:
+    d(x, t) >= d(L, t) - d(L, x)        (L -> x -> t is at least L -> t)
+    d(x, t) >= d(x, L) - d(t, L)        (x -> t -> L is at least x -> L)
+h(x) = the biggest of those over all landmarks.
+
+Good landmarks are "behind" t as seen from s, so they are picked far apart:
+    * 'farthest': next landmark is the node farthest from those picked.
+    * 'avoid':    grow a shortest path tree from a random root, weight every
+                  node by how badly the current landmarks bound its distance
+                  from the root, skip subtrees that already have a landmark,
+                  and walk down to the leaf of the heaviest subtree.
+                  (Goldberg & Harrelson.)
+
+The landmark table is 2 * k * |V| numbers in flat arrays, float64 or, for
+integer weights only, float32: a distance rounded UP could make h too big
+and A* wrong, so 'f' is refused for anything float32 can't hold exactly.
+save() writes the table to a file and LandmarkIndex.load() maps the file
+into memory (mmap), so several query processes can share one copy and start
+instantly.
+
+Every query reports how many nodes it settled, compare with landmarks=False
+(plain Dijkstra) to pick k.
+'''
+
+import heapq
+import mmap
+import struct
+import time
+from array import array
+from random import Random
+
+from graphs import *
+from csr import to_weighted_csr, reverse_csr
+from dijkstra import dijkstra_csr, check_weights, is_integral
+
+inf = float('inf')
+
+_HEADER = struct.Struct('<8sqq')    #magic + typecode, k, n.
+_FLOAT32_EXACT = 2 ** 24            #float32 holds every integer below this.
+
+
+class LandmarkIndex(object):
+
+    def __init__(self, G, k=8, selection='avoid', seed=None, typecode='d',
+                 _table=None):
+        '''
+        @type G: list of dicts, dict of dicts, or weighted adj matrix
+        @param G: weighted graph, no negative weights.
+
+        @type k: int
+        @param k: number of landmarks.
+
+        @type selection: string
+        @param selection: 'avoid' or 'farthest'.
+
+        @type typecode: string
+        @param typecode: 'd' (float64) or 'f' (float32, half the memory).
+                         'f' needs integer weights and distances below
+                         2**24, where float32 is exact: a distance rounded
+                         UP would make h overestimate, and A* could return a
+                         longer path. ValueError otherwise.
+        '''
+        start = time.time()
+        self.nodes, self.index, self.offsets, self.targets, self.weights = to_weighted_csr(G)
+        check_weights(self.weights)
+        if typecode == 'f' and not is_integral(self.weights):
+            raise ValueError("typecode 'f' needs integer edge weights, use 'd'")
+        self.rev = reverse_csr(self.offsets, self.targets, self.weights)
+        self.n = len(self.nodes)
+
+        if _table is not None:      #loaded from a file, see load().
+            self.landmarks, self.fwd, self.bwd = _table
+            self.k = len(self.landmarks)
+        else:
+            self.k = k
+            self.landmarks = array('q')
+            self.fwd = array(typecode)  #fwd[i*n + x] = d(landmark i, x)
+            self.bwd = array(typecode)  #bwd[i*n + x] = d(x, landmark i)
+            rng = Random(seed)
+            for i in range(k):
+                if selection == 'farthest':
+                    L = self._pick_farthest(rng)
+                else:
+                    L = self._pick_avoid(rng)
+                self._add_landmark(L)
+        self.build_time = time.time() - start
+
+    def _add_landmark(self, L):
+        fwd = dijkstra_csr(self.offsets, self.targets, self.weights, L)[0].tolist()
+        bwd = dijkstra_csr(*self.rev, L)[0].tolist()
+        if self.fwd.typecode == 'f' and max((d for d in fwd + bwd if d < inf),
+                                            default=0) >= _FLOAT32_EXACT:
+            raise ValueError("distances too big for typecode 'f' to be exact, use 'd'")
+        self.landmarks.append(L)
+        #fromlist() b/c the table may be float32 and dijkstra gives float64.
+        self.fwd.fromlist(fwd)
+        self.bwd.fromlist(bwd)
+
+    def _pick_farthest(self, rng):
+        if not self.landmarks:
+            s = rng.randrange(self.n)
+            dist = dijkstra_csr(self.offsets, self.targets, self.weights, s)[0]
+            closest = list(dist)
+        else:                   #distance to the closest landmark picked so far.
+            n = self.n
+            closest = [min(self.fwd[i*n + x] for i in range(len(self.landmarks)))
+                       for x in range(n)]
+        reachable = [x for x in range(self.n) if closest[x] < inf]
+        return max(reachable, key=closest.__getitem__)
+
+    def _pick_avoid(self, rng):
+        if not self.landmarks:
+            return self._pick_farthest(rng)
+        n = self.n
+        r = rng.randrange(n)
+        dist, edge_to = dijkstra_csr(self.offsets, self.targets, self.weights, r)
+
+        #how far off the landmark bound for d(r, x) is.
+        weight = [0.0] * n
+        for x in range(n):
+            if dist[x] < inf:
+                weight[x] = dist[x] - self._bound(r, x)
+
+        #subtree sizes, children before parents (decreasing distance).
+        order = sorted((x for x in range(n) if dist[x] < inf), key=dist.__getitem__, reverse=True)
+        size = weight[:]
+        has_landmark = bytearray(n)
+        for L in self.landmarks:    has_landmark[L] = 1
+        best_child = [-1] * n
+        for x in order:
+            if has_landmark[x]:     size[x] = 0
+            p = edge_to[x]
+            if p < 0:   continue
+            if has_landmark[x]:     has_landmark[p] = 1
+            size[p] += size[x]
+            if best_child[p] < 0 or size[x] > size[best_child[p]]:
+                best_child[p] = x
+        for x in order:             #landmark below means no point going there.
+            if has_landmark[x]:     size[x] = 0
+
+        x = r                       #walk down the heaviest subtrees.
+        while best_child[x] >= 0 and size[best_child[x]] > 0:
+            x = best_child[x]
+        if x == r or x in self.landmarks:
+            return self._pick_farthest(rng)
+        return x
+
+    def _bound(self, x, t):
+        '''ALT lower bound on d(x, t).'''
+        n, fwd, bwd = self.n, self.fwd, self.bwd
+        h = 0.0
+        for i in range(len(self.landmarks)):
+            a, b = fwd[i*n + t], fwd[i*n + x]       #d(L, t), d(L, x)
+            if a < inf and b < inf:
+                if a - b > h:   h = a - b
+            elif a == inf and b < inf:
+                return inf          #L reaches x but not t, so x can't reach t.
+            a, b = bwd[i*n + x], bwd[i*n + t]       #d(x, L), d(t, L)
+            if a < inf and b < inf:
+                if a - b > h:   h = a - b
+            elif a == inf and b < inf:
+                return inf          #t reaches L but x doesn't, so x can't reach t.
+        return h
+
+    def query(self, s, t, landmarks=True):
+        '''
+        A* from s to t.
+
+        @type landmarks: bool
+        @param landmarks: False turns h off, i.e. plain Dijkstra with early
+                          exit, for comparing settled counts.
+
+        @rtype: tuple
+        @return: (distance, path, settled) where path is a tuple of node names
+                 like find_path() returns (None if t is unreachable) and
+                 settled is the number of nodes taken off the heap.
+        '''
+        s, t = self.index[s], self.index[t]
+        offsets, targets, weights = self.offsets, self.targets, self.weights
+        bound = self._bound if landmarks else (lambda x, t: 0.0)
+
+        dist = {s: 0.0}
+        edge_to = {s: -1}
+        done = set()
+        heap = [(bound(s, t), s)]
+        while heap:
+            f, x = heapq.heappop(heap)
+            if x in done:   continue        #stale entry.
+            done.add(x)
+            if x == t:  break
+            d = dist[x]
+            for k in range(offsets[x], offsets[x+1]):
+                y = targets[k]
+                nd = d + weights[k]
+                if nd < dist.get(y, inf):
+                    h = bound(y, t)
+                    if h == inf:    continue        #y can't reach t.
+                    dist[y] = nd
+                    edge_to[y] = x
+                    heapq.heappush(heap, (nd + h, y))
+
+        if t not in done:
+            return inf, None, len(done)
+        path = [t]
+        while edge_to[path[-1]] >= 0:
+            path.append(edge_to[path[-1]])
+        path.reverse()
+        return dist[t], tuple(self.nodes[x] for x in path), len(done)
+
+    def table_bytes(self):
+        return sum(len(arr) * arr.itemsize for arr in (self.landmarks, self.fwd, self.bwd))
+
+    def save(self, path):
+        '''write the landmark table: header, landmark ids, fwd, bwd.'''
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(b'ALT' + self.fwd.typecode.encode(), self.k, self.n))
+            self.landmarks.tofile(f)
+            self.fwd.tofile(f)
+            self.bwd.tofile(f)
+
+    @classmethod
+    def load(cls, G, path):
+        '''
+        LandmarkIndex for G whose table is memory-mapped from path (written by
+        save() for the same graph). Nothing is read until a query touches it.
+
+        Raises ValueError if path isn't a landmark table, or is one for a
+        graph with a different number of nodes (a stale file).
+        '''
+        with open(path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            if len(mm) < _HEADER.size:
+                raise ValueError("%s is not a landmark table (too short)" % path)
+            magic, k, n = _HEADER.unpack_from(mm, 0)
+            typecode = chr(magic[3])
+            if magic[:3] != b'ALT' or typecode not in 'df' or magic[4:].strip(b'\0'):
+                raise ValueError("%s is not a landmark table (bad magic %r)" % (path, magic))
+            if n != len(G):
+                raise ValueError("%s is for a graph with %d nodes, G has %d" % (path, n, len(G)))
+            size = array(typecode).itemsize * k * n
+            if len(mm) != _HEADER.size + 8 * k + 2 * size:
+                raise ValueError("%s has %d bytes, expected %d for k=%d, n=%d" %
+                                 (path, len(mm), _HEADER.size + 8 * k + 2 * size, k, n))
+        except ValueError:
+            mm.close()
+            raise
+        view = memoryview(mm)
+        start = _HEADER.size
+        landmarks = view[start:start + 8*k].cast('q')
+        start += 8 * k
+        fwd = view[start:start + size].cast(typecode)
+        bwd = view[start + size:start + 2*size].cast(typecode)
+        return cls(G, typecode=typecode, _table=(landmarks, fwd, bwd))
+
+
+
+def test_alt():
+    print("\nrunning test_alt()...")
+    idx = LandmarkIndex(adj_list_of_dicts, k=2, seed=1)
+    print("landmarks:", list(idx.landmarks))
+    print("a -> h:", idx.query(a, h))
+    print("b -> d:", idx.query(b, d))
+    print("h -> a:", idx.query(h, a))
+    f32 = LandmarkIndex(adj_list_of_dicts, k=2, seed=1, typecode='f')
+    print("float32 a -> h:", f32.query(a, h), "table %d bytes vs %d" %
+          (f32.table_bytes(), idx.table_bytes()))
+    try:
+        LandmarkIndex({'s': {'a': 0.1}, 'a': {'t': 0.2}, 't': {}}, k=1, typecode='f')
+    except ValueError as err:
+        print("float32, fractional weights:", err)
+
+    import os
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), "landmarks.alt")
+    idx.save(path)
+    print("loaded a -> h:", LandmarkIndex.load(adj_list_of_dicts, path).query(a, h))
+    small = LandmarkIndex(grid_graph(2, 3, seed=1), k=1, seed=1)
+    small.save(path)                    #stale file for a different graph.
+    for i in range(2):
+        try:
+            LandmarkIndex.load(adj_list_of_dicts, path)
+        except ValueError as err:
+            print("load:", err.args[0].replace(path, "<path>"))
+        with open(path, 'r+b') as f:    #then not a landmark file at all.
+            f.write(b'PNG')
+    os.remove(path)
+
+def bench_alt(rows=100, cols=100, queries=100):
+    '''settled nodes and time per query vs k, on a road-like grid.'''
+    import os
+    import tempfile
+    print("\nrunning bench_alt()...")
+    G = grid_graph(rows, cols, seed=1)
+    rng = Random(2)
+    pairs = [(rng.randrange(len(G)), rng.randrange(len(G))) for i in range(queries)]
+
+    idx = LandmarkIndex(G, k=0)
+    start = time.time()
+    settled = sum(idx.query(s, t, landmarks=False)[2] for s, t in pairs)
+    print("dijkstra:          %6.0f settled/query, %.2f ms/query" %
+          (settled / queries, 1000 * (time.time() - start) / queries))
+
+    for selection in ('farthest', 'avoid'):
+        for k in (1, 2, 4, 8, 16):
+            idx = LandmarkIndex(G, k=k, selection=selection, seed=3)
+            start = time.time()
+            results = [idx.query(s, t) for s, t in pairs]
+            elapsed = time.time() - start
+            print("%-8s k=%2d:      %6.0f settled/query, %.2f ms/query "
+                  "(build %.2fs, table %d bytes)" %
+                  (selection, k, sum(r[2] for r in results) / queries,
+                   1000 * elapsed / queries, idx.build_time, idx.table_bytes()))
+
+    path = os.path.join(tempfile.mkdtemp(), "alt.table")
+    idx.save(path)
+    mapped = LandmarkIndex.load(G, path)
+    same = all(mapped.query(s, t)[0] == r[0] for (s, t), r in zip(pairs, results))
+    print("mmap'd table answers match?", same)
+
+def main():
+    test_alt()
+    bench_alt()
+
+if __name__ == "__main__":
+    main()
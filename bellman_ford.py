@@ -0,0 +1,204 @@
+'''
+Bellman-Ford single source shortest paths: works with NEGATIVE edge weights
+(Dijkstra doesn't), and finds negative cycles.
+
+Classic version: relax every edge, |V|-1 times. After round i every
+shortest path that uses at most i edges is found, and a shortest path never
+needs more than |V|-1 edges. If a |V|th round still improves something
+there is a NEGATIVE CYCLE (going around it again always makes the path
+shorter, so "shortest path" doesn't exist). O(|V| * |E|).
+
+2 modes:
+    * 'spfa' (Shortest Path Faster Algorithm): only nodes whose distance
+      just improved can improve their neighbors, so keep those in a FIFO
+      queue (like BFS) instead of relaxing every edge every round. Same worst
+      case, usually much faster. A negative cycle shows up as a shortest path
+      with >= |V| edges.
+    * 'rounds': the classic "relax every edge" rounds, but each round is done
+      in bulk over a compact edge list grouped by destination (reverse CSR):
+      compute dist[u] + w for every edge at once with map() (runs in C), then
+      take the min per destination with min() over a slice. Stops as soon as
+      a round changes nothing.
+
+With a negative cycle, the cycle is returned as the witness, as a tuple that
+starts and ends at the same node like find_cycle() in cycles.py.
+
+    >>> bellman_ford(adj_list_of_dicts, a)[0][h]
+    6.0
+'''
+
+import time
+from array import array
+from collections import deque
+from operator import add
+
+from graphs import *
+from csr import to_weighted_csr, reverse_csr
+
+inf = float('inf')
+
+
+def _pred_cycle(edge_to):
+    '''
+    Find a cycle in the predecessor graph (every node has <= 1 predecessor,
+    so walk back from every node until we repeat or run out).
+
+    @rtype: list or None
+    @return: nodes on the cycle in edge order (first != last), or None.
+    '''
+    n = len(edge_to)
+    state = bytearray(n)    #0 = unseen, 1 = on current walk, 2 = done.
+    for s in range(n):
+        walk = []
+        x = s
+        while x >= 0 and state[x] == 0:
+            state[x] = 1
+            walk.append(x)
+            x = edge_to[x]
+        if x >= 0 and state[x] == 1:    #walked into our own walk: a cycle.
+            cycle = walk[walk.index(x):]
+            cycle.reverse()             #walk went backwards along edges.
+            return cycle
+        for y in walk:  state[y] = 2
+    return None
+
+def spfa(offsets, targets, weights, s):
+    '''
+    Queue based Bellman-Ford on CSR arrays.
+
+    @rtype: tuple
+    @return: (dist, edge_to, cycle), cycle is None or a list of node ids.
+    '''
+    n = len(offsets) - 1
+    dist    = array('d', [inf]) * n
+    edge_to = array('l', [-1]) * n
+    length  = array('l', [0]) * n       #edges on the path to x.
+    queued  = bytearray(n)
+
+    dist[s] = 0
+    que = deque([s])
+    queued[s] = 1
+    while que:
+        x = que.popleft()
+        queued[x] = 0
+        d = dist[x]
+        for k in range(offsets[x], offsets[x+1]):
+            y = targets[k]
+            nd = d + weights[k]
+            if nd < dist[y]:
+                dist[y] = nd
+                edge_to[y] = x
+                length[y] = length[x] + 1
+                if length[y] % n == 0:  #path with >= |V| edges, cycle somewhere.
+                    cycle = _pred_cycle(edge_to)
+                    if cycle is not None:
+                        return dist, edge_to, cycle
+                if not queued[y]:
+                    queued[y] = 1
+                    que.append(y)
+    return dist, edge_to, None
+
+def relax_rounds(offsets, targets, weights, s):
+    '''
+    Round based Bellman-Ford with bulk relaxation over the edge list.
+
+    @rtype: tuple
+    @return: (dist, edge_to, cycle), cycle is None or a list of node ids.
+    '''
+    n = len(offsets) - 1
+    rev_offsets, sources, rev_weights = reverse_csr(offsets, targets, weights)
+    has_in = [v for v in range(n) if rev_offsets[v] < rev_offsets[v+1]]
+
+    dist    = [inf] * n
+    edge_to = array('l', [-1]) * n
+    dist[s] = 0.0
+    for rnd in range(n):
+        #dist[u] + w for every edge u -> v at once, grouped by v.
+        cand = list(map(add, map(dist.__getitem__, sources), rev_weights))
+        changed = False
+        for v in has_in:
+            lo, hi = rev_offsets[v], rev_offsets[v+1]
+            best = min(cand[lo:hi])
+            if best < dist[v]:
+                dist[v] = best
+                edge_to[v] = sources[cand.index(best, lo, hi)]
+                changed = True
+        if not changed:
+            return array('d', dist), edge_to, None
+
+    #still changing after |V| rounds: negative cycle. let spfa find it.
+    return spfa(offsets, targets, weights, s)
+
+
+
+def bellman_ford(G, s, mode='spfa'):
+    '''
+    Single source shortest paths from s, negative weights allowed.
+
+    @type G: list of dicts, dict of dicts, or weighted adj matrix
+    @param G: the weighted graph.
+
+    @type mode: string
+    @param mode: 'spfa' or 'rounds'.
+
+    @rtype: tuple
+    @return: (dist, edge_to, cycle). dist/edge_to are dicts over the nodes
+             reached from s (edge_to like bfs() returns). if a negative cycle
+             is reachable from s, cycle is that cycle as a tuple of nodes
+             (first == last) and dist/edge_to are None.
+    '''
+    nodes, index, offsets, targets, weights = to_weighted_csr(G)
+    run = spfa if mode == 'spfa' else relax_rounds
+    dist_arr, edge_arr, cycle = run(offsets, targets, weights, index[s])
+    if cycle is not None:
+        return None, None, tuple(nodes[x] for x in cycle + cycle[:1])
+
+    dist    = {s: dist_arr[index[s]]}
+    edge_to = {s: None}
+    for i in range(len(nodes)):
+        if edge_arr[i] >= 0 and nodes[i] != s:
+            dist[nodes[i]]    = dist_arr[i]
+            edge_to[nodes[i]] = nodes[edge_arr[i]]
+    return dist, edge_to, None
+
+
+
+cost_adjusted = {       #negative weights (rebates), but no negative cycle.
+    'a': {'b': 4, 'c': 2},
+    'b': {'d': -3},
+    'c': {'b': 1, 'd': 5},
+    'd': {'e': 2},
+    'e': {}
+}
+
+def test_bellman_ford():
+    print("\nrunning test_bellman_ford()...")
+    for mode in ('spfa', 'rounds'):
+        dist, edge_to, cycle = bellman_ford(adj_list_of_dicts, a, mode)
+        print("%-6s adj_list_of_dicts dist from a:" % mode, [dist[x] for x in range(8)])
+        dist, edge_to, cycle = bellman_ford(cost_adjusted, 'a', mode)
+        print("%-6s cost_adjusted dist from a:" % mode, sorted(dist.items()))
+
+    loop = {x: dict(ws) for x, ws in cost_adjusted.items()}
+    loop['d']['b'] = 1          #b -> d -> b costs -3 + 1 = -2 each time.
+    for mode in ('spfa', 'rounds'):
+        print("%-6s negative cycle:" % mode, bellman_ford(loop, 'a', mode)[2])
+
+def bench_bellman_ford(n=20000, m=80000):
+    from dijkstra import shortest_paths
+    print("\nrunning bench_bellman_ford()...")
+    G = random_weighted_graph(n, m, seed=4)
+    start = time.time()
+    expected = shortest_paths(G, 0)[0]
+    print("dijkstra: %.3fs" % (time.time() - start))
+    for mode in ('spfa', 'rounds'):
+        start = time.time()
+        dist = bellman_ford(G, 0, mode)[0]
+        print("%-6s:  %.3fs, same as dijkstra? %s" % (mode, time.time() - start, dist == expected))
+
+def main():
+    test_bellman_ford()
+    bench_bellman_ford()
+
+if __name__ == "__main__":
+    main()
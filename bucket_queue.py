@@ -0,0 +1,96 @@
+'''
+Bucket queue (Dial's alg): a monotone priority queue for SMALL integer
+priorities, e.g. Dijkstra on graphs with weights 1..9 like adj_list_of_dicts.
+
+Keep one bucket (list) per distance value and a cursor at the smallest
+distance that can still be in the queue. pop() takes from the cursor's
+bucket, moving the cursor up when it runs empty. No comparisons at all.
+
+In Dijkstra every queued distance is between the last popped distance d and
+d + W (W = max edge weight), so only W+1 buckets are ever in use and we can
+reuse them in a circle: distance p goes in bucket p % (W+1).
+
+Cost: O(1) per update, and the cursor moves up at most once per possible
+distance, so Dijkstra is O(|E| + W*|V|). Great when W is small, bad when W is
+big (lots of empty buckets to walk past). For bigger ranges use RadixHeap
+(radix_heap.py), which is the multi-level version of the same idea: bucket
+sizes double, so there are only ~64 buckets whatever W is.
+
+Like heapq, an update with a smaller priority just adds another entry, and
+pop() skips entries that are out of date (lazy deletion).
+
+    >>> q = BucketQueue(max_weight=9)
+    >>> q.update('b', 2); q.update('c', 1); q.update('b', 1)
+    >>> q.pop(), q.pop()
+    (('b', 1), ('c', 1))      #(ties come out in any order.)
+'''
+
+
+class BucketQueue(object):
+
+    def __init__(self, max_weight):
+        '''
+        @type max_weight: int
+        @param max_weight: biggest edge weight W; every update must be within
+                           W of the last popped priority.
+        '''
+        self.size    = int(max_weight) + 1
+        self.buckets = [[] for i in range(self.size)]
+        self.cursor  = 0        #smallest priority that can still be queued.
+        self.best    = {}       #key -> current priority (keys still queued).
+
+    def __len__(self):
+        return len(self.best)
+
+    def __contains__(self, key):
+        return key in self.best
+
+    def update(self, key, priority):
+        '''push key, or lower its priority if the new one is smaller.'''
+        if priority != int(priority):
+            raise ValueError("bucket queue needs integer priorities, got %r" % (priority,))
+        priority = int(priority)
+        if not self.cursor <= priority < self.cursor + self.size:
+            raise ValueError("priority %d outside [%d, %d]" %
+                             (priority, self.cursor, self.cursor + self.size - 1))
+        old = self.best.get(key)
+        if old is not None and old <= priority:
+            return
+        self.best[key] = priority
+        self.buckets[priority % self.size].append((priority, key))
+
+    push = update
+
+    def pop(self):
+        '''remove and return (key, priority) with the smallest priority.'''
+        best, buckets, size = self.best, self.buckets, self.size
+        if not best:
+            raise IndexError("pop from empty bucket queue")
+        while True:
+            bucket = buckets[self.cursor % size]
+            while bucket:
+                priority, key = bucket.pop()
+                if best.get(key) == priority:   #else a stale entry, skip.
+                    del best[key]
+                    return key, priority
+            self.cursor += 1
+
+
+
+def test_bucket_queue():
+    print("\nrunning test_bucket_queue()...")
+    q = BucketQueue(max_weight=9)
+    for key, p in [('a', 5), ('b', 9), ('c', 1), ('d', 7), ('e', 3)]:
+        q.update(key, p)
+    q.update('b', 2)
+    print("len:", len(q), "pops:", [q.pop() for i in range(len(q))])
+    try:
+        q.update('f', 100)
+    except ValueError as err:
+        print("too far ahead:", err)
+
+def main():
+    test_bucket_queue()
+
+if __name__ == "__main__":
+    main()
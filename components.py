@@ -0,0 +1,213 @@
+'''
+Connected components of an UNDIRECTED graph: x and y are in the same
+component iff there's a path between them. (On a directed graph the edges are
+taken as undirected, i.e. "weakly" connected components. For strongly
+connected components see scc() in topsort_and_scc.py.)
+
+Output is the same for every mode here: (label, sizes) arrays where label[x]
+is the DENSE component id of node x (0, 1, 2, ... numbered in order of each
+component's smallest node) and sizes[id] is the number of nodes in it.
+
+3 ways:
+    * stream_components(): the edges come one at a time (a generator, a huge
+      file read in chunks, ...) and are never stored: each edge just goes
+      through union-find (union_find.py). 8 bytes per NODE, nothing per edge.
+      file_components() does the same for a binary edge file.
+    * connected_components(G, 'union_find'): same on an in-memory graph.
+    * connected_components(G, 'label_propagation'): every node starts with
+      its own id as its label. Each round, for every edge, the bigger of the
+      2 labels is pointed at the smaller (HOOKING), then POINTER JUMPING
+      replaces every label by its label's label until nothing changes
+      (label = [label[l] for l in label], a whole-array operation, which
+      halves the depth every time). Repeat until no edge joins 2 different
+      labels. Every label ends up as the smallest node of the component.
+      This is the Shiloach-Vishkin style alg used on GPUs/clusters, where
+      every edge and every node can be done at the same time.
+
+    >>> nodes, label, sizes = connected_components(graph1)
+    >>> list(sizes)
+    [8]         #graph1 is all one piece.
+'''
+
+import os
+import tempfile
+import time
+from array import array
+from itertools import islice
+from random import Random
+
+from graphs import *
+from csr import to_csr
+from union_find import UnionFind
+
+
+def stream_components(edges, n, chunk=65536):
+    '''
+    Components of a stream of edges, one pass.
+
+    @type edges: iterable
+    @param edges: (u, v) pairs with u, v in range(n). read once.
+
+    @type n: int
+    @param n: number of nodes.
+
+    @type chunk: int
+    @param chunk: edges handed to union_many() at a time.
+
+    @rtype: tuple
+    @return: (label, sizes) arrays.
+    '''
+    uf = UnionFind(n)
+    edges = iter(edges)
+    while True:
+        batch = list(islice(edges, chunk))
+        if not batch:   break
+        uf.union_many(batch)
+    return uf.labels()
+
+def write_edge_file(path, edges):
+    '''binary edge file: u, v as 8 byte ints, back to back.'''
+    with open(path, 'wb') as f:
+        buf = array('q')
+        for u, v in edges:
+            buf.append(u)
+            buf.append(v)
+            if len(buf) >= 1 << 16:
+                buf.tofile(f)
+                buf = array('q')
+        buf.tofile(f)
+
+def file_components(path, n, chunk=1 << 20):
+    '''
+    stream_components() for a file written by write_edge_file(), read chunk
+    edges at a time.
+    '''
+    uf = UnionFind(n)
+    with open(path, 'rb') as f:
+        while True:
+            buf = array('q')
+            buf.frombytes(f.read(16 * chunk))
+            if not buf:     break
+            uf.union_many(buf[0::2], buf[1::2])
+    return uf.labels()
+
+def edge_arrays(offsets, targets):
+    '''CSR -> (us, vs), edge k is us[k] - vs[k].'''
+    us = array('l')
+    for x in range(len(offsets) - 1):
+        us.extend(array('l', [x]) * (offsets[x+1] - offsets[x]))
+    return us, targets
+
+def label_propagation(n, us, vs):
+    '''
+    Hooking + pointer jumping, see top of file.
+
+    @rtype: tuple
+    @return: (label, rounds): label[x] = smallest node in x's component.
+    '''
+    label = list(range(n))
+    rounds = 0
+    while True:
+        rounds += 1
+        hooked = False
+        lu = list(map(label.__getitem__, us))
+        lv = list(map(label.__getitem__, vs))
+        for a, b in zip(lu, lv):
+            if a == b:  continue
+            if a > b:   a, b = b, a
+            if a < label[b]:        #hook the bigger root under the smaller.
+                label[b] = a
+                hooked = True
+        if not hooked:
+            return label, rounds
+        while True:                 #pointer jumping until every label is a root.
+            jumped = list(map(label.__getitem__, label))
+            if jumped == label:     break
+            label = jumped
+
+def dense_labels(label):
+    '''root labels -> ids 0, 1, 2... in order of smallest node, plus sizes.'''
+    ids = {}
+    dense = array('l', [0]) * len(label)
+    sizes = array('l')
+    for x, r in enumerate(label):
+        i = ids.get(r)
+        if i is None:
+            i = ids[r] = len(sizes)
+            sizes.append(0)
+        dense[x] = i
+        sizes[i] += 1
+    return dense, sizes
+
+def connected_components(G, mode='union_find'):
+    '''
+    @type G: list of sets, list of lists, dict of sets
+    @param G: undirected graph (directed ones are taken as undirected).
+
+    @type mode: string
+    @param mode: 'union_find' or 'label_propagation'.
+
+    @rtype: tuple
+    @return: (nodes, label, sizes): label[i] is the component of nodes[i].
+    '''
+    nodes, index, offsets, targets = to_csr(G)
+    us, vs = edge_arrays(offsets, targets)
+    if mode == 'union_find':
+        uf = UnionFind(len(nodes))
+        uf.union_many(us, vs)
+        label, sizes = uf.labels()
+    else:
+        label, sizes = dense_labels(label_propagation(len(nodes), us, vs)[0])
+    return nodes, label, sizes
+
+
+
+def test_connected_components():
+    print("\nrunning test_connected_components()...")
+    islands = {'a': {'b'}, 'b': {'a', 'c'}, 'c': {'b'}, 'd': {'e'}, 'e': {'d'}, 'f': set()}
+    for mode in ('union_find', 'label_propagation'):
+        nodes, label, sizes = connected_components(islands, mode)
+        print("%-17s" % mode, dict(zip(nodes, label)), "sizes:", list(sizes))
+    print("graph1:", list(connected_components(graph1)[1]))
+    label, sizes = stream_components(iter([(0, 1), (3, 4), (1, 2)]), 6)
+    print("stream:", list(label), list(sizes))
+
+def bench_connected_components(n=200000, m=300000):
+    print("\nrunning bench_connected_components()...")
+    rng = Random(13)
+    edges = [(rng.randrange(n), rng.randrange(n)) for i in range(m)]
+    G = [set() for x in range(n)]
+    for u, v in edges:
+        G[u].add(v)
+        G[v].add(u)
+
+    results = []
+    for mode in ('union_find', 'label_propagation'):
+        start = time.time()
+        nodes, label, sizes = connected_components(G, mode)
+        results.append(label)
+        print("%-17s %.2fs, %d components, biggest %d" %
+              (mode, time.time() - start, len(sizes), max(sizes)))
+    nodes, index, offsets, targets = to_csr(G)
+    print("label propagation rounds:", label_propagation(n, *edge_arrays(offsets, targets))[1])
+
+    start = time.time()
+    label, sizes = stream_components(iter(edges), n)
+    results.append(label)
+    print("stream (generator): %.2fs" % (time.time() - start))
+
+    path = os.path.join(tempfile.mkdtemp(), "edges.bin")
+    write_edge_file(path, edges)
+    start = time.time()
+    label, sizes = file_components(path, n, chunk=50000)
+    results.append(label)
+    print("stream (file, %d byte chunks): %.2fs" % (16 * 50000, time.time() - start))
+    os.remove(path)
+    print("all the same?", all(r == results[0] for r in results))
+
+def main():
+    test_connected_components()
+    bench_connected_components()
+
+if __name__ == "__main__":
+    main()
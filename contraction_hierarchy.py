@@ -0,0 +1,263 @@
+'''
+Contraction hierarchies (CH): preprocess a static weighted graph once, then
+answer shortest path queries by exploring only a tiny part of it.
+
+Preprocessing: "contract" nodes one at a time, least important first.
+Contracting x removes it from the graph; to keep every distance between the
+remaining nodes the same, for each pair of neighbors u -> x -> w we add a
+SHORTCUT edge u -> w (weight w(u,x) + w(x,w)), unless a WITNESS path from u
+to w that avoids x is at least as short. The witness search is a small
+Dijkstra from u, cut off after `witness_limit` settled nodes (giving up
+early only means an extra, unneeded shortcut, never a wrong answer).
+
+The order is picked greedily by EDGE DIFFERENCE: (shortcuts contracting x
+would add) - (edges removed with x), plus the number of already contracted
+neighbors so the contraction spreads out evenly. Priorities change as
+neighbors get contracted, so they are recomputed lazily: pop the best node,
+recompute, and put it back if it's no longer the best.
+
+Every node ends up with a RANK (the order it was contracted in). A shortest
+path can always be found as an "up then down" path: rank increases from s
+up to some top node, then decreases down to t. So the query is a
+bidirectional Dijkstra that only follows edges to HIGHER ranked nodes, from
+s on G and from t on reverse(G), and the best meeting node wins.
+
+The query's path has shortcuts in it; each shortcut remembers the node it
+skipped (`middle`), so it can be unpacked back into original edges.
+
+    >>> ch = ContractionHierarchy(adj_list_of_dicts)
+    >>> ch.query(a, h)
+    (6, (0, 5, 7))            #same as find_path(adj_list_of_dicts, dijkstra, a, h)
+'''
+
+import heapq
+import time
+
+from graphs import *
+from csr import node_list
+
+inf = float('inf')
+
+
+class ContractionHierarchy(object):
+
+    def __init__(self, G, witness_limit=50):
+        '''
+        @type G: list of dicts, dict of dicts
+        @param G: weighted graph (adj_list_of_dicts style), no negative
+                  weights.
+
+        @type witness_limit: int
+        @param witness_limit: max nodes settled by one witness search.
+        '''
+        start = time.time()
+        self.nodes = node_list(G)
+        self.index = {x: i for i, x in enumerate(self.nodes)}
+        n = len(self.nodes)
+        self.witness_limit = witness_limit
+
+        #remaining (not yet contracted) graph, both directions.
+        self.out = [{} for x in range(n)]
+        self.inn = [{} for x in range(n)]
+        for x in self.nodes:
+            i = self.index[x]
+            for y, w in G[x].items():
+                j = self.index[y]
+                if w < 0:   raise ValueError("negative edge weight")
+                if i == j:  continue            #self-loops never help.
+                if w < self.out[i].get(j, inf):
+                    self.out[i][j] = w
+                    self.inn[j][i] = w
+
+        self.up_out = [{} for x in range(n)]    #x -> higher ranked y, for s.
+        self.up_in  = [{} for x in range(n)]    #higher ranked y -> x, for t.
+        self.middle = {}        #shortcut (u, w) -> node it skips over.
+        self.rank   = [0] * n
+        self.shortcuts = 0
+        self._contract_all()
+        del self.out, self.inn
+        self.preprocess_time = time.time() - start
+
+    def _witness(self, s, skip, max_dist):
+        '''limited Dijkstra from s in the remaining graph, not through skip.'''
+        dist = {s: 0}
+        heap = [(0, s)]
+        settled = 0
+        out = self.out
+        while heap and settled < self.witness_limit:
+            d, y = heapq.heappop(heap)
+            if d > dist[y]:     continue        #stale entry.
+            if d > max_dist:    break
+            settled += 1
+            for z, w in out[y].items():
+                if z == skip:   continue
+                nd = d + w
+                if nd < dist.get(z, inf):
+                    dist[z] = nd
+                    heapq.heappush(heap, (nd, z))
+        return dist
+
+    def _needed_shortcuts(self, x):
+        '''(u, w, weight) for every shortcut contracting x would need.'''
+        needed = []
+        out_x = self.out[x]
+        for u, wu in self.inn[x].items():
+            via = {w: wu + ww for w, ww in out_x.items() if w != u}
+            if not via:     continue
+            dist = self._witness(u, x, max(via.values()))
+            for w, d in via.items():
+                if dist.get(w, inf) > d:
+                    needed.append((u, w, d))
+        return needed
+
+    def _priority(self, x, deleted):
+        edge_difference = len(self._needed_shortcuts(x)) - len(self.out[x]) - len(self.inn[x])
+        return edge_difference + deleted[x]
+
+    def _contract_all(self):
+        n = len(self.nodes)
+        deleted = [0] * n       #contracted neighbors of x so far.
+        heap = [(self._priority(x, deleted), x) for x in range(n)]
+        heapq.heapify(heap)
+        order = 0
+        while heap:
+            p, x = heapq.heappop(heap)
+            p = self._priority(x, deleted)      #lazy update.
+            if heap and p > heap[0][0]:
+                heapq.heappush(heap, (p, x))
+                continue
+            self.rank[x] = order
+            order += 1
+            self._contract(x, deleted)
+
+    def _contract(self, x, deleted):
+        needed = self._needed_shortcuts(x)
+        #every neighbor left is contracted later, i.e. ranked higher.
+        for u, w in self.inn[x].items():
+            self.up_in[x][u] = w
+            del self.out[u][x]
+            deleted[u] += 1
+        for y, w in self.out[x].items():
+            self.up_out[x][y] = w
+            del self.inn[y][x]
+            deleted[y] += 1
+        self.out[x] = {}
+        self.inn[x] = {}
+        for u, w, d in needed:
+            if d < self.out[u].get(w, inf):
+                if w not in self.out[u]:    self.shortcuts += 1
+                self.out[u][w] = d
+                self.inn[w][u] = d
+                self.middle[(u, w)] = x
+
+    def _unpack(self, u, w):
+        '''original nodes on edge/shortcut u -> w, without u.'''
+        path = []
+        stk = [(u, w)]
+        while stk:
+            u, w = stk.pop()
+            m = self.middle.get((u, w))
+            if m is None:
+                path.append(w)
+            else:
+                stk.append((m, w))      #do u -> m first, then m -> w.
+                stk.append((u, m))
+        return path
+
+    def query(self, s, t):
+        '''
+        Shortest path from s to t.
+
+        @rtype: tuple
+        @return: (distance, path) with path a tuple of nodes like find_path()
+                 returns, or (inf, None) if t can't be reached.
+        '''
+        s, t = self.index[s], self.index[t]
+        dist    = ({s: 0}, {t: 0})          #forward, backward.
+        edge_to = ({s: -1}, {t: -1})
+        graph   = (self.up_out, self.up_in)
+        heaps   = ([(0, s)], [(0, t)])
+        best, meet = (0, s) if s == t else (inf, None)
+
+        while True:
+            #only continue a direction while it could still beat best.
+            live = [i for i in (0, 1) if heaps[i] and heaps[i][0][0] < best]
+            if not live:    break
+            for i in live:
+                d, x = heapq.heappop(heaps[i])
+                if d > dist[i][x]:  continue    #stale entry.
+                for y, w in graph[i][x].items():
+                    nd = d + w
+                    if nd < dist[i].get(y, inf):
+                        dist[i][y] = nd
+                        edge_to[i][y] = x
+                        heapq.heappush(heaps[i], (nd, y))
+                        other = dist[1 - i].get(y)
+                        if other is not None and nd + other < best:
+                            best, meet = nd + other, y
+                other = dist[1 - i].get(x)
+                if other is not None and d + other < best:
+                    best, meet = d + other, x
+
+        if meet is None:
+            return inf, None
+        up = [meet]                 #s ... meet, in the forward search tree.
+        while edge_to[0][up[-1]] >= 0:
+            up.append(edge_to[0][up[-1]])
+        up.reverse()
+        down = [meet]               #meet ... t, in the backward search tree.
+        while edge_to[1][down[-1]] >= 0:
+            down.append(edge_to[1][down[-1]])
+
+        path = [up[0]]
+        hops = up + down[1:]
+        for u, w in zip(hops, hops[1:]):
+            path.extend(self._unpack(u, w))
+        return best, tuple(self.nodes[x] for x in path)
+
+
+
+def test_contraction_hierarchy():
+    print("\nrunning test_contraction_hierarchy()...")
+    ch = ContractionHierarchy(adj_list_of_dicts)
+    print("shortcuts:", ch.shortcuts, "ranks:", ch.rank)
+    print("a -> h:", ch.query(a, h))
+    print("b -> d:", ch.query(b, d))
+    print("h -> a:", ch.query(h, a))
+    print("c -> c:", ch.query(c, c))
+
+def percentile(sorted_times, p):
+    return sorted_times[min(int(p / 100.0 * len(sorted_times)), len(sorted_times) - 1)]
+
+def bench_contraction_hierarchy(rows=60, cols=60, queries=500):
+    from random import Random
+    from dijkstra import shortest_path
+    print("\nrunning bench_contraction_hierarchy()...")
+    G = grid_graph(rows, cols, seed=1)
+    ch = ContractionHierarchy(G)
+    print("n=%d m=%d: preprocessing %.2fs, %d shortcuts" %
+          (len(G), sum(map(len, G)), ch.preprocess_time, ch.shortcuts))
+
+    rng = Random(2)
+    pairs = [(rng.randrange(len(G)), rng.randrange(len(G))) for i in range(queries)]
+    for name, query in (("ch", ch.query),
+                        ("dijkstra", lambda s, t: shortest_path(G, s, t))):
+        times = []
+        answers = []
+        for s, t in pairs[:queries if name == "ch" else queries // 10]:
+            start = time.time()
+            answers.append(query(s, t)[0])
+            times.append(time.time() - start)
+        times.sort()
+        print("%-8s p50 %.3f ms, p90 %.3f ms, p99 %.3f ms" %
+              (name, 1000 * percentile(times, 50), 1000 * percentile(times, 90),
+               1000 * percentile(times, 99)))
+        if name == "ch":    ch_answers = answers
+    print("distances match dijkstra?", ch_answers[:len(answers)] == answers)
+
+def main():
+    test_contraction_hierarchy()
+    bench_contraction_hierarchy()
+
+if __name__ == "__main__":
+    main()
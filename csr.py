@@ -0,0 +1,231 @@
+'''
+Compact (CSR, "compressed sparse row") representation of a graph.
+
+graphs.py shows how to represent graphs with python built-ins (list of sets,
+list of lists, dict of sets, adj matrix). Those are great for learning, but
+every node is a python object and every edge is a set/dict entry, so big
+graphs eat a lot of memory and the per-edge overhead adds up.
+
+CSR packs the whole adj list into 2 flat int arrays:
+    offsets: len |V|+1, neighbors of node i are targets[offsets[i]:offsets[i+1]]
+    targets: len |E|, the neighbor ids laid out back to back.
+
+Nodes are renumbered 0..|V|-1, so we also hand back the list of original
+node names (idx -> name) and a dict (name -> idx).
+
+    >>> nodes, index, offsets, targets = to_csr(graph3)
+    >>> [nodes[j] for j in targets[offsets[index['f']]:offsets[index['f']+1]]]
+    ['c', 'g', 'h']     #same neighbors as graph3['f'] (in some order).
+
+The flat arrays can also be put in shared memory so worker processes can
+read the graph without each one getting a pickled copy of it.
+'''
+
+from array import array
+from multiprocessing import shared_memory
+
+from graphs import *
+
+
+def node_list(G):
+    '''
+    Nodes of G in a fixed order.
+
+    list of sets/lists use idx as node name, dict of sets use the keys.
+    '''
+    if type(G) == dict:
+        return list(G)
+    return list(range(len(G)))
+
+def to_csr(G):
+    '''
+    Convert adj list G into CSR arrays.
+
+    @type G: list of lists, list of sets, dict of sets
+    @param G: the graph to convert.
+
+    @rtype: tuple
+    @return: (nodes, index, offsets, targets) where nodes[i] is the name of
+             node i, index[name] is i, and offsets/targets are array('l').
+    '''
+    nodes = node_list(G)
+    index = {x: i for i, x in enumerate(nodes)}
+
+    offsets = array('l', [0])
+    targets = array('l')
+    for x in nodes:
+        targets.extend(index[y] for y in G[x])
+        offsets.append(len(targets))
+    return nodes, index, offsets, targets
+
+def to_weighted_csr(G):
+    '''
+    Convert a WEIGHTED graph into CSR arrays plus a parallel weights array.
+
+    @type G: list of dicts, dict of dicts, or adj matrix (list of lists)
+    @param G: adj_list_of_dicts style (G[x][y] is the weight of x -> y) or
+              adj_matrix_directed_weighted style (inf means no edge, the
+              diagonal is skipped).
+
+    @rtype: tuple
+    @return: (nodes, index, offsets, targets, weights), weights is
+             array('d') and weights[k] goes with targets[k].
+    '''
+    nodes = node_list(G)
+    index = {x: i for i, x in enumerate(nodes)}
+    inf = float('inf')
+
+    offsets = array('l', [0])
+    targets = array('l')
+    weights = array('d')
+    for x in nodes:
+        if type(G[x]) == list:          #row of an adj matrix.
+            for y, w in enumerate(G[x]):
+                if y != x and w < inf:
+                    targets.append(y)
+                    weights.append(w)
+        else:
+            for y, w in G[x].items():
+                targets.append(index[y])
+                weights.append(w)
+        offsets.append(len(targets))
+    return nodes, index, offsets, targets, weights
+
+def reverse_csr(offsets, targets, weights=None):
+    '''
+    Transpose CSR arrays (flip every edge), same idea as reverse() in
+    topsort_and_scc.py but without building any sets.
+
+    Counting sort by target: count in-degrees, prefix sum them into
+    offsets, then drop each source into its slot.
+
+    If weights is given, the weights are moved along with their edges and
+    (rev_offsets, rev_targets, rev_weights) is returned.
+    '''
+    n = len(offsets) - 1
+    rev_offsets = array('l', [0]) * (n + 1)
+    for y in targets:
+        rev_offsets[y+1] += 1
+    for i in range(n):
+        rev_offsets[i+1] += rev_offsets[i]
+
+    fill = array('l', rev_offsets)  #next free slot for each node.
+    rev_targets = array('l', [0]) * len(targets)
+    rev_weights = array('d', [0.0]) * len(targets) if weights is not None else None
+    for x in range(n):
+        for k in range(offsets[x], offsets[x+1]):
+            y = targets[k]
+            rev_targets[fill[y]] = x
+            if rev_weights is not None:
+                rev_weights[fill[y]] = weights[k]
+            fill[y] += 1
+    if rev_weights is not None:
+        return rev_offsets, rev_targets, rev_weights
+    return rev_offsets, rev_targets
+
+def topological_order(offsets, targets):
+    '''
+    Kahn's alg on CSR arrays: repeatedly take a node with in-degree 0.
+
+    Unlike topsort() this isn't recursive (no recursion limit on big graphs)
+    and it notices cycles: the nodes on/behind a cycle never reach
+    in-degree 0.
+
+    @rtype: array or None
+    @return: node ids in topological order, None if the graph has a cycle.
+    '''
+    n = len(offsets) - 1
+    indeg = array('l', [0]) * n
+    for y in targets:
+        indeg[y] += 1
+    order = array('l', (x for x in range(n) if indeg[x] == 0))
+    i = 0
+    while i < len(order):       #order doubles as the queue.
+        x = order[i]
+        i += 1
+        for k in range(offsets[x], offsets[x+1]):
+            y = targets[k]
+            indeg[y] -= 1
+            if indeg[y] == 0:   order.append(y)
+    if len(order) < n:
+        return None
+    return order
+
+
+
+def share_arrays(*arrays):
+    '''
+    Copy each array.array into its own SharedMemory block.
+
+    @rtype: tuple
+    @return: (blocks, handles). keep blocks alive (and close()/unlink() them
+             when done); pass handles to attach_arrays() in the workers.
+    '''
+    blocks  = []
+    handles = []
+    for arr in arrays:
+        nbytes = max(len(arr) * arr.itemsize, 1)    #can't make 0 byte block.
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        if len(arr):
+            shm.buf[:len(arr) * arr.itemsize] = arr.tobytes()
+        blocks.append(shm)
+        handles.append((shm.name, arr.typecode, len(arr)))
+    return blocks, handles
+
+def attach_arrays(handles):
+    '''
+    Attach to arrays created by share_arrays(), no copying.
+
+    @rtype: tuple
+    @return: (blocks, views) where views[i] is an int/float memoryview that
+             indexes just like the original array.
+    '''
+    blocks = []
+    views  = []
+    for name, typecode, length in handles:
+        shm = shared_memory.SharedMemory(name=name)
+        blocks.append(shm)
+        views.append(shm.buf.cast(typecode)[:length])
+    return blocks, views
+
+def release_arrays(blocks, views=(), unlink=False):
+    '''
+    Views have to be released before a block can be closed.
+    Only the process that created the blocks should unlink them.
+    '''
+    for v in views:
+        v.release()
+    for shm in blocks:
+        shm.close()
+        if unlink:
+            shm.unlink()
+
+
+
+def test_to_csr():
+    print("\nrunning test_to_csr()...")
+    nodes, index, offsets, targets = to_csr(graph3)
+    for i, x in enumerate(nodes):
+        nbrs = [nodes[j] for j in targets[offsets[i]:offsets[i+1]]]
+        print(x, "->", sorted(nbrs), sorted(nbrs) == sorted(graph3[x]))
+
+    rev_offsets, rev_targets = reverse_csr(offsets, targets)
+    i = index['f']
+    print("into f:", sorted(nodes[j] for j in rev_targets[rev_offsets[i]:rev_offsets[i+1]]))
+    print("graph3 topological order:", topological_order(offsets, targets))
+
+def test_share_arrays():
+    print("\nrunning test_share_arrays()...")
+    nodes, index, offsets, targets = to_csr(graph1)
+    blocks, handles = share_arrays(offsets, targets)
+    shms, (offs, tgts) = attach_arrays(handles)
+    print("shared targets match?", list(tgts) == list(targets))
+    release_arrays(shms, (offs, tgts))
+    release_arrays(blocks, unlink=True)
+
+def main():
+    test_to_csr()
+    test_share_arrays()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+'''
+Cycle detection for directed graphs, with the cycle itself as the witness.
+
+1) find_cycle(G): DFS that colors nodes
+        white = not seen yet,
+        gray  = on the current DFS path (started, not finished),
+        black = finished.
+   an edge x -> y to a GRAY node y is a "back edge": y is an ancestor of x on
+   the DFS path, so y -> ... -> x -> y is a cycle. we stop at the 1st one and
+   walk the DFS path back from x to y to get the cycle.
+   (an edge to a black node is fine, everything below it is already done.)
+
+2) IncrementalTopologicalOrder: edges arrive one at a time (a stream) and we
+   want to know the FIRST edge that closes a cycle, without re-running
+   find_cycle() over the whole graph for every new edge.
+   keep a topological order of the graph so far (Pearce-Kelly alg):
+        * new edge x -> y with ord(x) < ord(y): the order is still valid,
+          nothing to do, O(1).
+        * else only the nodes with ord between ord(y) and ord(x) can be
+          affected. search forward from y (staying <= ord(x)). if we reach x
+          the edge closes a cycle. otherwise search backward from x (staying
+          >= ord(y)), and shuffle just those 2 groups of nodes so everything
+          found from x comes before everything found from y.
+
+    >>> find_cycle(graph3)
+    ('c', 'd', 'e', 'f', 'c')       #(or another cycle, sets aren't ordered.)
+'''
+
+from graphs import *
+from csr import node_list
+
+
+def find_cycle(G):
+    '''
+    Find a directed cycle in G, stopping at the first back edge.
+
+    Iterative (explicit stack) so big graphs don't hit the recursion limit.
+
+    @type G: list of lists, list of sets, dict of sets
+    @param G: directed graph.
+
+    @rtype: tuple or None
+    @return: the cycle as a tuple of nodes that starts and ends with the same
+             node, e.g. ('f', 'g', 'f'). None if G is a DAG.
+    '''
+    WHITE, GRAY, BLACK = 0, 1, 2
+    color   = {x: WHITE for x in node_list(G)}
+    edge_to = {}
+
+    for s in color:
+        if color[s] != WHITE:   continue
+        color[s] = GRAY
+        edge_to[s] = None
+        stk = [(s, iter(G[s]))]
+        while stk:
+            x, it = stk[-1]
+            for y in it:
+                if color[y] == GRAY:            #back edge, found a cycle.
+                    cycle = [y, x]
+                    while x != y:
+                        x = edge_to[x]
+                        cycle.append(x)
+                    cycle.reverse()
+                    return tuple(cycle)
+                if color[y] == WHITE:
+                    color[y] = GRAY
+                    edge_to[y] = x
+                    stk.append((y, iter(G[y])))
+                    break
+            else:                               #x is finished.
+                color[x] = BLACK
+                stk.pop()
+    return None
+
+def is_dag(G):
+    return find_cycle(G) is None
+
+
+
+class IncrementalTopologicalOrder(object):
+    '''
+    Pearce-Kelly dynamic topological order: add edges one at a time, find out
+    right away if an edge would close a cycle.
+    '''
+
+    def __init__(self):
+        self.ord   = {}     #node -> position in the topological order.
+        self.pos   = []     #position -> node.
+        self.succ  = {}     #node -> set of successors.
+        self.pred  = {}     #node -> set of predecessors.
+
+    def add_node(self, x):
+        if x not in self.ord:
+            self.ord[x] = len(self.pos)
+            self.pos.append(x)
+            self.succ[x] = set()
+            self.pred[x] = set()
+
+    def add_edge(self, x, y):
+        '''
+        Add edge x -> y unless it closes a cycle.
+
+        @rtype: tuple or None
+        @return: None if the edge was added, else the cycle it would close
+                 (the edge is NOT added), e.g. add_edge('f', 'c') with
+                 c -> d -> e -> f already there gives ('f', 'c', 'd', 'e', 'f').
+        '''
+        self.add_node(x)
+        self.add_node(y)
+        if x == y:
+            return (x, x)
+        if y in self.succ[x]:
+            return None
+        lb, ub = self.ord[y], self.ord[x]
+        if lb < ub:                     #y is before x, need to fix the order.
+            forward = self._forward(y, x, ub)
+            if type(forward) == tuple:
+                return forward
+            backward = self._backward(x, lb)
+            self._reorder(backward, forward)
+        self.succ[x].add(y)
+        self.pred[y].add(x)
+        return None
+
+    def _forward(self, y, x, ub):
+        '''
+        nodes reachable from y with ord <= ub. if x is one of them, return
+        the cycle x -> y -> ... -> x instead.
+        '''
+        edge_to = {y: None}
+        stk = [y]
+        while stk:
+            u = stk.pop()
+            for w in self.succ[u]:
+                if w == x:
+                    path = [x, u]
+                    while edge_to[u] is not None:
+                        u = edge_to[u]
+                        path.append(u)
+                    path.append(x)
+                    path.reverse()
+                    return tuple(path)
+                if w not in edge_to and self.ord[w] <= ub:
+                    edge_to[w] = u
+                    stk.append(w)
+        return list(edge_to)
+
+    def _backward(self, x, lb):
+        '''nodes that reach x with ord >= lb.'''
+        seen = {x}
+        stk = [x]
+        while stk:
+            u = stk.pop()
+            for w in self.pred[u]:
+                if w not in seen and self.ord[w] >= lb:
+                    seen.add(w)
+                    stk.append(w)
+        return list(seen)
+
+    def _reorder(self, backward, forward):
+        '''reuse the same positions, but backward nodes go before forward.'''
+        key = self.ord.get
+        backward.sort(key=key)
+        forward.sort(key=key)
+        nodes = backward + forward
+        slots = sorted(self.ord[u] for u in nodes)
+        for u, i in zip(nodes, slots):
+            self.ord[u] = i
+            self.pos[i] = u
+
+    def order(self):
+        '''current topological order of all nodes added so far.'''
+        return tuple(self.pos)
+
+def first_cycle(edges):
+    '''
+    Stream edges into an IncrementalTopologicalOrder.
+
+    @type edges: iterable of (x, y) tuples
+    @param edges: edges in arrival order (a list, a generator, lines of a
+                  file, ...).
+
+    @rtype: tuple or None
+    @return: ((x, y), cycle) for the first edge that closes a cycle, None if
+             all the edges together make a DAG.
+    '''
+    ito = IncrementalTopologicalOrder()
+    for x, y in edges:
+        cycle = ito.add_edge(x, y)
+        if cycle is not None:
+            return (x, y), cycle
+    return None
+
+
+
+def test_find_cycle():
+    print("\nrunning test_find_cycle()...")
+    print("graph3 cycle:", find_cycle(graph3))
+    print("graph1 cycle:", find_cycle(graph1))
+    print("graph_scc cycle:", find_cycle(graph_scc))
+    dag = {'a': set('bc'), 'b': set('d'), 'c': set('d'), 'd': set()}
+    print("dag cycle:", find_cycle(dag), "is_dag?", is_dag(dag))
+
+def test_first_cycle():
+    print("\nrunning test_first_cycle()...")
+    edges = [(x, y) for x in sorted(graph3) for y in sorted(graph3[x])]
+    print("graph3 edges:", first_cycle(edges))
+
+    ito = IncrementalTopologicalOrder()
+    for x, y in [('c', 'd'), ('b', 'c'), ('a', 'b'), ('d', 'e')]:
+        ito.add_edge(x, y)
+    print("order:", ito.order())
+    print("add e -> b:", ito.add_edge('e', 'b'))
+    print("order still:", ito.order())
+
+def main():
+    test_find_cycle()
+    test_first_cycle()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+'''
+Run a DAG of jobs in parallel: a job starts as soon as all the jobs it
+depends on are done.
+
+topsort() gives ONE valid order to do the steps (of making a cake, etc.),
+but walking that tuple one job at a time means only 1 job ever runs. In
+"mix batter -> bake, make frosting -> frost cake" the batter and the frosting
+don't depend on each other, so both can be done at the same time.
+
+Instead of a fixed order we keep an in-degree count (# of unfinished jobs it
+waits on) for every job, like Kahn's topological sort alg:
+    * every job with in-degree 0 is ready, hand it to a free worker.
+    * when a job finishes, decrement the in-degree of its successors, the
+      ones that drop to 0 become ready.
+That runs every job as early as the DAG allows (max parallelism).
+
+Workers can be threads, processes or an asyncio event loop:
+    * 'thread':  good for jobs that wait on I/O or release the GIL.
+    * 'process': good for CPU bound python jobs. jobs must be top level
+                 functions and their results picklable.
+    * 'asyncio': jobs are coroutine functions (async def), plain functions
+                 are just called in the loop.
+
+If a job raises, no new jobs are started (cancellation). Already running
+asyncio jobs get cancelled, running worker processes get terminated, running
+threads are left to finish (python can't kill threads).
+
+The report also has per job start/end times and the CRITICAL PATH: the
+chain of jobs with the longest total time, i.e. the best possible wall time
+no matter how many workers you add.
+
+G uses the same shape as graph3: G[x] is the set of jobs that need x done
+first (edge x -> y means "x before y").
+'''
+
+import asyncio
+import threading
+import time
+import multiprocessing as mp
+from collections import deque
+from multiprocessing.connection import wait as wait_connections
+
+from graphs import *
+
+
+class _ThreadBackend(object):
+    '''fixed pool of threads. (concurrent.futures can't be used here, see
+    process_pool.py for why.)'''
+
+    def __init__(self, tasks, workers):
+        self.tasks = tasks
+        self.todo  = deque()
+        self.done  = deque()
+        self.stop  = False
+        self.cond  = threading.Condition()
+        self.threads = [threading.Thread(target=self._loop, daemon=True)
+                        for w in range(workers)]
+        for t in self.threads:  t.start()
+
+    def _loop(self):
+        while True:
+            with self.cond:
+                while not self.todo and not self.stop:
+                    self.cond.wait()
+                if self.stop:   return
+                x = self.todo.popleft()
+            self._finish(_run_job(self.tasks, x))
+
+    def _finish(self, outcome):
+        with self.cond:
+            self.done.append(outcome)
+            self.cond.notify_all()
+
+    def submit(self, x):
+        with self.cond:
+            self.todo.append(x)
+            self.cond.notify_all()
+
+    def wait(self):
+        with self.cond:
+            while not self.done:
+                self.cond.wait()
+            finished = list(self.done)
+            self.done.clear()
+        return finished
+
+    def shutdown(self, cancel=False):
+        with self.cond:
+            self.stop = True
+            self.todo.clear()
+            self.cond.notify_all()
+        if not cancel:
+            for t in self.threads:  t.join()
+
+def _run_job(tasks, x):
+    '''run job x, returns (x, result, error, start, end).'''
+    start = time.time()
+    try:
+        return (x, tasks[x](), None, start, time.time())
+    except Exception as err:
+        return (x, None, err, start, time.time())
+
+def _process_loop(conn, tasks):
+    while True:
+        x = conn.recv()
+        if x is None:   break
+        outcome = _run_job(tasks, x)
+        try:
+            conn.send(outcome)
+        except Exception as err:        #result couldn't be pickled.
+            conn.send((x, None, err, outcome[3], outcome[4]))
+    conn.close()
+
+class _ProcessBackend(object):
+    '''long lived worker processes, each gets job names through a pipe.'''
+
+    def __init__(self, tasks, workers):
+        self.idle  = []
+        self.busy  = {}         #connection -> job it is running.
+        self.procs = {}
+        for w in range(workers):
+            parent_end, child_end = mp.Pipe()
+            p = mp.Process(target=_process_loop, args=(child_end, tasks), daemon=True)
+            p.start()
+            child_end.close()
+            self.idle.append(parent_end)
+            self.procs[parent_end] = p
+
+    def submit(self, x):
+        conn = self.idle.pop()
+        conn.send(x)
+        self.busy[conn] = x
+
+    def wait(self):
+        finished = []
+        for conn in wait_connections(list(self.busy)):
+            finished.append(conn.recv())
+            del self.busy[conn]
+            self.idle.append(conn)
+        return finished
+
+    def shutdown(self, cancel=False):
+        for conn, p in self.procs.items():
+            if conn in self.busy:
+                p.terminate()           #cancel a running job.
+            else:
+                conn.send(None)
+        for conn, p in self.procs.items():
+            p.join()
+            conn.close()
+
+
+
+def _in_degrees(G):
+    '''
+    In-degree of every job. Checks G before anything runs: every successor
+    has to be a job in G, and G can't have a cycle (Kahn's alg on a copy of
+    the counts, if it can't reach every job the rest are on/behind a cycle).
+    '''
+    indeg = {x: 0 for x in G}
+    for x in G:
+        for y in G[x]:
+            if y not in indeg:
+                raise ValueError("job %r (a successor of %r) is not in G" % (y, x))
+            indeg[y] += 1
+    left = dict(indeg)
+    ready = [x for x in G if left[x] == 0]
+    count = 0
+    while ready:
+        x = ready.pop()
+        count += 1
+        for y in G[x]:
+            left[y] -= 1
+            if left[y] == 0:    ready.append(y)
+    if count < len(G):
+        raise ValueError("G has a cycle, can't run: %s" % (tuple(x for x in G if left[x] > 0),))
+    return indeg
+
+def critical_path(G, times):
+    '''
+    Longest chain of jobs by total run time.
+
+    Only looks at jobs that ran. Goes through jobs in order of finishing
+    time, which is a valid topological order (a job starts after all its
+    predecessors finish).
+
+    @rtype: tuple
+    @return: (path, total time) where path is a tuple of job names like the
+             tuples find_path() returns.
+    '''
+    preds = {x: [] for x in times}
+    for x in times:
+        for y in G[x]:
+            if y in preds:  preds[y].append(x)
+
+    longest = {}        #longest chain ending at x (including x).
+    edge_to = {}
+    for x in sorted(times, key=lambda x: times[x][1]):
+        best = None
+        for p in preds[x]:
+            if best is None or longest[p] > longest[best]:  best = p
+        edge_to[x] = best
+        longest[x] = times[x][1] - times[x][0] + (longest[best] if best is not None else 0)
+
+    if not longest:
+        return (), 0.0
+    x = max(longest, key=longest.get)
+    total = longest[x]
+    path = [x]
+    while edge_to[x] is not None:       #walk backwards like find_path().
+        x = edge_to[x]
+        path.append(x)
+    path.reverse()
+    return tuple(path), total
+
+def _report(G, t0, results, times, failed, peak):
+    cancelled = tuple(x for x in G if x not in results and x not in failed)
+    path, length = critical_path(G, times)
+    return {'results': results,
+            'times': {x: (s - t0, e - t0) for x, (s, e) in times.items()},
+            'failed': failed,
+            'cancelled': cancelled,
+            'critical_path': path,
+            'critical_time': length,
+            'peak_parallelism': peak,
+            'wall_time': time.time() - t0}
+
+def run_dag(G, tasks, mode='thread', workers=4):
+    '''
+    Run every job in tasks, each one as soon as its predecessors in G are
+    done.
+
+    @type G: dict of sets
+    @param G: DAG of job names, edge x -> y means x has to finish before y.
+
+    @type tasks: dict
+    @param tasks: job name -> callable taking no args (async def function for
+                  mode='asyncio').
+
+    @type mode: string
+    @param mode: 'thread', 'process', or 'asyncio'.
+
+    @type workers: int
+    @param workers: max jobs running at once (ignored for 'asyncio').
+
+    @rtype: dict
+    @return: 'results' (job -> return value), 'times' (job -> (start, end)
+             seconds since the run started), 'failed' (job -> exception),
+             'cancelled' (jobs that never finished), 'critical_path', 'critical_time',
+             'peak_parallelism', 'wall_time'.
+    '''
+    indeg = _in_degrees(G)             #ValueError before any job runs.
+    if mode == 'asyncio':
+        return asyncio.run(_run_dag_async(G, tasks, indeg))
+    if mode == 'thread':
+        backend = _ThreadBackend(tasks, workers)
+    elif mode == 'process':
+        backend = _ProcessBackend(tasks, workers)
+    else:
+        raise ValueError("unknown mode %r" % (mode,))
+
+    t0 = time.time()
+    ready = deque(x for x in G if indeg[x] == 0)
+    results, times, failed = {}, {}, {}
+    running = peak = 0
+    try:
+        while ready or running:
+            while ready and running < workers and not failed:
+                backend.submit(ready.popleft())
+                running += 1
+            peak = max(peak, running)
+            if not running: break
+            for x, result, error, start, end in backend.wait():
+                running -= 1
+                times[x] = (start, end)
+                if error is not None:
+                    failed[x] = error   #stop handing out new jobs.
+                    continue
+                results[x] = result
+                for y in G[x]:
+                    indeg[y] -= 1
+                    if indeg[y] == 0:   ready.append(y)
+            if failed and running:      #don't wait on the rest.
+                break
+    finally:
+        backend.shutdown(cancel=bool(failed))
+    return _report(G, t0, results, times, failed, peak)
+
+async def _run_dag_async(G, tasks, indeg):
+    async def job(x):
+        '''same (result, error, start, end) as _run_job(), so failed jobs get times too.'''
+        start = time.time()
+        try:
+            result = tasks[x]()
+            if asyncio.iscoroutine(result):
+                result = await result
+        except Exception as err:
+            return None, err, start, time.time()
+        return result, None, start, time.time()
+
+    t0 = time.time()
+    results, times, failed = {}, {}, {}
+    running = {asyncio.create_task(job(x)): x for x in G if indeg[x] == 0}
+    peak = len(running)
+    while running and not failed:
+        done, pending = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for t in done:
+            x = running.pop(t)
+            result, error, start, end = t.result()
+            times[x] = (start, end)
+            if error is not None:
+                failed[x] = error
+                continue
+            results[x] = result
+            for y in G[x]:
+                indeg[y] -= 1
+                if indeg[y] == 0 and not failed:
+                    running[asyncio.create_task(job(y))] = y
+        peak = max(peak, len(running))
+    for t in running:                   #cancel whatever is still running.
+        t.cancel()
+    await asyncio.gather(*running, return_exceptions=True)
+    return _report(G, t0, results, times, failed, peak)
+
+
+
+cake = {        #steps to make a cake.
+    'buy groceries':    {'mix batter', 'make frosting'},
+    'preheat oven':     {'bake'},
+    'mix batter':       {'bake'},
+    'bake':             {'cool'},
+    'cool':             {'frost cake'},
+    'make frosting':    {'frost cake'},
+    'frost cake':       set()
+}
+
+def _step():
+    time.sleep(0.05)
+    return "done"
+
+async def _async_step():
+    await asyncio.sleep(0.05)
+    return "done"
+
+def _burnt():
+    raise RuntimeError("cake is burnt")
+
+async def _async_burnt():
+    raise RuntimeError("cake is burnt")
+
+def test_run_dag():
+    print("\nrunning test_run_dag()...")
+    for mode in ('thread', 'process', 'asyncio'):
+        step = _async_step if mode == 'asyncio' else _step
+        report = run_dag(cake, {x: step for x in cake}, mode=mode, workers=3)
+        print("%-8s wall: %.2fs peak parallelism: %d" %
+              (mode, report['wall_time'], report['peak_parallelism']))
+        print("%-8s critical path: %s (%.2fs)" %
+              (mode, report['critical_path'], report['critical_time']))
+
+    tasks = {x: _step for x in cake}
+    tasks['bake'] = _burnt
+    report = run_dag(cake, tasks, mode='thread')
+    print("failed:", report['failed'])
+    print("cancelled:", sorted(report['cancelled']))
+
+    for mode in ('thread', 'asyncio'):
+        tasks['bake'] = _async_burnt if mode == 'asyncio' else _burnt
+        report = run_dag(cake, tasks, mode=mode)
+        print("%-8s failed job timed?" % mode, 'bake' in report['times'])
+
+    ran = []
+    looped = {'a': {'b'}, 'b': {'c'}, 'c': {'b'}}
+    for G in (graph_scc, looped, {'a': {'b'}}):
+        try:
+            run_dag(G, {x: (lambda x=x: ran.append(x)) for x in G})
+        except ValueError as err:
+            print("rejected:", err)
+    print("jobs run before rejecting:", ran)
+
+def main():
+    test_run_dag()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+'''
+Delta-stepping single source shortest paths (Meyer & Sanders).
+
+Dijkstra settles ONE node at a time, in strict distance order, so there is
+never more than one node's edges to work on: nothing to do in parallel.
+Delta-stepping relaxes that order a bit: nodes go in BUCKETS of width delta
+(bucket i = tentative distances in [i*delta, (i+1)*delta)), and a whole
+bucket is processed at once.
+
+Edges are split into LIGHT (w <= delta) and HEAVY (w > delta):
+    * a light edge out of bucket i can land back in bucket i, so bucket i is
+      relaxed over its light edges round after round until it stays empty.
+    * a heavy edge always lands in a later bucket, so heavy edges of the
+      nodes that were in bucket i are relaxed only once, after that.
+Each round relaxes the edges of a whole set of nodes in bulk ("requests":
+best (new distance, from) per target), which is the part that can be split
+across workers.
+
+delta trades work against parallelism: delta -> 0 is Dijkstra (one node per
+bucket, no wasted relaxations), delta -> inf is Bellman-Ford (one bucket,
+lots of re-relaxations). The auto delta is max weight / average out degree
+(Meyer & Sanders pick ~1/degree for weights in [0, 1]).
+
+Distances are the same as Dijkstra's, and so is edge_to: on a tie between 2
+equally short parents Dijkstra keeps the one it popped first, i.e. the one
+closer to s, so delta-stepping breaks ties the same way. (Parents that are
+exactly as far from s as each other come out of Dijkstra's heap in no
+particular order, there either answer is right.)
+
+    >>> delta_stepping(adj_list_of_dicts, a)[0][h]
+    6.0
+'''
+
+import multiprocessing as mp
+import time
+from array import array
+
+from graphs import *
+from csr import to_weighted_csr, share_arrays, attach_arrays, release_arrays
+from dijkstra import check_weights
+
+inf = float('inf')
+
+
+def auto_delta(offsets, weights):
+    n = len(offsets) - 1
+    if not len(weights) or max(weights) == 0:
+        return 1.0
+    return max(weights) / max(len(weights) / n, 1.0)
+
+def split_edges(offsets, targets, weights, delta):
+    '''
+    Two CSR graphs (offsets, targets, weights): light edges (w <= delta)
+    and heavy edges (w > delta).
+    '''
+    parts = []
+    for keep in (lambda w: w <= delta, lambda w: w > delta):
+        offs, tgts, wts = array('l', [0]), array('l'), array('d')
+        for x in range(len(offsets) - 1):
+            for k in range(offsets[x], offsets[x+1]):
+                if keep(weights[k]):
+                    tgts.append(targets[k])
+                    wts.append(weights[k])
+            offs.append(len(tgts))
+        parts.append((offs, tgts, wts))
+    return parts
+
+def _requests(offsets, targets, weights, frontier):
+    '''
+    Bulk relax: best (distance, parent's distance, parent) for every target
+    of the edges out of frontier, a list of (node, dist) pairs.
+    '''
+    best = {}
+    for u, du in frontier:
+        for k in range(offsets[u], offsets[u+1]):
+            v = targets[k]
+            nd = du + weights[k]
+            old = best.get(v)
+            if old is None or (nd, du) < old[:2]:
+                best[v] = (nd, du, u)
+    return best
+
+def _relax_loop(conn, handles):
+    blocks, views = attach_arrays(handles)
+    graphs = (views[0:3], views[3:6])       #light, heavy.
+    while True:
+        task = conn.recv()
+        if task is None:    break
+        which, frontier = task
+        conn.send(_requests(*graphs[which], frontier))
+    release_arrays(blocks, views)
+    conn.close()
+
+class _RelaxPool(object):
+    '''worker processes holding the light/heavy graphs in shared memory.'''
+
+    def __init__(self, light, heavy, workers):
+        self.blocks, handles = share_arrays(*light, *heavy)
+        self.conns = []
+        self.procs = []
+        for w in range(workers):
+            parent_end, child_end = mp.Pipe()
+            p = mp.Process(target=_relax_loop, args=(child_end, handles), daemon=True)
+            p.start()
+            child_end.close()
+            self.conns.append(parent_end)
+            self.procs.append(p)
+
+    def requests(self, which, frontier):
+        workers = len(self.conns)
+        for w, conn in enumerate(self.conns):
+            conn.send((which, frontier[w::workers]))
+        best = {}
+        for conn in self.conns:
+            for v, req in conn.recv().items():  #merge: min per target.
+                old = best.get(v)
+                if old is None or req[:2] < old[:2]:
+                    best[v] = req
+        return best
+
+    def close(self):
+        for conn, p in zip(self.conns, self.procs):
+            conn.send(None)
+            p.join()
+            conn.close()
+        release_arrays(self.blocks, unlink=True)
+
+def delta_stepping_csr(offsets, targets, weights, s, delta=None, workers=1,
+                       min_parallel=4096):
+    '''
+    Delta-stepping on CSR arrays (see csr.to_weighted_csr()), nodes are ints.
+
+    @type delta: float
+    @param delta: bucket width > 0, None = auto_delta().
+
+    @type workers: int
+    @param workers: worker processes for the bulk relaxations, 1 = none.
+
+    @type min_parallel: int
+    @param min_parallel: smaller batches of nodes are relaxed in this
+                         process, not worth the trip through the pipes.
+
+    @rtype: tuple
+    @return: (dist, edge_to) arrays, same as dijkstra_csr().
+    '''
+    n = len(offsets) - 1
+    if delta is None:
+        delta = auto_delta(offsets, weights)
+    elif not delta > 0:                 #also catches nan.
+        raise ValueError("delta must be > 0, got %r" % (delta,))
+    light, heavy = split_edges(offsets, targets, weights, delta)
+    graphs = (light, heavy)
+    pool = _RelaxPool(light, heavy, workers) if workers > 1 else None
+
+    dist    = array('d', [inf]) * n
+    edge_to = array('l', [-1]) * n
+    buckets = {0: {s}}
+    dist[s] = 0
+
+    def relax(which, nodes):
+        frontier = [(u, dist[u]) for u in nodes]
+        if pool is not None and len(frontier) >= min_parallel:
+            best = pool.requests(which, frontier)
+        else:
+            best = _requests(*graphs[which], frontier)
+        for v, (nd, du, u) in best.items():
+            old = dist[v]
+            if nd == old and v != s and du < dist[edge_to[v]]:
+                edge_to[v] = u              #tie: keep the parent dijkstra would.
+            elif nd < old:
+                b = int(old // delta) if old < inf else -1
+                if b in buckets:            #move v out of its old bucket.
+                    bucket = buckets[b]
+                    bucket.discard(v)
+                    if not bucket:  del buckets[b]
+                dist[v] = nd
+                edge_to[v] = u
+                buckets.setdefault(int(nd // delta), set()).add(v)
+
+    try:
+        while buckets:
+            i = min(buckets)
+            settled = set()
+            while i in buckets:             #light edges can refill bucket i.
+                frontier = buckets.pop(i)
+                settled |= frontier
+                relax(0, frontier)
+            relax(1, settled)               #heavy edges land in later buckets.
+    finally:
+        if pool is not None:
+            pool.close()
+    return dist, edge_to
+
+def delta_stepping(G, s, delta=None, workers=1):
+    '''
+    Single source shortest paths from s, like dijkstra.shortest_paths().
+
+    @type G: list of dicts, dict of dicts, or weighted adj matrix
+    @param G: the weighted graph, no negative weights.
+
+    @rtype: tuple
+    @return: (dist, edge_to) dicts over the nodes reached from s.
+    '''
+    nodes, index, offsets, targets, weights = to_weighted_csr(G)
+    check_weights(weights)
+    dist_arr, edge_arr = delta_stepping_csr(offsets, targets, weights, index[s], delta, workers)
+
+    dist    = {s: dist_arr[index[s]]}
+    edge_to = {s: None}
+    for i in range(len(nodes)):
+        if edge_arr[i] >= 0 and nodes[i] != s:
+            dist[nodes[i]]    = dist_arr[i]
+            edge_to[nodes[i]] = nodes[edge_arr[i]]
+    return dist, edge_to
+
+def is_shortest_path_tree(G, dist, edge_to):
+    '''every parent edge is tight: dist[parent] + w(parent, x) == dist[x].'''
+    return all(p is None or dist[p] + G[p][x] == dist[x] for x, p in edge_to.items())
+
+
+
+def test_delta_stepping():
+    print("\nrunning test_delta_stepping()...")
+    from dijkstra import shortest_paths
+    expected = shortest_paths(adj_list_of_dicts, a)
+    for delta in (None, 1, 3, 100):
+        dist, edge_to = delta_stepping(adj_list_of_dicts, a, delta)
+        print("delta=%-4s dist:" % delta, [dist[x] for x in range(8)],
+              "same as dijkstra?", dist == expected[0],
+              "valid tree?", is_shortest_path_tree(adj_list_of_dicts, dist, edge_to))
+    dist, edge_to = delta_stepping(adj_list_of_dicts, a, delta=2, workers=2)
+    print("2 workers same?", dist == expected[0])
+    for delta in (0, -1):
+        try:
+            delta_stepping(adj_list_of_dicts, a, delta)
+        except ValueError as err:
+            print("delta=%s:" % delta, err)
+
+def bench_delta_stepping(n=50000, m=200000):
+    from dijkstra import shortest_paths
+    print("\nrunning bench_delta_stepping()...")
+    G = random_weighted_graph(n, m, max_weight=1000, seed=8)
+    start = time.time()
+    expected = shortest_paths(G, 0)
+    print("dijkstra:             %.3fs" % (time.time() - start))
+    nodes, index, offsets, targets, weights = to_weighted_csr(G)
+    print("auto delta: %.1f" % auto_delta(offsets, weights))
+    for delta, workers in ((None, 1), (50, 1), (1000, 1), (None, 2), (None, 4)):
+        start = time.time()
+        dist, edge_to = delta_stepping(G, 0, delta, workers)
+        print("delta=%-4s workers=%d: %.3fs, same dist? %s, same edge_to? %s, valid tree? %s" %
+              (delta, workers, time.time() - start, dist == expected[0],
+               edge_to == expected[1], is_shortest_path_tree(G, dist, edge_to)))
+
+def main():
+    test_delta_stepping()
+    bench_delta_stepping()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+'''
+Dijkstra's single source shortest path alg for WEIGHTED graphs (no negative
+edge weights, use Bellman-Ford for those).
+
+BFS finds shortest paths when every edge costs the same. With weights we
+replace BFS's queue with a PRIORITY queue keyed on the distance from s found
+so far, and always explore the closest unfinished node next:
+
+    dist[s] = 0, every other dist = inf
+    while the frontier isn't empty:
+        x = frontier node with smallest dist      (x is now final)
+        for every edge x -> y with weight w:
+            if dist[x] + w < dist[y]:              ("relax" the edge)
+                dist[y] = dist[x] + w
+                edge_to[y] = x
+
+The priority queue is pluggable, they all offer update(key, priority) and
+pop() -> (key, priority):
+    * 'heapq': python's binary heap + lazy deletion (an improved distance is
+               pushed as a new entry, stale ones are skipped when popped).
+               O(|E| log |E|), but heapq is written in C so it's hard to beat.
+    * 'dary':  IndexedHeap (indexed_heap.py), real decrease-key so the heap
+               never holds more than |V| entries. O(|E| log_d |V|).
+    * 'radix': RadixHeap (radix_heap.py), integer weights only.
+               O(|E| + |V| log C), C = max weight.
+    * 'dial':  BucketQueue (bucket_queue.py), small integer weights only.
+               O(|E| + C*|V|).
+    * 'auto':  (default) dial, radix or heapq depending on the weights,
+               see choose_heap().
+Which one is fastest depends on the graph (and on python's overhead, since
+only heapq is in C). pick_heap() times them on your graph.
+
+Graphs can be adj_list_of_dicts style (list of dicts or dict of dicts, G[x][y]
+is the weight) or adj_matrix_directed_weighted style (inf means no edge).
+
+    >>> find_path(adj_list_of_dicts, dijkstra, a, h)   #same as bfs/dfs.
+    (0, 5, 7)
+    >>> shortest_path(adj_list_of_dicts, a, h)
+    (6.0, (0, 5, 7))
+'''
+
+import heapq
+import time
+from array import array
+
+from graphs import *
+from bfs import find_path
+from csr import to_weighted_csr
+from indexed_heap import IndexedHeap
+from radix_heap import RadixHeap
+from bucket_queue import BucketQueue
+
+inf = float('inf')
+
+
+class LazyHeap(object):
+    '''heapq with lazy deletion, same update()/pop() API as the others.'''
+
+    def __init__(self):
+        self.heap = []
+        self.best = {}          #key -> current priority (keys still queued).
+
+    def __len__(self):
+        return len(self.best)
+
+    def update(self, key, priority):
+        old = self.best.get(key)
+        if old is None or priority < old:
+            self.best[key] = priority
+            heapq.heappush(self.heap, (priority, key))
+
+    def pop(self):
+        heap, best = self.heap, self.best
+        while True:
+            priority, key = heapq.heappop(heap)
+            if best.get(key) == priority:   #else a stale entry, skip.
+                del best[key]
+                return key, priority
+
+HEAPS = {       #name -> function(number of nodes, max edge weight).
+    'heapq': lambda n, W: LazyHeap(),
+    'dary':  lambda n, W: IndexedHeap(n, d=4),
+    'radix': lambda n, W: RadixHeap(),
+    'dial':  lambda n, W: BucketQueue(W),
+}
+
+DIAL_MAX_WEIGHT  = 64       #above this, walking empty buckets costs too much.
+RADIX_MAX_WEIGHT = 4096     #above this, heapq (in C) wins in bench_dijkstra().
+
+def is_integral(weights):
+    return all(w == int(w) for w in weights)
+
+def check_weights(weights, heap='heapq'):
+    '''Dijkstra can't do negative weights, radix/dial need integers.'''
+    if len(weights) and min(weights) < 0:
+        raise ValueError("negative edge weight, use Bellman-Ford instead")
+    if heap in ('radix', 'dial') and not is_integral(weights):
+        raise ValueError("%s queue needs integer edge weights" % heap)
+
+def choose_heap(weights):
+    '''
+    'auto' heap: Dial's bucket queue for small integer weights, radix heap
+    for medium integer weights, heapq otherwise.
+    '''
+    if not is_integral(weights):
+        return 'heapq'
+    W = max(weights, default=0)
+    if W <= DIAL_MAX_WEIGHT:
+        return 'dial'
+    if W <= RADIX_MAX_WEIGHT:
+        return 'radix'
+    return 'heapq'
+
+def dijkstra_csr(offsets, targets, weights, s, heap='auto', target=None):
+    '''
+    Dijkstra on CSR arrays (see csr.to_weighted_csr()), nodes are ints.
+
+    @type heap: string
+    @param heap: 'heapq', 'dary', 'radix', 'dial' or 'auto' (choose_heap()).
+
+    @type target: int
+    @param target: if given, stop as soon as target's distance is final.
+
+    @rtype: tuple
+    @return: (dist, edge_to) arrays, dist[x] = inf and edge_to[x] = -1 for
+             nodes that weren't reached. with a target, only target and the
+             nodes popped before it are final, the rest are upper bounds.
+    '''
+    n = len(offsets) - 1
+    dist    = array('d', [inf]) * n
+    edge_to = array('l', [-1]) * n
+    if heap == 'auto':
+        heap = choose_heap(weights)
+    frontier = HEAPS[heap](n, max(weights, default=0))
+
+    dist[s] = 0
+    frontier.update(s, 0)
+    while len(frontier):
+        x, d = frontier.pop()
+        if x == target:     break           #early exit, t is final.
+        for k in range(offsets[x], offsets[x+1]):
+            y = targets[k]
+            nd = d + weights[k]
+            if nd < dist[y]:                #relax edge x -> y.
+                dist[y] = nd
+                edge_to[y] = x
+                frontier.update(y, nd)
+    return dist, edge_to
+
+
+
+def shortest_paths(G, s, heap='auto', target=None):
+    '''
+    Single source shortest paths from s.
+
+    @type G: list of dicts, dict of dicts, or weighted adj matrix
+    @param G: the weighted graph.
+
+    @type s: node name
+    @param s: source/starting node.
+
+    @rtype: tuple
+    @return: (dist, edge_to) dicts over the nodes reached from s. edge_to is
+             the same predecessor map bfs() returns ({s: None, ...}).
+    '''
+    nodes, index, offsets, targets, weights = to_weighted_csr(G)
+    check_weights(weights, heap)
+    t = index[target] if target is not None else None
+    dist_arr, edge_arr = dijkstra_csr(offsets, targets, weights, index[s], heap, t)
+
+    dist    = {s: dist_arr[index[s]]}
+    edge_to = {s: None}
+    for i in range(len(nodes)):
+        if edge_arr[i] >= 0:
+            dist[nodes[i]]    = dist_arr[i]
+            edge_to[nodes[i]] = nodes[edge_arr[i]]
+    return dist, edge_to
+
+def dijkstra(G, s):
+    '''
+    Same signature as bfs(G, s), so find_path(G, dijkstra, s, t) works.
+
+    @rtype: dict
+    @return: edge_to, predecessor of every node on its shortest path from s.
+    '''
+    return shortest_paths(G, s)[1]
+
+def shortest_path(G, s, t, heap='auto'):
+    '''
+    Point to point: stops as soon as t is reached.
+
+    @rtype: tuple
+    @return: (distance, path) with path a tuple of nodes like find_path()
+             returns, or (inf, None) if t can't be reached.
+    '''
+    dist, edge_to = shortest_paths(G, s, heap, target=t)
+    if t not in edge_to:
+        return inf, None
+    path = [t]
+    while edge_to[path[-1]] is not None:
+        path.append(edge_to[path[-1]])
+    path.reverse()
+    return dist[t], tuple(path)
+
+
+
+def pick_heap(G, sources=3, heaps=None):
+    '''
+    Benchmark every usable heap on G (Dijkstra from a few sources) and
+    return the fastest one's name plus all the timings.
+
+    @rtype: tuple
+    @return: (best heap name, {heap name: seconds})
+    '''
+    nodes, index, offsets, targets, weights = to_weighted_csr(G)
+    check_weights(weights)
+    if heaps is None:
+        heaps = ['heapq', 'dary']
+        if is_integral(weights):
+            heaps.append('radix')
+            if max(weights, default=0) <= 10 * DIAL_MAX_WEIGHT:
+                heaps.append('dial')
+
+    step = max(len(nodes) // sources, 1)
+    timings = {}
+    for heap in heaps:
+        start = time.time()
+        for s in range(0, len(nodes), step)[:sources]:
+            dijkstra_csr(offsets, targets, weights, s, heap)
+        timings[heap] = time.time() - start
+    return min(timings, key=timings.get), timings
+
+
+
+def test_dijkstra():
+    print("\nrunning test_dijkstra()...")
+    print("a -> h:", find_path(adj_list_of_dicts, dijkstra, a, h))
+    print("h -> a:", find_path(adj_list_of_dicts, dijkstra, h, a))     #no path.
+    for heap in HEAPS:
+        dist, edge_to = shortest_paths(adj_list_of_dicts, a, heap)
+        print("%-5s dist from a:" % heap, [dist[x] for x in range(8)])
+    print("matrix dist from a:",
+          [shortest_paths(adj_matrix_directed_weighted, a)[0][x] for x in range(8)])
+    print("a -> h:", shortest_path(adj_list_of_dicts, a, h, heap='dary'))
+    print("b -> d:", shortest_path(adj_list_of_dicts, b, d, heap='radix'))
+    print("h -> a:", shortest_path(adj_list_of_dicts, h, a))
+
+def bench_dijkstra():
+    print("\nrunning bench_dijkstra()...")
+    shapes = (("sparse", 50000, 200000, 9),
+              ("dense", 2000, 400000, 9),
+              ("weights 500", 50000, 200000, 500),
+              ("wide weights", 50000, 200000, 10**6))
+    for name, n, m, max_weight in shapes:
+        G = random_weighted_graph(n, m, max_weight, seed=1)
+        best, timings = pick_heap(G)
+        print("%-12s n=%d m=%d: auto %-5s best %-5s %s" % (name, n, m,
+              choose_heap(to_weighted_csr(G)[4]), best,
+              ", ".join("%s %.3fs" % item for item in sorted(timings.items()))))
+
+def main():
+    test_dijkstra()
+    bench_dijkstra()
+
+if __name__ == "__main__":
+    main()
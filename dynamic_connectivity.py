@@ -0,0 +1,364 @@
+'''
+Fully dynamic connectivity for an UNDIRECTED graph: insert_edge(),
+delete_edge() and connected(u, v), all in any order.
+
+Union-find (union_find.py) only ever merges sets, it can't split one when an
+edge goes away; recomputing components with bfs() after every deletion is
+O(|V| + |E|) per deletion. This is Holm, de Lichtenberg & Thorup (HDT):
+O(lg^2 |V|) amortized per update, O(lg |V|) per query.
+
+Idea: keep a SPANNING FOREST F of the graph. u and v are connected iff they
+are in the same tree of F. Inserting an edge is easy (link 2 trees, or keep
+it as a non-tree edge). Deleting a non-tree edge changes nothing. Deleting a
+TREE edge splits its tree in 2, and we have to look for a REPLACEMENT: a
+non-tree edge with one end in each half.
+
+To not look at the same non-tree edges over and over, every edge has a
+LEVEL 0..lg |V|, and F_i = the tree edges of level >= i (F_0 = F). A tree of
+F_i never has more than |V| / 2^i nodes. When searching at level i we look
+at the SMALLER half only (<= half the nodes): its level i tree edges and
+every level i non-tree edge we try and fail with go up to level i+1 (which
+still fits the size rule b/c the small half is small). An edge only goes up,
+at most lg |V| times, which pays for all the failed searches.
+
+Every F_i is stored as EULER TOUR trees: a tree is the sequence of its nodes
+and its edges in DFS order (each edge twice, once each way), kept in a treap
+(randomized balanced BST by position). Then
+    * link/cut of trees = a few splits and merges of sequences, O(lg n).
+    * connected(u, v) = are u and v in the same treap (same root).
+    * every treap node also knows if its subtree has a level i tree edge /
+      a node with level i non-tree edges, to find them in O(lg n).
+
+Nodes are ints 0..n-1.
+
+    >>> dc = DynamicConnectivity(4)
+    >>> dc.insert_edge(0, 1); dc.insert_edge(1, 2); dc.insert_edge(2, 0)
+    >>> dc.delete_edge(0, 1)
+    >>> dc.connected(0, 1)          #still connected through 2.
+    True
+'''
+
+import time
+from random import Random
+
+from graphs import *
+
+_rng = Random(0)
+
+
+class _Node(object):
+    '''treap node for one vertex or one directed tree arc of an Euler tour.'''
+
+    __slots__ = ('key', 'prio', 'left', 'right', 'parent', 'size', 'verts',
+                 'own_t', 'own_n', 'agg_t', 'agg_n')
+
+    def __init__(self, key, vertex):
+        self.key    = key           #vertex id, or (a, b) for an arc.
+        self.prio   = _rng.random()
+        self.left   = self.right = self.parent = None
+        self.size   = 1             #nodes in subtree (positions).
+        self.verts  = 1 if vertex else 0
+        self.own_t  = False         #arc of a tree edge whose level == this forest's.
+        self.own_n  = False         #vertex with non-tree edges at this level.
+        self.agg_t  = False         #own_t anywhere in subtree.
+        self.agg_n  = False
+
+def _update(t):
+    l, r = t.left, t.right
+    t.size  = 1 + (l.size if l else 0) + (r.size if r else 0)
+    t.verts = (1 if type(t.key) == int else 0) + (l.verts if l else 0) + (r.verts if r else 0)
+    t.agg_t = t.own_t or (l is not None and l.agg_t) or (r is not None and r.agg_t)
+    t.agg_n = t.own_n or (l is not None and l.agg_n) or (r is not None and r.agg_n)
+
+def _fix_up(t):
+    '''own flags of t changed: recompute aggregates up to the root.'''
+    while t is not None:
+        _update(t)
+        t = t.parent
+
+def _root(t):
+    while t.parent is not None:
+        t = t.parent
+    return t
+
+def _index(t):
+    '''position of t in its sequence.'''
+    k = t.left.size if t.left else 0
+    while t.parent is not None:
+        if t is t.parent.right:
+            k += (t.parent.left.size if t.parent.left else 0) + 1
+        t = t.parent
+    return k
+
+def _split(t, k):
+    '''sequence t -> (first k nodes, the rest).'''
+    if t is None:
+        return None, None
+    ls = t.left.size if t.left else 0
+    if k <= ls:
+        a, b = _split(t.left, k)
+        t.left = b
+        if b is not None:   b.parent = t
+        _update(t)
+        if a is not None:   a.parent = None
+        t.parent = None
+        return a, t
+    a, b = _split(t.right, k - ls - 1)
+    t.right = a
+    if a is not None:   a.parent = t
+    _update(t)
+    if b is not None:   b.parent = None
+    t.parent = None
+    return t, b
+
+def _merge(a, b):
+    '''sequence a followed by sequence b.'''
+    if a is None:   return b
+    if b is None:   return a
+    if a.prio > b.prio:
+        a.right = _merge(a.right, b)
+        a.right.parent = a
+        _update(a)
+        a.parent = None
+        return a
+    b.left = _merge(a, b.left)
+    b.left.parent = b
+    _update(b)
+    b.parent = None
+    return b
+
+def _reroot(t):
+    '''rotate the tour of t's tree so it starts at t.'''
+    a, b = _split(_root(t), _index(t))
+    return _merge(b, a)
+
+def _find(t, flag):
+    '''any node in subtree t with own flag set ('t' or 'n'), or None.'''
+    own, agg = 'own_' + flag, 'agg_' + flag
+    while t is not None:
+        if getattr(t, own):     return t
+        if t.left is not None and getattr(t.left, agg):
+            t = t.left
+        elif t.right is not None and getattr(t.right, agg):
+            t = t.right
+        else:
+            return None
+    return None
+
+
+
+class DynamicConnectivity(object):
+
+    def __init__(self, n):
+        '''
+        @type n: int
+        @param n: nodes are range(n), no edges to start with.
+        '''
+        self.n = n
+        self.levels  = max(n, 2).bit_length()
+        self.vnode   = [{} for i in range(self.levels)]     #level -> vertex -> _Node
+        self.arcs    = [{} for i in range(self.levels)]     #level -> (a, b) -> 2 arcs
+        self.nontree = [{} for i in range(self.levels)]     #level -> vertex -> set
+        self.edges   = {}       #(a, b), a < b -> [level, is tree edge]
+
+    def _vertex(self, i, x):
+        node = self.vnode[i].get(x)
+        if node is None:
+            node = self.vnode[i][x] = _Node(x, True)
+        return node
+
+    def _link(self, i, a, b):
+        '''join the trees of a and b in F_i with tree edge a-b.'''
+        ta = _reroot(self._vertex(i, a))
+        tb = _reroot(self._vertex(i, b))
+        ab, ba = _Node((a, b), False), _Node((b, a), False)
+        self.arcs[i][(a, b) if a < b else (b, a)] = (ab, ba)
+        _merge(_merge(_merge(ta, ab), tb), ba)
+        return ab
+
+    def _cut(self, i, a, b):
+        '''remove tree edge a-b from F_i, splitting its tree in 2.'''
+        x, y = self.arcs[i].pop((a, b) if a < b else (b, a))
+        p, q = _index(x), _index(y)
+        if p > q:
+            p, q = q, p
+        before, rest = _split(_root(x), p)
+        arc, rest = _split(rest, 1)
+        middle, rest = _split(rest, q - p - 1)      #one side's whole tour.
+        arc, after = _split(rest, 1)
+        _merge(before, after)
+
+    def _set_tree_flag(self, i, key, value):
+        arc = self.arcs[i][key][0]
+        arc.own_t = value
+        _fix_up(arc)
+
+    def _set_nontree_flag(self, i, x):
+        node = self._vertex(i, x)
+        node.own_n = bool(self.nontree[i].get(x))
+        _fix_up(node)
+
+    def _add_nontree(self, i, a, b):
+        self.nontree[i].setdefault(a, set()).add(b)
+        self.nontree[i].setdefault(b, set()).add(a)
+        self._set_nontree_flag(i, a)
+        self._set_nontree_flag(i, b)
+
+    def _remove_nontree(self, i, a, b):
+        self.nontree[i][a].discard(b)
+        self.nontree[i][b].discard(a)
+        self._set_nontree_flag(i, a)
+        self._set_nontree_flag(i, b)
+
+    def connected(self, u, v):
+        if u == v:
+            return True
+        nu, nv = self.vnode[0].get(u), self.vnode[0].get(v)
+        return nu is not None and nv is not None and _root(nu) is _root(nv)
+
+    def component_size(self, u):
+        node = self.vnode[0].get(u)
+        return _root(node).verts if node is not None else 1
+
+    def has_edge(self, u, v):
+        return ((u, v) if u < v else (v, u)) in self.edges
+
+    def insert_edge(self, u, v):
+        '''add undirected edge u-v (no-op if it's already there or u == v).'''
+        key = (u, v) if u < v else (v, u)
+        if u == v or key in self.edges:
+            return
+        if self.connected(u, v):
+            self.edges[key] = [0, False]
+            self._add_nontree(0, u, v)
+        else:
+            self.edges[key] = [0, True]
+            self._link(0, u, v)
+            self._set_tree_flag(0, key, True)
+
+    def delete_edge(self, u, v):
+        '''remove undirected edge u-v (no-op if it isn't there).'''
+        key = (u, v) if u < v else (v, u)
+        if key not in self.edges:
+            return
+        level, is_tree = self.edges.pop(key)
+        if not is_tree:
+            self._remove_nontree(level, u, v)
+            return
+
+        for i in range(level + 1):
+            self._cut(i, u, v)
+        for i in range(level, -1, -1):
+            ru, rv = _root(self._vertex(i, u)), _root(self._vertex(i, v))
+            small = ru if ru.verts <= rv.verts else rv
+
+            #level i tree edges of the small half go up a level.
+            while small.agg_t:
+                arc = _find(small, 't')
+                a, b = arc.key
+                e = (a, b) if a < b else (b, a)
+                arc.own_t = False
+                _fix_up(arc)
+                self.edges[e][0] = i + 1
+                self._link(i + 1, a, b)
+                self._set_tree_flag(i + 1, e, True)
+
+            #try the small half's level i non-tree edges.
+            while small.agg_n:
+                x = _find(small, 'n').key
+                for y in list(self.nontree[i][x]):
+                    e = (x, y) if x < y else (y, x)
+                    self._remove_nontree(i, x, y)
+                    if _root(self._vertex(i, y)) is not small:      #replacement!
+                        self.edges[e] = [i, True]
+                        for j in range(i + 1):
+                            self._link(j, x, y)
+                        self._set_tree_flag(i, e, True)
+                        return
+                    self.edges[e][0] = i + 1        #both ends in small: go up.
+                    self._add_nontree(i + 1, x, y)
+
+
+
+def components_by_bfs(G):
+    '''label every node with its component, one bfs() per component.'''
+    from bfs import bfs
+    label = {}
+    for s in range(len(G)):
+        if s in label:  continue
+        for x in bfs(G, s):
+            label[x] = s
+    return label
+
+def test_dynamic_connectivity():
+    print("\nrunning test_dynamic_connectivity()...")
+    dc = DynamicConnectivity(8)
+    for u, v in [(0, 1), (1, 2), (2, 0), (2, 3), (4, 5), (5, 6), (6, 4), (3, 4)]:
+        dc.insert_edge(u, v)
+    print("0~6?", dc.connected(0, 6), "size(0):", dc.component_size(0))
+    dc.delete_edge(3, 4)
+    print("delete 3-4: 0~6?", dc.connected(0, 6), "size(0):", dc.component_size(0))
+    dc.delete_edge(0, 1)
+    print("delete 0-1: 0~1?", dc.connected(0, 1), "(through 2)")
+    dc.delete_edge(1, 2)
+    print("delete 1-2: 0~1?", dc.connected(0, 1), "0~2?", dc.connected(0, 2))
+    dc.insert_edge(1, 6)
+    print("insert 1-6: 1~4?", dc.connected(1, 4), "7 alone?", dc.component_size(7) == 1)
+
+def bench_dynamic_connectivity(n=2000, m=3000, updates=1000, queries=5):
+    '''random deletions/insertions, compare answers with bfs() recomputation.'''
+    print("\nrunning bench_dynamic_connectivity()...")
+    rng = Random(14)
+    G = [set() for x in range(n)]
+    dc = DynamicConnectivity(n)
+    edges = set()
+    while len(edges) < m:
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v and (v, u) not in edges:
+            edges.add((u, v))
+    edges = list(edges)
+    for u, v in edges:
+        G[u].add(v)
+        G[v].add(u)
+        dc.insert_edge(u, v)
+
+    ops = []
+    for i in range(updates):
+        if i % 2 == 0:
+            ops.append(('delete', edges.pop(rng.randrange(len(edges)))))
+        else:
+            u, v = rng.randrange(n), rng.randrange(n)
+            edges.append((u, v))
+            ops.append(('insert', (u, v)))
+    asks = [[(rng.randrange(n), rng.randrange(n)) for j in range(queries)] for i in range(updates)]
+
+    start = time.time()
+    fast = []
+    for (op, (u, v)), qs in zip(ops, asks):
+        if op == 'delete':  dc.delete_edge(u, v)
+        else:               dc.insert_edge(u, v)
+        fast.extend(dc.connected(x, y) for x, y in qs)
+    t_fast = time.time() - start
+
+    start = time.time()
+    slow = []
+    for (op, (u, v)), qs in zip(ops, asks):
+        if op == 'delete':
+            G[u].discard(v)
+            G[v].discard(u)
+        elif u != v:
+            G[u].add(v)
+            G[v].add(u)
+        label = components_by_bfs(G)
+        slow.extend(label[x] == label[y] for x, y in qs)
+    t_slow = time.time() - start
+    print("%d updates + %d queries on n=%d m=%d:" % (updates, updates * queries, n, m))
+    print("HDT: %.3fs (%.3f ms/update), bfs recompute: %.3fs, same answers? %s" %
+          (t_fast, 1000 * t_fast / updates, t_slow, fast == slow))
+
+def main():
+    test_dynamic_connectivity()
+    bench_dynamic_connectivity()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+'''
+Floyd-Warshall all pairs shortest paths on an adjacency matrix like
+adj_matrix_directed_weighted (inf = no edge, 0 on the diagonal).
+
+dist starts as the matrix. For every node k in turn, allow k as an
+intermediate node: for every pair i, j
+    dist[i][j] = min(dist[i][j], dist[i][k] + dist[k][j])
+After k = n-1 all intermediates are allowed, so dist is the shortest path
+matrix. O(|V|^3) time, O(|V|^2) mem. Negative edges are fine, a negative
+cycle shows up as dist[i][i] < 0.
+
+The j loop is done a whole row at a time ("min-plus" row update):
+    dist[i] = elementwise min(dist[i], dist[i][k] + dist[k])
+with a list comprehension over zip(), which is much faster than indexing
+every cell from python. Rows with dist[i][k] = inf can't change and are
+skipped.
+
+block: the blocked (tiled) version takes the k's a block of b at a time.
+First the b rows of the block do plain Floyd-Warshall among themselves for
+those k's, after that they're final for the block, and every other row i
+applies all b of them in one go. So each row is walked once per block
+instead of once per k, and the b "k rows" stay hot in cache while the other
+rows stream past. Same result, every value is still the length of a real
+path and at least as short as the unblocked one.
+
+next_hop: also keep nxt[i][j] = the node after i on the shortest path to j
+(-1 if there's no path), updated as nxt[i][j] = nxt[i][k] whenever going
+through k wins. fw_path() walks it to get the path.
+
+typecode='f' stores rows as float32: half the memory of 'd' (float64),
+exact for integer distances below 2**24.
+
+    >>> dist, nxt = floyd_warshall(adj_matrix_directed_weighted, next_hop=True)
+    >>> dist[a][h], fw_path(nxt, a, h)
+    (6.0, (0, 5, 7))
+'''
+
+import time
+from array import array
+
+from graphs import *
+
+inf = float('inf')
+
+
+def _relax_row(Di, dik, Dk, typecode):
+    '''min-plus update of row i through k.'''
+    return array(typecode, [x if x <= y else y for x, y in zip(Di, map(dik.__add__, Dk))])
+
+def floyd_warshall(M, next_hop=False, typecode='d', block=None):
+    '''
+    All pairs shortest paths.
+
+    @type M: list of lists
+    @param M: n x n weighted adj matrix, inf = no edge.
+
+    @type next_hop: bool
+    @param next_hop: also return the next hop matrix for fw_path().
+
+    @type typecode: string
+    @param typecode: 'd' (float64) or 'f' (float32).
+
+    @type block: int
+    @param block: k's per block for the blocked version, None = unblocked.
+
+    @rtype: tuple
+    @return: (dist, nxt): lists of n arrays (rows). nxt is None unless
+             next_hop is set.
+    '''
+    n = len(M)
+    dist = [array(typecode, row) for row in M]
+    for i in range(n):
+        if dist[i][i] > 0:  dist[i][i] = 0
+    nxt = None
+    if next_hop:
+        nxt = [array('l', [j if dist[i][j] < inf else -1 for j in range(n)]) for i in range(n)]
+
+    b = block or n
+    for lo in range(0, n, b):
+        ks = range(lo, min(lo + b, n))
+        #the block's own rows first, so they're final for these k's...
+        for k in ks:
+            for i in ks:
+                _relax(dist, nxt, i, k, typecode)
+        #...then every other row takes all of them.
+        for i in range(n):
+            if lo <= i < lo + b:    continue
+            for k in ks:
+                _relax(dist, nxt, i, k, typecode)
+    return dist, nxt
+
+def _relax(dist, nxt, i, k, typecode):
+    Di = dist[i]
+    dik = Di[k]
+    if dik == inf or i == k:    return
+    if nxt is None:
+        dist[i] = _relax_row(Di, dik, dist[k], typecode)
+        return
+    Dk, Ni = dist[k], nxt[i]
+    hop = Ni[k]
+    new = _relax_row(Di, dik, Dk, typecode)
+    for j, (x, y) in enumerate(zip(new, Di)):
+        if x < y:   Ni[j] = hop
+    dist[i] = new
+
+def fw_path(nxt, i, j):
+    '''
+    @rtype: tuple
+    @return: shortest path from i to j as a tuple of nodes like find_path()
+             returns, or None if there is no path.
+    '''
+    if nxt[i][j] < 0:
+        return None
+    path = [i]
+    while i != j:
+        i = nxt[i][j]
+        path.append(i)
+    return tuple(path)
+
+def has_negative_cycle(dist):
+    return any(dist[i][i] < 0 for i in range(len(dist)))
+
+
+
+def test_floyd_warshall():
+    print("\nrunning test_floyd_warshall()...")
+    M = adj_matrix_directed_weighted
+    dist, nxt = floyd_warshall(M, next_hop=True)
+    print("dist from a:", list(dist[a]))
+    print("a -> h:", dist[a][h], fw_path(nxt, a, h))
+    print("h -> a:", dist[h][a], fw_path(nxt, h, a))
+    blocked, nxt3 = floyd_warshall(M, next_hop=True, typecode='f', block=3)
+    print("blocked float32 same?", [list(r) for r in blocked] == [list(r) for r in dist],
+          "same paths?", fw_path(nxt3, a, h) == fw_path(nxt, a, h))
+
+    neg = [list(row) for row in M]
+    neg[h][a] = -20                         #a -> ... -> h -> a is now negative.
+    print("negative cycle?", has_negative_cycle(floyd_warshall(M)[0]),
+          has_negative_cycle(floyd_warshall(neg)[0]))
+
+def bench_floyd_warshall(n=200, m=2000):
+    from dijkstra import shortest_paths
+    print("\nrunning bench_floyd_warshall()...")
+    G = random_weighted_graph(n, m, seed=5)
+    M = [[inf] * n for i in range(n)]
+    for x in range(n):
+        M[x][x] = 0
+        for y, w in G[x].items():
+            M[x][y] = min(M[x][y], w)
+    expected = shortest_paths(G, 0)[0]
+    for block, typecode, next_hop in ((None, 'd', False), (32, 'd', False),
+                                      (32, 'f', False), (32, 'd', True)):
+        start = time.time()
+        dist, nxt = floyd_warshall(M, next_hop, typecode, block)
+        elapsed = time.time() - start
+        same = all(dist[0][x] == d for x, d in expected.items())
+        print("block=%-4s %s next_hop=%-5s: %.3fs, %d bytes, row 0 same as dijkstra? %s" %
+              (block, typecode, next_hop, elapsed, sum(len(r) * r.itemsize for r in dist), same))
+
+def main():
+    test_floyd_warshall()
+    bench_floyd_warshall()
+
+if __name__ == "__main__":
+    main()
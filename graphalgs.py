@@ -82,12 +82,22 @@ def traverse(G, s, storage=set()):
 
     If you use queue for storage, traversal turns into BFS.
     If you use stack for storage, traversal turns into DFS.
+    If you use a PRIORITY queue keyed on the distance from s (anything with
+    push/update(key, priority) and pop() -> (key, priority), e.g.
+    BucketQueue from bucket_queue.py, RadixHeap from radix_heap.py), G has to
+    be weighted (G[x][y] = edge weight) and traversal turns into Dijkstra:
+    always explore the closest node next, re-queue a node when a shorter way
+    to it shows up. Those two queues take integer weights only (ValueError
+    otherwise).
 
     Default is to use list as a stack. Using set is faster to check for
     membership, but it doesn't have the same API functions as list(), deque().
 
     Forget BFS for now.
     '''
+    if hasattr(storage, 'push'):                #priority queue.
+        return _traverse_by_distance(G, s, storage)
+
     to_explore = storage    
     to_explore.add(s)
 
@@ -103,16 +113,43 @@ def traverse(G, s, storage=set()):
             #visited.append(y)              #we know this scc, skip in future.
 
     return predecessors
-def test_traverse():
-    predecessors = traverse(graph3, 'a')
-    x = 'h'
-    path = [x]
-    while predecessors[x] is not None:  #walk backwards from t to s.
-        path.append(predecessors[x])
-        x = predecessors[x]
-    path.reverse()
-    print("test traversal path:", path)
+def _traverse_by_distance(G, s, to_explore):
+    '''traverse() with a priority queue for storage, see above.'''
+    to_explore.update(s, 0)
+
+    dist = {s: 0}
+    predecessors = {s: None}
+
+    while len(to_explore):
+        x, d = to_explore.pop()
+        for y, w in G[x].items():
+            if y in dist and dist[y] <= d + w:  continue    #no better, skip.
 
+            dist[y] = d + w
+            predecessors[y] = x
+            to_explore.update(y, d + w)
+
+    return predecessors
+def test_traverse():
+    from graphs import graph3, adj_list_of_dicts, a, h
+    from bucket_queue import BucketQueue
+    for name, G, s, t, storage in (("", graph3, 'a', 'h', set()),
+                                   (" (bucket queue)", adj_list_of_dicts, a, h, BucketQueue(max_weight=9))):
+        predecessors = traverse(G, s, storage)
+        x = t
+        path = [x]
+        while predecessors[x] is not None:  #walk backwards from t to s.
+            path.append(predecessors[x])
+            x = predecessors[x]
+        path.reverse()
+        print("test traversal path%s:" % name, path)
+    from radix_heap import RadixHeap
+    halves = {'s': {'a': 0.5, 'b': 0.9}, 'a': {'b': 0.5}, 'b': {}}
+    for storage in (BucketQueue(max_weight=1), RadixHeap()):
+        try:
+            traverse(halves, 's', storage)
+        except ValueError as err:
+            print("non-integer weights:", err)
 
 
 
@@ -165,7 +202,7 @@ def test_iterative_bfs():
 
 
 def main():
-    #test_traverse()
+    test_traverse()
 
     #test_recursive_dfs()   #a little buggy, path has extra nodes.
     #test_iterative_dfs()   #a little buggy, path has extra nodes.
@@ -14,6 +14,7 @@ There are also other more complicated representations:
     edge lists or edge sets
     incidence matrices
     incidence list
+    CSR (compressed sparse row): 2 flat int arrays, see csr.py.
 
 
 Traversal and exploration:
@@ -262,3 +263,63 @@ graph_scc = {       #2 scc's {a,b,c} and {d,e,f,g,}
     'h': set('')
 }
 
+
+
+def random_graph(n, m, seed=None):
+    '''
+    Random UNWEIGHTED DIRECTED graph (list of sets, like graph1) with n nodes
+    and about m edges. Handy for benchmarking the algs on something bigger
+    than the 8 node graphs above.
+    '''
+    from random import Random
+    rng = Random(seed)
+    G = [set() for x in range(n)]
+    for i in range(m):
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v:  G[u].add(v)         #no self-loops.
+    return G
+
+def random_dag(n, m, seed=None):
+    '''
+    Random DAG (list of sets) with n nodes and about m edges. Every edge goes
+    from a smaller to a bigger node number, so there can't be a cycle.
+    '''
+    from random import Random
+    rng = Random(seed)
+    G = [set() for x in range(n)]
+    for i in range(m):
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u < v:       G[u].add(v)
+        elif v < u:     G[v].add(u)
+    return G
+
+def random_weighted_graph(n, m, max_weight=9, seed=None):
+    '''
+    Random WEIGHTED DIRECTED graph (list of dicts, like adj_list_of_dicts)
+    with integer weights 1..max_weight.
+    '''
+    from random import Random
+    rng = Random(seed)
+    G = [{} for x in range(n)]
+    for i in range(m):
+        u, v = rng.randrange(n), rng.randrange(n)
+        if u != v:  G[u][v] = rng.randint(1, max_weight)
+    return G
+
+def grid_graph(rows, cols, max_weight=9, seed=None):
+    '''
+    Road-network-like WEIGHTED graph (list of dicts): a rows x cols grid,
+    each node connected both ways to its 4 neighbors, random integer weights
+    1..max_weight (same weight in both directions). node id = r*cols + c.
+    '''
+    from random import Random
+    rng = Random(seed)
+    G = [{} for x in range(rows * cols)]
+    for r in range(rows):
+        for c in range(cols):
+            x = r * cols + c
+            for y in ((x + 1) if c + 1 < cols else None,
+                      (x + cols) if r + 1 < rows else None):
+                if y is None:   continue
+                G[x][y] = G[y][x] = rng.randint(1, max_weight)
+    return G
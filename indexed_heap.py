@@ -0,0 +1,249 @@
+'''
+Indexed d-ary min heap (priority queue with decrease-key).
+
+A binary heap stored in a list: the children of slot i are at 2i+1 and 2i+2,
+the smallest priority is always at slot 0. A d-ary heap has d children per
+slot (d*i+1 ... d*i+d), so the tree is flatter: push/decrease_key move up
+fewer levels (log_d n), pop compares more children per level. d=4 is
+usually a good trade off for Dijkstra/Prim, which do many decrease_keys.
+
+"Indexed" means we also keep pos[key] = slot of key in the heap. heapq can't
+find an item in the heap, so to lower an item's priority you have to push a
+2nd copy and skip the old one later ("lazy deletion"), and the heap grows to
+O(|E|) entries. With pos[] we can find the key and sift it up in place, so
+the heap never holds more than 1 entry per key.
+
+Keys are ints 0..n-1 (node ids), priorities are floats.
+
+    >>> h = IndexedHeap(5)
+    >>> h.push(3, 7.0); h.push(1, 2.0); h.decrease_key(3, 1.0)
+    >>> h.pop()
+    (3, 1.0)
+
+Operations:
+    push, pop, decrease_key, remove: O(log n)   peek, contains: O(1)
+    heapify (bulk build from n items): O(n)
+'''
+
+import heapq
+import time
+from array import array
+from random import Random
+
+
+class IndexedHeap(object):
+
+    #__slots__: no per-instance __dict__, attribute lookups are a bit faster.
+    __slots__ = ('d', 'heap', 'prio', 'pos')
+
+    def __init__(self, n, d=4):
+        '''
+        @type n: int
+        @param n: keys must be in range(n).
+
+        @type d: int
+        @param d: arity, number of children per slot (2 = binary heap).
+        '''
+        #flat typed arrays instead of lists of python objects:
+        #8 bytes per slot/key instead of a pointer + a boxed int/float.
+        self.d    = d
+        self.heap = array('l')                  #slot -> key.
+        self.prio = array('d', [0.0]) * n       #key -> priority.
+        self.pos  = array('l', [-1]) * n        #key -> slot, -1 if not in heap.
+
+    def __len__(self):
+        return len(self.heap)
+
+    def __contains__(self, key):
+        return self.pos[key] >= 0
+
+    def _sift_up(self, i):
+        heap, prio, pos, d = self.heap, self.prio, self.pos, self.d
+        key = heap[i]
+        p = prio[key]
+        while i > 0:
+            parent = (i - 1) // d
+            pkey = heap[parent]
+            if prio[pkey] <= p:   break
+            heap[i] = pkey          #move parent down.
+            pos[pkey] = i
+            i = parent
+        heap[i] = key
+        pos[key] = i
+
+    def _sift_down(self, i):
+        heap, prio, pos, d = self.heap, self.prio, self.pos, self.d
+        n = len(heap)
+        key = heap[i]
+        p = prio[key]
+        while True:
+            first = d * i + 1
+            if first >= n:  break
+            best = first            #smallest child.
+            bp = prio[heap[first]]
+            for c in range(first + 1, min(first + d, n)):
+                cp = prio[heap[c]]
+                if cp < bp:     best, bp = c, cp
+            if bp >= p:     break
+            heap[i] = heap[best]    #move child up.
+            pos[heap[i]] = i
+            i = best
+        heap[i] = key
+        pos[key] = i
+
+    def heapify(self, items):
+        '''
+        Bulk build from (key, priority) pairs in O(n), replacing whatever was
+        in the heap. Cheaper than n pushes (O(n log n)): sift down every
+        parent slot, starting from the last one. most slots are near the
+        bottom and only move a level or two.
+        '''
+        for key in self.heap:
+            self.pos[key] = -1
+        self.heap = array('l')
+        for key, priority in items:
+            self.prio[key] = priority
+            self.pos[key] = len(self.heap)
+            self.heap.append(key)
+        for i in range((len(self.heap) - 2) // self.d, -1, -1):
+            self._sift_down(i)
+
+    def push(self, key, priority):
+        '''add key, which must not already be in the heap.'''
+        self.prio[key] = priority
+        self.heap.append(key)
+        self._sift_up(len(self.heap) - 1)
+
+    def peek(self):
+        '''(key, priority) with the smallest priority, not removed.'''
+        key = self.heap[0]
+        return key, self.prio[key]
+
+    def pop(self):
+        '''remove and return (key, priority) with the smallest priority.'''
+        heap = self.heap
+        if not heap:
+            raise IndexError("pop from empty heap")
+        top = heap[0]
+        last = heap.pop()
+        self.pos[top] = -1
+        if heap:
+            heap[0] = last
+            self._sift_down(0)
+        return top, self.prio[top]
+
+    def remove(self, key):
+        '''
+        remove any key (not just the min) in O(log n). KeyError if the key
+        is not in the heap.
+        '''
+        if not 0 <= key < len(self.pos) or self.pos[key] < 0:
+            raise KeyError(key)
+        i = self.pos[key]
+        last = self.heap.pop()
+        self.pos[key] = -1
+        if last == key:     return      #key was in the last slot.
+        self.heap[i] = last
+        self.pos[last] = i
+        if i > 0 and self.prio[last] < self.prio[self.heap[(i - 1) // self.d]]:
+            self._sift_up(i)
+        else:
+            self._sift_down(i)
+
+    def decrease_key(self, key, priority):
+        '''lower the priority of a key already in the heap.'''
+        self.prio[key] = priority
+        self._sift_up(self.pos[key])
+
+    def update(self, key, priority):
+        '''
+        push key, or lower its priority if it's already in the heap and the
+        new priority is smaller (what Dijkstra's relax step wants).
+        '''
+        if self.pos[key] < 0:
+            self.push(key, priority)
+        elif priority < self.prio[key]:
+            self.decrease_key(key, priority)
+
+    def nbytes(self):
+        '''memory used by the 3 arrays.'''
+        return sum(len(arr) * arr.itemsize for arr in (self.heap, self.prio, self.pos))
+
+
+
+def test_indexed_heap():
+    print("\nrunning test_indexed_heap()...")
+    h = IndexedHeap(10, d=3)
+    for key, p in [(0, 5), (1, 9), (2, 1), (3, 7), (4, 3), (5, 8)]:
+        h.push(key, p)
+    h.decrease_key(1, 0)
+    h.update(3, 2)
+    h.update(5, 99)             #bigger, ignored.
+    print("len:", len(h), "peek:", h.peek(), "3 in heap?", 3 in h)
+    print("pops:", [h.pop() for i in range(len(h))])
+
+    h.heapify([(k, float(9 - k)) for k in range(10)])
+    h.remove(0)
+    h.remove(4)
+    print("heapify + remove:", [h.pop()[0] for i in range(len(h))])
+    h.heapify([(1, 1.0), (2, 2.0)])
+    for key in (1, 1, 10):      #removed already, out of range.
+        try:
+            h.remove(key)
+        except KeyError as err:
+            print("remove %d: KeyError %s" % (key, err))
+    print("heap still ok:", [h.pop() for i in range(len(h))])
+
+def bench_indexed_heap(n=200000, rounds=5):
+    '''
+    microbenchmark vs heapq, rounds * n = 10^6 heap operations each:
+    n pushes, (rounds - 2) * n decrease-key attempts, n pops. heapq has no
+    decrease-key, so it pushes a 2nd entry and skips stale ones on pop (lazy
+    deletion).
+    '''
+    print("\nrunning bench_indexed_heap()...")
+    rng = Random(1)
+    prios = [rng.random() for i in range(n)]
+    lowers = [(rng.randrange(n), rng.random() / 2) for i in range(n * (rounds - 2))]
+    print("%d pushes, %d decrease-keys, %d pops" % (n, len(lowers), n))
+
+    start = time.time()
+    heap = []
+    best = prios[:]
+    for k in range(n):
+        heapq.heappush(heap, (prios[k], k))
+    for k, p in lowers:
+        if p < best[k]:
+            best[k] = p
+            heapq.heappush(heap, (p, k))
+    biggest = len(heap)
+    while heap:
+        p, k = heapq.heappop(heap)
+        if p != best[k]:    continue        #stale entry.
+    print("heapq (lazy): %.3fs, heap grew to %d entries" % (time.time() - start, biggest))
+
+    for d in (2, 4, 8):
+        start = time.time()
+        h = IndexedHeap(n, d)
+        for k in range(n):
+            h.push(k, prios[k])
+        for k, p in lowers:
+            h.update(k, p)
+        while len(h):
+            h.pop()
+        print("IndexedHeap d=%d: %.3fs, %d bytes" % (d, time.time() - start, h.nbytes()))
+
+    start = time.time()
+    h = IndexedHeap(n)
+    h.heapify(enumerate(prios))
+    t_heapify = time.time() - start
+    start = time.time()
+    heapq.heapify([(p, k) for k, p in enumerate(prios)])
+    print("bulk build: heapify %.3fs vs heapq.heapify %.3fs" % (t_heapify, time.time() - start))
+
+def main():
+    test_indexed_heap()
+    bench_indexed_heap()
+
+if __name__ == "__main__":
+    main()
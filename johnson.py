@@ -0,0 +1,280 @@
+'''
+Johnson's all pairs shortest paths, for big SPARSE graphs (Floyd-Warshall is
+O(|V|^3) whatever the number of edges).
+
+All pairs = one Dijkstra per source, O(|V| |E| log |V|), but Dijkstra can't
+do negative edges. Johnson fixes that with one Bellman-Ford first:
+    1. add a new node q with a 0 weight edge to every node, and find
+       h(x) = dist(q, x) with Bellman-Ford (negative cycle -> give up).
+    2. reweight every edge: w'(u, v) = w(u, v) + h(u) - h(v). Triangle
+       inequality says h(v) <= h(u) + w(u, v), so w' >= 0. Every path from
+       s to t changes by the same h(s) - h(t), so shortest paths stay the
+       same paths.
+    3. Dijkstra from every s with w', then dist(s, t) = dist'(s, t) - h(s) + h(t).
+
+The Dijkstras in step 3 don't depend on each other, so they're farmed out to
+worker processes. The reweighted graph goes into shared memory once (see
+share_arrays() in csr.py) instead of being copied to every worker.
+
+The whole answer is |V|^2 numbers (80 GB of float64 for 100k nodes), so it is
+never collected in one place. Each row goes to one of:
+    * callback(s, row): rows are sent back through a pipe as they finish and
+      handed to callback in the parent, in whatever order they finish.
+    * out: a file of |V| * |V| numbers. workers write their rows straight into
+      it through mmap, only a "done" note goes back to the parent. open it
+      again with load_rows().
+    * neither: rows are returned as a list (small graphs only!).
+row[i] is the distance to node nodes[i] (see csr.node_list()), inf if
+unreachable.
+'''
+
+import mmap
+import multiprocessing as mp
+import os
+import time
+from array import array
+from multiprocessing.connection import wait as wait_connections
+
+from graphs import *
+from csr import to_weighted_csr, share_arrays, attach_arrays, release_arrays
+from dijkstra import dijkstra_csr, choose_heap
+from bellman_ford import spfa
+
+inf = float('inf')
+
+
+def potentials(offsets, targets, weights):
+    '''
+    Step 1: h(x) = dist(q, x), with q a new node pointing at every node.
+
+    @rtype: tuple
+    @return: (h, cycle): h indexed by node id, or a negative cycle (list of
+             node ids) and h = None.
+    '''
+    n = len(offsets) - 1
+    offsets = array('l', offsets)
+    offsets.append(offsets[-1] + n)             #q is node n, edges q -> x.
+    targets = array('l', targets) + array('l', range(n))
+    weights = array('d', weights) + array('d', [0.0]) * n
+    dist, edge_to, cycle = spfa(offsets, targets, weights, n)
+    if cycle is not None:
+        return None, cycle
+    return dist[:n], None
+
+def reweight(offsets, targets, weights, h):
+    '''Step 2: w'(u, v) = w(u, v) + h(u) - h(v) >= 0.'''
+    new = array('d', weights)
+    for u in range(len(offsets) - 1):
+        for k in range(offsets[u], offsets[u+1]):
+            #max() b/c float rounding can leave -1e-16 where it should be 0.
+            new[k] = max(0.0, weights[k] + h[u] - h[targets[k]])
+    return new
+
+def _row(graph, h, s, heap, typecode):
+    '''Step 3 for one source: original distances from s.'''
+    offsets, targets, weights = graph
+    dist = dijkstra_csr(offsets, targets, weights, s, heap)[0]
+    hs = h[s]
+    return array(typecode, [d - hs + hv if d < inf else inf for d, hv in zip(dist, h)])
+
+def _johnson_worker(conn, handles, sources, heap, typecode, out, send_rows):
+    blocks, views = attach_arrays(handles)
+    offsets, targets, weights, h = views
+    try:
+        if out is not None:
+            n = len(h)
+            size = n * array(typecode).itemsize
+            with open(out, 'r+b') as f:
+                mm = mmap.mmap(f.fileno(), 0)
+            for s in sources:
+                data = _row((offsets, targets, weights), h, s, heap, typecode).tobytes()
+                mm[s*size:(s+1)*size] = data
+                conn.send((s, data if send_rows else None))
+            mm.close()
+        else:
+            for s in sources:
+                conn.send((s, _row((offsets, targets, weights), h, s, heap, typecode).tobytes()))
+        conn.send(None)                 #done.
+    except BaseException as err:        #ship the error back to the parent.
+        conn.send(err)
+    finally:
+        release_arrays(blocks, views)
+        conn.close()
+
+def johnson(G, callback=None, out=None, workers=4, typecode='d', sources=None):
+    '''
+    All pairs (or many sources) shortest paths, negative weights allowed.
+
+    @type G: list of dicts, dict of dicts, or weighted adj matrix
+    @param G: the weighted graph.
+
+    @type callback: function
+    @param callback: callback(s, row) called in this process for every row,
+                     s is a node name and row an array indexed like nodes.
+
+    @type out: string
+    @param out: path of the output file, rows are written at s_index * |V|.
+                with a callback too, every row goes to both.
+
+    @type workers: int
+    @param workers: worker processes, 1 = everything in this process.
+
+    @type typecode: string
+    @param typecode: 'd' (float64) or 'f' (float32) rows.
+
+    @type sources: list
+    @param sources: source nodes, default all of them.
+
+    @rtype: tuple
+    @return: (nodes, rows). rows is a list of arrays (one per source, in
+             order) when there's no callback and no out, else None.
+    '''
+    nodes, index, offsets, targets, weights = to_weighted_csr(G)
+    n = len(nodes)
+    h, cycle = potentials(offsets, targets, weights)
+    if cycle is not None:
+        raise ValueError("negative cycle: %s" % (tuple(nodes[x] for x in cycle + cycle[:1]),))
+    weights = reweight(offsets, targets, weights, h)
+    heap = choose_heap(weights)
+    sources = list(range(n)) if sources is None else [index[s] for s in sources]
+
+    rows = None
+    if callback is None and out is None:
+        rows = {}
+        callback = lambda s, row: rows.__setitem__(s, row)
+    if out is not None:
+        with open(out, 'wb') as f:
+            f.truncate(n * n * array(typecode).itemsize)
+
+    if workers <= 1 or len(sources) <= 1:
+        f = open(out, 'r+b') if out is not None else None
+        for s in sources:
+            row = _row((offsets, targets, weights), h, s, heap, typecode)
+            if f is not None:
+                f.seek(s * n * row.itemsize)
+                row.tofile(f)
+            if callback is not None:
+                callback(nodes[s], row)
+        if f is not None:
+            f.close()
+    else:
+        blocks, handles = share_arrays(offsets, targets, weights, h)
+        procs = {}
+        try:
+            for w in range(min(workers, len(sources))):
+                recv_end, send_end = mp.Pipe(duplex=False)
+                p = mp.Process(target=_johnson_worker,
+                               args=(send_end, handles, sources[w::workers], heap, typecode, out,
+                                     callback is not None))
+                p.start()
+                send_end.close()        #parent only reads.
+                procs[recv_end] = p
+            error = None
+            while procs:
+                for conn in wait_connections(list(procs)):
+                    msg = conn.recv()
+                    if msg is None or isinstance(msg, BaseException):
+                        procs.pop(conn).join()
+                        if msg is not None:     error = msg
+                        continue
+                    s, data = msg
+                    if data is not None:
+                        row = array(typecode)
+                        row.frombytes(data)
+                        callback(nodes[s], row)
+            if error is not None:
+                raise error
+        finally:
+            for p in procs.values():
+                p.terminate()
+            release_arrays(blocks, unlink=True)
+
+    if rows is not None:
+        return nodes, [rows[nodes[s]] for s in sources]
+    return nodes, None
+
+def load_rows(path, n, typecode='d'):
+    '''
+    Map a file written by johnson(G, out=path) into memory.
+
+    @rtype: memoryview
+    @return: flat view, row s is [s*n : (s+1)*n].
+    '''
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm).cast(typecode)
+
+
+
+def with_negative_edges(G, seed=None):
+    '''
+    Same graph with some edges made negative but no negative cycles: add
+    p(u) - p(v) to every edge for random p (a cycle's total doesn't change).
+    '''
+    from random import Random
+    rng = Random(seed)
+    p = [rng.randrange(10) for x in range(len(G))]
+    return [{y: w + p[x] - p[y] for y, w in G[x].items()} for x in range(len(G))]
+
+def test_johnson():
+    print("\nrunning test_johnson()...")
+    from floyd_warshall import floyd_warshall
+    nodes, rows = johnson(adj_list_of_dicts, workers=1)
+    print("dist from a:", list(rows[a]))
+    print("same as floyd_warshall?",
+          [list(r) for r in rows] == [list(r) for r in floyd_warshall(adj_matrix_directed_weighted)[0]])
+
+    G = with_negative_edges(adj_list_of_dicts, seed=1)
+    nodes, rows = johnson(G, workers=1)
+    nodes, rows2 = johnson(G, workers=3)
+    print("negative edges, dist from a:", list(rows[a]), "parallel same?", rows == rows2)
+
+    import tempfile
+    path = os.path.join(tempfile.mkdtemp(), "apsp.rows")
+    for workers in (1, 3):
+        got = {}
+        johnson(G, callback=got.__setitem__, out=path, workers=workers)
+        on_disk = load_rows(path, len(nodes))
+        print("workers=%d callback + out: both got every row?" % workers,
+              [got[x] for x in nodes] == rows and
+              all(list(on_disk[i*len(nodes):(i+1)*len(nodes)]) == list(rows[i]) for i in range(len(nodes))))
+        on_disk.release()
+    os.remove(path)
+
+    G[h][a] = -30
+    try:
+        johnson(G)
+    except ValueError as err:
+        print("h -> a = -30:", err)
+
+def bench_johnson(n=1000, m=4000):
+    import tempfile
+    from bellman_ford import bellman_ford
+    print("\nrunning bench_johnson()...")
+    G = with_negative_edges(random_weighted_graph(n, m, seed=6), seed=7)
+    expected = bellman_ford(G, 0)[0]
+    path = os.path.join(tempfile.mkdtemp(), "apsp.rows")
+    for workers in (1, 2, 4):
+        start = time.time()
+        johnson(G, out=path, workers=workers, typecode='f')
+        elapsed = time.time() - start
+        rows = load_rows(path, n, 'f')
+        same = all(rows[x] == d for x, d in expected.items())
+        print("workers=%d: %.2fs for %d rows (%d MB file), row 0 same as bellman_ford? %s" %
+              (workers, elapsed, n, os.path.getsize(path) >> 20, same))
+        rows.release()
+
+    count = [0]
+    def callback(s, row):
+        count[0] += 1
+    start = time.time()
+    johnson(G, callback=callback, workers=4)
+    print("callback: %.2fs, %d rows streamed" % (time.time() - start, count[0]))
+    os.remove(path)
+
+def main():
+    test_johnson()
+    bench_johnson()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,272 @@
+'''
+Lowest common ancestor (LCA) + ancestor queries on the tree in an edge_to.
+
+bfs(), dfs_iterative(), bellman_ford() ... all return edge_to = {s: None, x:
+parent of x, ...}, a tree rooted at s (dijkstra_csr() gives an edge_to
+ARRAY, -1 = no parent, that works too). find_path() walks it one parent at a
+time, O(depth) per query. Build a TreeIndex once and then:
+    * lca(x, y):         deepest node that is an ancestor of both, O(1).
+    * lca_lifting(x, y): same, O(log n), by binary lifting.
+    * kth_ancestor(x, k): O(log k).
+    * distance(x, y):    number of tree edges between x and y, O(1).
+    * path(x, y):        the tree path x -> lca -> y, O(length of the path).
+(edge_to with several None roots = a forest, works too: x, y in different
+trees have no lca, those queries return None.)
+
+BINARY LIFTING: up[j][x] = 2^j-th ancestor of x. up[0] = parent and
+up[j] = up[j-1] of up[j-1], a whole-array pointer jump:
+    up[j] = [prev[prev[x]] for x in ...] = list(map(prev.__getitem__, prev))
+k-th ancestor = jump by the 1 bits of k. lca: lift the deeper node to the
+other's depth, then lift both by 2^j for j = big..0 as long as they stay
+different, the parent of where they end up is the lca.
+
+EULER TOUR + SPARSE TABLE: write down every node each time the DFS of the
+tree is at it (2n - 1 entries). Between the first visits of x and y the tour
+goes through lca(x, y) and nothing shallower, so lca = shallowest node in
+that range = a range minimum query (RMQ). The sparse table keeps the min of
+every range of length 2^j, any range is 2 overlapping such ranges, O(1).
+Entries are keys depth * n + node, so min of keys = shallowest node and a
+whole table level is list(map(min, prev[:-h], prev[h:])).
+
+    >>> T = TreeIndex(bfs(graph3, 'a'))
+    >>> T.lca('h', 'd'), T.distance('h', 'd'), T.path('h', 'd')
+'''
+
+import time
+from array import array
+from random import Random
+
+from graphs import *
+from bfs import bfs, find_path
+
+
+class TreeIndex(object):
+
+    def __init__(self, edge_to):
+        '''
+        @type edge_to: dict, list, array
+        @param edge_to: node -> parent, root(s) -> None. or a sequence with
+                        edge_to[x] = parent of x, -1 for roots (and nodes
+                        never reached, they become 1 node trees).
+        '''
+        if not isinstance(edge_to, dict):
+            edge_to = {x: None if p is None or p < 0 else p for x, p in enumerate(edge_to)}
+        self.nodes = list(edge_to)
+        self.index = index = {x: i for i, x in enumerate(self.nodes)}
+        n = self.n = len(self.nodes)
+        try:
+            parent = array('l', [-1 if edge_to[x] is None else index[edge_to[x]]
+                                 for x in self.nodes])
+        except KeyError as err:
+            raise ValueError("parent %r is not in edge_to" % err.args[0])
+        self.parent = parent
+
+        #children CSR, in node order.
+        counts = [0] * (n + 1)
+        for p in parent:
+            if p >= 0:  counts[p + 1] += 1
+        offsets = array('l', [0]) * (n + 1)
+        for x in range(n):
+            offsets[x+1] = offsets[x] + counts[x+1]
+        children = array('l', [0]) * (offsets[n])
+        fill = array('l', offsets)
+        for x in range(n):
+            p = parent[x]
+            if p >= 0:
+                children[fill[p]] = x
+                fill[p] += 1
+
+        #euler tour by an iterative dfs from every root, depths on the way.
+        depth = array('l', [0]) * n
+        root = array('l', [-1]) * n
+        first = array('l', [0]) * n
+        euler = array('q')
+        for r in range(n):
+            if parent[r] >= 0:  continue
+            root[r] = r
+            first[r] = len(euler)
+            euler.append(r)
+            stack = [(r, offsets[r])]
+            while stack:
+                x, i = stack[-1]
+                if i == offsets[x+1]:
+                    stack.pop()
+                    if stack:   euler.append(depth[stack[-1][0]] * n + stack[-1][0])
+                    continue
+                stack[-1] = (x, i + 1)
+                y = children[i]
+                depth[y] = depth[x] + 1
+                root[y] = r
+                first[y] = len(euler)
+                euler.append(depth[y] * n + y)
+                stack.append((y, offsets[y]))
+        if -1 in root:                  #never reached from a root.
+            raise ValueError("edge_to has a cycle, it isn't a tree")
+        self.depth, self.root, self.first = depth, root, first
+
+        #sparse table over the euler tour.
+        self.table = [euler]
+        h = 1
+        while 2 * h <= len(euler):
+            prev = self.table[-1]
+            self.table.append(array('q', map(min, prev[:len(prev) - h], prev[h:])))
+            h *= 2
+
+        #binary lifting, roots point at themselves.
+        up0 = array('l', [x if parent[x] < 0 else parent[x] for x in range(n)])
+        self.up = [up0]
+        for j in range(1, max(1, max(depth, default=0).bit_length())):
+            prev = self.up[-1]
+            self.up.append(array('l', map(prev.__getitem__, prev)))
+
+    def _ids(self, x, y):
+        return self.index[x], self.index[y]
+
+    def _lca(self, i, j):
+        '''O(1) euler tour + sparse table lca of node ids, -1 if no lca.'''
+        if self.root[i] != self.root[j]:    return -1
+        lo, hi = self.first[i], self.first[j]
+        if lo > hi:     lo, hi = hi, lo
+        k = (hi - lo + 1).bit_length() - 1
+        row = self.table[k]
+        return min(row[lo], row[hi - (1 << k) + 1]) % self.n
+
+    def _kth(self, i, k):
+        j = 0
+        while k:
+            if k & 1:   i = self.up[j][i]
+            k >>= 1
+            j += 1
+        return i
+
+    def lca(self, x, y):
+        '''@return: the lca of x and y, None if they're in different trees.'''
+        a = self._lca(*self._ids(x, y))
+        return None if a < 0 else self.nodes[a]
+
+    def lca_lifting(self, x, y):
+        '''same as lca(), by binary lifting.'''
+        i, j = self._ids(x, y)
+        if self.root[i] != self.root[j]:   return None
+        depth, up = self.depth, self.up
+        if depth[i] < depth[j]:     i, j = j, i
+        i = self._kth(i, depth[i] - depth[j])
+        if i == j:  return self.nodes[i]
+        for level in reversed(up):
+            if level[i] != level[j]:
+                i, j = level[i], level[j]
+        return self.nodes[self.parent[i]]
+
+    def kth_ancestor(self, x, k):
+        '''@return: x's k-th ancestor (0 = x, 1 = parent), None above the root.'''
+        i = self.index[x]
+        if not 0 <= k <= self.depth[i]:     return None
+        return self.nodes[self._kth(i, k)]
+
+    def depth_of(self, x):
+        return self.depth[self.index[x]]
+
+    def distance(self, x, y):
+        '''@return: number of tree edges between x and y, None if no path.'''
+        i, j = self._ids(x, y)
+        a = self._lca(i, j)
+        if a < 0:   return None
+        return self.depth[i] + self.depth[j] - 2 * self.depth[a]
+
+    def path(self, x, y):
+        '''
+        @rtype: tuple
+        @return: nodes on the tree path x -> y (like find_path()), None if
+                 x and y are in different trees.
+        '''
+        i, j = self._ids(x, y)
+        a = self._lca(i, j)
+        if a < 0:   return None
+        parent, nodes = self.parent, self.nodes
+        up = []
+        while i != a:
+            up.append(nodes[i])
+            i = parent[i]
+        down = []
+        while j != a:
+            down.append(nodes[j])
+            j = parent[j]
+        up.append(nodes[a])
+        down.reverse()
+        return tuple(up + down)
+
+
+
+def lca_naive(edge_to, x, y):
+    '''the slow way: mark x's ancestors, walk up from y to the first mark.'''
+    seen = set()
+    while x is not None:
+        seen.add(x)
+        x = edge_to[x]
+    while y is not None:
+        if y in seen:   return y
+        y = edge_to[y]
+    return None
+
+def random_tree(n, seed=None, reach=None):
+    '''
+    edge_to of a random tree on range(n), root 0: parent of x is random
+    among the reach nodes before it (all of them by default, depth ~ log n;
+    small reach makes a deep, path-like tree, depth ~ 2n / reach).
+    '''
+    rng = Random(seed)
+    reach = reach or n
+    return {x: (rng.randrange(max(0, x - reach), x) if x else None) for x in range(n)}
+
+def test_tree_index():
+    print("\nrunning test_tree_index()...")
+    edge_to = bfs(graph3, 'a')
+    T = TreeIndex(edge_to)
+    print("lca(h, d):", T.lca('h', 'd'), T.lca_lifting('h', 'd'),
+          "distance:", T.distance('h', 'd'), "path:", T.path('h', 'd'))
+    print("a -> h:", T.path('a', 'h'), "find_path:", find_path(graph3, bfs, 'a', 'h'))
+    print("2nd ancestor of h:", T.kth_ancestor('h', 2), "10th:", T.kth_ancestor('h', 10))
+    T = TreeIndex(array('l', [-1, 0, 0, 1, -1]))
+    print("from an array:", T.path(3, 2), T.lca(3, 4))
+
+    forest = dict(random_tree(300, seed=20))
+    forest.update({x + 300: p if p is None else p + 300 for x, p in random_tree(200, seed=21).items()})
+    T = TreeIndex(forest)
+    rng = Random(22)
+    pairs = [(rng.randrange(500), rng.randrange(500)) for i in range(2000)]
+    expected = [lca_naive(forest, x, y) for x, y in pairs]
+    print("euler same as naive?", [T.lca(x, y) for x, y in pairs] == expected)
+    print("lifting same as naive?", [T.lca_lifting(x, y) for x, y in pairs] == expected)
+    print("paths ok?", all(p is None or (p[0] == x and p[-1] == y and len(p) == T.distance(x, y) + 1
+                           and all(forest[u] == v or forest[v] == u for u, v in zip(p, p[1:])))
+                           for (x, y), p in zip(pairs, [T.path(x, y) for x, y in pairs])))
+    try:
+        TreeIndex({'a': 'b', 'b': 'a'})
+    except ValueError as err:
+        print("cycle:", err)
+
+def bench_tree_index(n=100000, queries=100000):
+    print("\nrunning bench_tree_index()...")
+    G = random_graph(n, 3 * n, seed=23)
+    for name, edge_to in (("bfs tree", bfs(G, 0)), ("random tree", random_tree(n, seed=24)),
+                          ("deep tree", random_tree(n, seed=24, reach=200))):
+        start = time.time()
+        T = TreeIndex(edge_to)
+        print("%s, %d nodes, max depth %d: build %.2fs" %
+              (name, T.n, max(T.depth), time.time() - start))
+        rng = Random(25)
+        nodes = T.nodes
+        pairs = [(rng.choice(nodes), rng.choice(nodes)) for i in range(queries)]
+        for label, query in (("naive", lambda x, y: lca_naive(edge_to, x, y)),
+                             ("lifting", T.lca_lifting), ("euler", T.lca)):
+            start = time.time()
+            for x, y in pairs:
+                query(x, y)
+            print("    %-8s %.2fs for %d lca queries" % (label, time.time() - start, queries))
+
+def main():
+    test_tree_index()
+    bench_tree_index()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,398 @@
+'''
+Maximum flow / minimum cut.
+
+G[u][v] is the CAPACITY of pipe u -> v (same shape as adj_list_of_dicts). A
+flow sends f(u, v) <= capacity through every pipe, and everything that goes
+into a node (other than s and t) comes out again. Max flow = the most that
+can go from s to t. Max-flow min-cut theorem: that is exactly the capacity of
+the cheapest set of pipes whose removal cuts t off from s.
+
+RESIDUAL graph: what can still be changed. A pipe u -> v with capacity c and
+flow f has residual capacity c - f forwards (send more) and f backwards
+(v -> u, "undo" some flow). Every pipe is stored as a PAIR of arcs, arc 2i
+(forward) and 2i+1 (backward), so the partner of arc a is a ^ 1 and pushing
+d along a is just cap[a] -= d, cap[a ^ 1] += d. All arcs live in flat arrays
+(head, cap) and an arc list per node in CSR layout (see csr.py).
+
+3 algs, all on the same FlowNetwork:
+    * edmonds_karp(): Ford-Fulkerson with BFS: find a shortest s -> t path in
+      the residual graph, push as much as it takes, repeat. O(|V| |E|^2),
+      the baseline.
+    * dinic(): BFS once to get LEVELS (distance from s), then push a BLOCKING
+      flow using only arcs that go one level up, with DFS. Each node keeps a
+      "current arc" pointer: an arc that didn't work is never tried again in
+      that phase. Each phase makes dist(s, t) longer, so <= |V| phases.
+      O(|V|^2 |E|), much better in practice.
+    * push_relabel(): no paths at all. Flood s's pipes, then nodes with more
+      in than out (EXCESS) push it to neighbors that are "downhill" (height
+      one less). A node that can't push goes up (RELABEL). Always work on the
+      HIGHEST active node, O(|V|^2 sqrt |E|). Every so often a GLOBAL RELABEL
+      (backwards BFS from t) resets every height to its exact distance to t,
+      which is the heuristic that makes it fast.
+
+s == t is a ValueError in all 3 (no flow from a node to itself).
+
+min_cut(): after any of them, the nodes s can still reach in the residual
+graph are the s side of a minimum cut.
+
+stats counts augmenting paths, phases, pushes and (global) relabels.
+
+    >>> value, flows, cut = max_flow(pipes, 's', 't')
+    >>> value
+    23.0
+'''
+
+import time
+from array import array
+from collections import deque
+
+from graphs import *
+from csr import node_list
+
+
+class FlowNetwork(object):
+
+    def __init__(self, G):
+        '''
+        @type G: list of dicts, dict of dicts
+        @param G: G[u][v] = capacity of u -> v.
+        '''
+        self.nodes = node_list(G)
+        self.index = {x: i for i, x in enumerate(self.nodes)}
+        n = self.n = len(self.nodes)
+
+        head = array('l')                   #arc -> node it points to.
+        orig = array('d')                   #arc -> original capacity.
+        out  = [[] for x in range(n)]
+        for x in self.nodes:
+            u = self.index[x]
+            for y, c in G[x].items():
+                v = self.index[y]
+                if c < 0:   raise ValueError("negative capacity")
+                out[u].append(len(head))    #forward arc u -> v
+                head.append(v)
+                orig.append(c)
+                out[v].append(len(head))    #backward arc v -> u
+                head.append(u)
+                orig.append(0)
+        self.head = head
+        self.orig = orig
+        self.offsets = array('l', [0])      #arcs of u: arcs[offsets[u]:offsets[u+1]]
+        self.arcs = array('l')
+        for u in range(n):
+            self.arcs.extend(out[u])
+            self.offsets.append(len(self.arcs))
+        self.reset()
+
+    def reset(self):
+        '''back to zero flow.'''
+        self.cap = array('d', self.orig)    #residual capacity.
+        self.stats = {'augmentations': 0, 'phases': 0, 'pushes': 0,
+                      'relabels': 0, 'global_relabels': 0}
+
+    def _ends(self, s, t):
+        '''ids of s and t, there is no flow from a node to itself.'''
+        if s == t:
+            raise ValueError("source and sink are the same node %r" % (s,))
+        return self.index[s], self.index[t]
+
+    def _bfs_levels(self, s):
+        '''distance from s in the residual graph, -1 = unreachable.'''
+        head, cap, arcs, offsets = self.head, self.cap, self.arcs, self.offsets
+        level = array('l', [-1]) * self.n
+        level[s] = 0
+        que = deque([s])
+        while que:
+            x = que.popleft()
+            for i in range(offsets[x], offsets[x+1]):
+                a = arcs[i]
+                y = head[a]
+                if cap[a] > 0 and level[y] < 0:
+                    level[y] = level[x] + 1
+                    que.append(y)
+        return level
+
+    def edmonds_karp(self, s, t):
+        '''
+        @rtype: float
+        @return: max flow value, the flow itself is left in the network.
+        '''
+        s, t = self._ends(s, t)
+        head, cap, arcs, offsets = self.head, self.cap, self.arcs, self.offsets
+        total = 0.0
+        while True:
+            edge_to = array('l', [-1]) * self.n     #node -> arc used to get there.
+            que = deque([s])
+            while que and edge_to[t] < 0:
+                x = que.popleft()
+                for i in range(offsets[x], offsets[x+1]):
+                    a = arcs[i]
+                    y = head[a]
+                    if cap[a] > 0 and edge_to[y] < 0 and y != s:
+                        edge_to[y] = a
+                        que.append(y)
+            if edge_to[t] < 0:
+                return total
+            path = []
+            y = t
+            while y != s:
+                path.append(edge_to[y])
+                y = head[edge_to[y] ^ 1]
+            d = min(cap[a] for a in path)
+            for a in path:
+                cap[a] -= d
+                cap[a ^ 1] += d
+            total += d
+            self.stats['augmentations'] += 1
+
+    def dinic(self, s, t):
+        '''
+        @rtype: float
+        @return: max flow value, the flow itself is left in the network.
+        '''
+        s, t = self._ends(s, t)
+        head, cap, arcs, offsets = self.head, self.cap, self.arcs, self.offsets
+        total = 0.0
+        while True:
+            level = self._bfs_levels(s)
+            if level[t] < 0:
+                return total
+            self.stats['phases'] += 1
+            it = array('l', offsets)        #current arc pointer of every node.
+            path = []                       #arcs from s to x.
+            x = s
+            while True:
+                if x == t:                  #augment along path.
+                    d = min(cap[a] for a in path)
+                    for a in path:
+                        cap[a] -= d
+                        cap[a ^ 1] += d
+                    total += d
+                    self.stats['augmentations'] += 1
+                    #back up to just before the first saturated arc.
+                    first = next(i for i, a in enumerate(path) if cap[a] == 0)
+                    del path[first:]
+                    x = head[path[-1]] if path else s
+                    continue
+                end = offsets[x+1]
+                i = it[x]
+                while i < end:              #advance along an admissible arc.
+                    a = arcs[i]
+                    y = head[a]
+                    if cap[a] > 0 and level[y] == level[x] + 1:
+                        break
+                    i += 1
+                it[x] = i
+                if i < end:
+                    path.append(a)
+                    x = y
+                elif path:                  #dead end: retreat, x is useless now.
+                    level[x] = -1
+                    a = path.pop()
+                    x = head[a ^ 1]
+                    it[x] += 1
+                else:
+                    break                   #blocking flow done.
+
+    def _global_relabel(self, s, t, height):
+        '''
+        exact heights: distance to t in the residual graph, or |V| + distance
+        to s for nodes that can't reach t any more (their excess goes back).
+        '''
+        n, head, cap, arcs, offsets = self.n, self.head, self.cap, self.arcs, self.offsets
+        self.stats['global_relabels'] += 1
+        for x in range(n):
+            height[x] = 2 * n
+        for root, base in ((t, 0), (s, n)):
+            height[root] = base
+            que = deque([root])
+            while que:
+                y = que.popleft()
+                for i in range(offsets[y], offsets[y+1]):
+                    a = arcs[i]             #y -> z, so a ^ 1 is z -> y.
+                    z = head[a]
+                    if cap[a ^ 1] > 0 and height[z] == 2 * n:
+                        height[z] = height[y] + 1
+                        que.append(z)
+
+    def push_relabel(self, s, t, global_every=None):
+        '''
+        Highest label push-relabel.
+
+        @type global_every: int
+        @param global_every: global relabel after this many relabels,
+                             default |V|.
+
+        @rtype: float
+        @return: max flow value, the flow itself is left in the network.
+        '''
+        s, t = self._ends(s, t)
+        n, head, cap, arcs, offsets = self.n, self.head, self.cap, self.arcs, self.offsets
+        stats = self.stats
+        global_every = global_every or n
+        height = array('l', [0]) * n
+        excess = array('d', [0.0]) * n
+        it = array('l', offsets)
+
+        for i in range(offsets[s], offsets[s+1]):      #flood s's pipes.
+            a = arcs[i]
+            d = cap[a]
+            if d > 0:
+                cap[a] = 0
+                cap[a ^ 1] += d
+                excess[head[a]] += d
+                excess[s] -= d
+                stats['pushes'] += 1
+
+        buckets = [[] for h in range(2 * n + 1)]    #height -> active nodes.
+        def rebuild():
+            self._global_relabel(s, t, height)
+            for bucket in buckets:  bucket.clear()
+            for x in range(n):
+                it[x] = offsets[x]
+                if excess[x] > 0 and x != s and x != t:
+                    buckets[height[x]].append(x)
+            return max((height[x] for x in range(n) if excess[x] > 0 and x != s and x != t),
+                       default=-1)
+
+        highest = rebuild()
+        since_global = 0
+        while highest >= 0:
+            if not buckets[highest]:
+                highest -= 1
+                continue
+            x = buckets[highest].pop()
+            #discharge x: push until its excess is gone, relabel when stuck.
+            while excess[x] > 0:
+                i = it[x]
+                if i == offsets[x+1]:       #no downhill arc left: relabel.
+                    h = 2 * n
+                    for j in range(offsets[x], offsets[x+1]):
+                        a = arcs[j]
+                        if cap[a] > 0 and height[head[a]] < h:
+                            h = height[head[a]]
+                    height[x] = h + 1
+                    it[x] = offsets[x]
+                    stats['relabels'] += 1
+                    since_global += 1
+                    if since_global >= global_every:
+                        since_global = 0
+                        highest = rebuild()     #x is put back in a bucket.
+                        break
+                    continue
+                a = arcs[i]
+                y = head[a]
+                if cap[a] > 0 and height[x] == height[y] + 1:
+                    d = excess[x] if excess[x] < cap[a] else cap[a]
+                    cap[a] -= d
+                    cap[a ^ 1] += d
+                    excess[x] -= d
+                    if excess[y] == 0 and y != s and y != t:
+                        buckets[height[y]].append(y)
+                    excess[y] += d
+                    stats['pushes'] += 1
+                    if cap[a] == 0:     it[x] = i + 1
+                else:
+                    it[x] = i + 1
+            else:
+                #x may have gone up past highest and pushed to nodes 1 below.
+                highest = max(highest, height[x] - 1)
+        return excess[t]
+
+    def flows(self):
+        '''
+        @rtype: dict
+        @return: (u, v) -> flow through pipe u -> v, pipes with flow only.
+        '''
+        flow = {}
+        for a in range(0, len(self.head), 2):
+            f = self.orig[a] - self.cap[a]
+            if f > 0:
+                u, v = self.nodes[self.head[a + 1]], self.nodes[self.head[a]]
+                flow[(u, v)] = flow.get((u, v), 0) + f
+        return flow
+
+    def min_cut(self, s):
+        '''
+        @rtype: tuple
+        @return: (S, cut): S = set of nodes on s's side, cut = list of
+                 (u, v, capacity) pipes from S to the rest.
+        '''
+        level = self._bfs_levels(self.index[s])
+        S = {self.nodes[x] for x in range(self.n) if level[x] >= 0}
+        cut = []
+        for a in range(0, len(self.head), 2):
+            u, v = self.head[a + 1], self.head[a]
+            if level[u] >= 0 and level[v] < 0 and self.orig[a] > 0:
+                cut.append((self.nodes[u], self.nodes[v], self.orig[a]))
+        return S, cut
+
+def max_flow(G, s, t, alg='dinic'):
+    '''
+    @type alg: string
+    @param alg: 'dinic', 'push_relabel' or 'edmonds_karp'.
+
+    @rtype: tuple
+    @return: (value, flows, (S, cut)), see FlowNetwork.flows()/min_cut().
+    '''
+    net = FlowNetwork(G)
+    value = getattr(net, alg)(s, t)
+    return value, net.flows(), net.min_cut(s)
+
+
+
+pipes = {               #CLRS's flow network, max flow 23.
+    's':  {'v1': 16, 'v2': 13},
+    'v1': {'v3': 12},
+    'v2': {'v1': 4, 'v4': 14},
+    'v3': {'v2': 9, 't': 20},
+    'v4': {'v3': 7, 't': 4},
+    't':  {}
+}
+
+def is_flow(G, flows, s, t):
+    '''capacities respected and in == out at every node but s and t.'''
+    net = {x: 0 for x in node_list(G)}
+    for (u, v), f in flows.items():
+        if f > G[u][v]:     return False
+        net[u] -= f
+        net[v] += f
+    return all(net[x] == 0 for x in net if x != s and x != t)
+
+def test_max_flow():
+    print("\nrunning test_max_flow()...")
+    for alg in ('edmonds_karp', 'dinic', 'push_relabel'):
+        net = FlowNetwork(pipes)
+        value = getattr(net, alg)('s', 't')
+        S, cut = net.min_cut('s')
+        print("%-12s flow: %s, valid? %s, cut: %s (%s), S: %s" %
+              (alg, value, is_flow(pipes, net.flows(), 's', 't'), cut,
+               sum(c for u, v, c in cut), sorted(S)))
+        print("%-12s stats: %s" % ('', net.stats))
+    print("adj_list_of_dicts a -> h:", max_flow(adj_list_of_dicts, a, h)[0])
+    for alg in ('edmonds_karp', 'dinic', 'push_relabel'):
+        try:
+            max_flow(pipes, 's', 's', alg)
+        except ValueError as err:
+            print("%-12s s == t: %s" % (alg, err))
+
+def bench_max_flow(n=10000, m=100000):
+    print("\nrunning bench_max_flow()...")
+    G = random_weighted_graph(n, m, max_weight=100, seed=12)
+    for alg in ('edmonds_karp', 'dinic', 'push_relabel'):
+        net = FlowNetwork(G)
+        start = time.time()
+        value = getattr(net, alg)(0, 1)
+        elapsed = time.time() - start
+        S, cut = net.min_cut(0)
+        print("%-12s %.3fs, flow %s, cut %s, valid? %s, %s" %
+              (alg, elapsed, value, sum(c for u, v, c in cut),
+               is_flow(G, net.flows(), 0, 1),
+               {k: v for k, v in net.stats.items() if v}))
+
+def main():
+    test_max_flow()
+    bench_max_flow()
+
+if __name__ == "__main__":
+    main()
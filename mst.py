@@ -0,0 +1,522 @@
+'''
+Minimum spanning tree (MST): the cheapest set of edges that connects all the
+nodes of a weighted UNDIRECTED graph. (If the graph isn't connected you get a
+minimum spanning FOREST, one tree per connected component.)
+
+Directed graphs like adj_list_of_dicts are treated as undirected: u -> v and
+v -> u are the same edge, with the smaller weight if both are there.
+
+The edges are pulled out into 3 flat arrays us, vs, ws (edge k is
+us[k] - vs[k] with weight ws[k], us[k] < vs[k], ordered by (u, v)), so edge k
+can be named by its number k. Ties between equal weights are broken by k,
+i.e. edges are compared by (ws[k], k). That makes the MST unique, so every
+alg here returns exactly the same tree.
+
+Kruskal: go through the edges from cheapest to most expensive, keep an edge
+if it joins 2 different trees (union-find says its ends aren't connected
+yet), skip it if it would make a cycle. O(|E| lg |E|) for the sort.
+    * the sort is an ARGSORT: sort the edge numbers by weight, not a list of
+      (w, u, v) tuples.
+    * 'filter': filter-Kruskal (Osipov, Sanders & Singler). quicksort-like:
+      split the edges around a pivot weight, solve the light half first, then
+      throw away every heavy edge whose ends are already connected BEFORE
+      sorting what's left of the heavy half. On dense graphs most heavy
+      edges get thrown away without ever being sorted.
+    * kruskal_external(): for edge lists bigger than RAM. sort the edges in
+      chunks that fit, write each sorted chunk (a "run") to a temp file, then
+      merge the runs (heapq.merge reads them a block at a time) and stream
+      the merged edges through union-find. Stops reading as soon as the tree
+      is done.
+
+Prim: grow ONE tree from a start node, always adding the cheapest edge from
+the tree to a node not in it yet.
+    * prim_matrix(): O(|V|^2) on an adj matrix, no heap. best for DENSE
+      graphs (|E| ~ |V|^2), where a heap would just add a lg factor.
+    * prim_edges(): indexed d-ary heap, O(|E| lg |V|), for SPARSE graphs.
+
+Borůvka: every component grabs its cheapest outgoing edge, all at once, and
+repeat. The "cheapest edge per component" pass is one loop over the edge
+list, so it splits into chunks that worker processes can do in parallel.
+
+Which one is fastest depends on the density, see bench_mst().
+
+    >>> total, tree = kruskal(adj_list_of_dicts)
+    >>> total
+    14.0
+    >>> prim(adj_matrix_directed_weighted) == boruvka(adj_list_of_dicts) == (total, tree)
+    True
+'''
+
+import heapq
+import os
+import struct
+import tempfile
+import time
+from array import array
+from random import Random
+
+from graphs import *
+from csr import to_weighted_csr, share_arrays, attach_arrays, release_arrays
+from process_pool import run_in_processes
+from union_find import UnionFind
+
+_RECORD = struct.Struct('<dqqq')    #external runs: (w, seq, u, v).
+
+
+def undirected_edges(G):
+    '''
+    Edge arrays of G as an undirected graph, one entry per {u, v} pair.
+
+    @type G: list of dicts, dict of dicts, or weighted adj matrix
+    @param G: the weighted graph.
+
+    @rtype: tuple
+    @return: (nodes, us, vs, ws) with us/vs array('l') and ws array('d').
+    '''
+    nodes, index, offsets, targets, weights = to_weighted_csr(G)
+    best = {}
+    for u in range(len(nodes)):
+        for k in range(offsets[u], offsets[u+1]):
+            v = targets[k]
+            if u == v:  continue            #self-loops are never in a tree.
+            key = (u, v) if u < v else (v, u)
+            if weights[k] < best.get(key, float('inf')):
+                best[key] = weights[k]
+    us, vs, ws = array('l'), array('l'), array('d')
+    for (u, v), w in sorted(best.items()):
+        us.append(u)
+        vs.append(v)
+        ws.append(w)
+    return nodes, us, vs, ws
+
+def _tree(nodes, us, vs, ws, picked):
+    '''(total weight, [(u, v, w)...]) with node names, in (w, k) order.'''
+    picked = sorted(picked, key=lambda k: (ws[k], k))
+    return (sum(ws[k] for k in picked),
+            [(nodes[us[k]], nodes[vs[k]], ws[k]) for k in picked])
+
+def _kruskal_scan(order, us, vs, uf, picked):
+    '''keep the edges in order that join 2 trees, stop when there's 1 tree.'''
+    for k in order:
+        if uf.count == 1:   break
+        if uf.union(us[k], vs[k]):
+            picked.append(k)
+
+def kruskal_edges(n, us, vs, ws, mode='sort', base=1024, seed=None):
+    '''
+    Kruskal on edge arrays (see undirected_edges()).
+
+    @type mode: string
+    @param mode: 'sort' (argsort everything) or 'filter' (filter-Kruskal).
+
+    @type base: int
+    @param base: filter-Kruskal sorts pieces with at most this many edges.
+
+    @rtype: list
+    @return: numbers k of the tree edges.
+    '''
+    uf = UnionFind(n)
+    picked = []
+    m = len(ws)
+    if mode == 'sort':
+        #sorted() is stable, so equal weights stay in k order.
+        _kruskal_scan(sorted(range(m), key=ws.__getitem__), us, vs, uf, picked)
+        return picked
+
+    rng = Random(seed)
+    #stack of (edge numbers in k order, heavy half that needs filtering?).
+    #the light half is pushed last so it's done first.
+    stk = [(list(range(m)), False)]
+    while stk and uf.count > 1:
+        part, heavy = stk.pop()
+        if heavy:
+            find = uf.find
+            part = [k for k in part if find(us[k]) != find(vs[k])]
+        if len(part) <= base:
+            _kruskal_scan(sorted(part, key=ws.__getitem__), us, vs, uf, picked)
+            continue
+        p = part[rng.randrange(len(part))]
+        pw = ws[p]                      #pivot (pw, p), compared like (ws[k], k).
+        light = [k for k in part if ws[k] < pw or (ws[k] == pw and k <= p)]
+        heavy = [k for k in part if ws[k] > pw or (ws[k] == pw and k > p)]
+        stk.append((heavy, True))
+        stk.append((light, False))
+    return picked
+
+def kruskal(G, mode='sort'):
+    '''
+    Minimum spanning tree (forest) of G.
+
+    @type G: list of dicts, dict of dicts, or weighted adj matrix
+    @param G: the weighted graph, treated as undirected.
+
+    @type mode: string
+    @param mode: 'sort' or 'filter'.
+
+    @rtype: tuple
+    @return: (total weight, [(u, v, w), ...] tree edges).
+    '''
+    nodes, us, vs, ws = undirected_edges(G)
+    return _tree(nodes, us, vs, ws, kruskal_edges(len(nodes), us, vs, ws, mode))
+
+
+
+def _write_run(us, vs, ws, seqs, directory):
+    '''sort one chunk of edges by (w, seq) and write it to a temp file.'''
+    order = sorted(range(len(ws)), key=ws.__getitem__)  #stable: seq order.
+    fd, path = tempfile.mkstemp(suffix='.run', dir=directory)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(b''.join(_RECORD.pack(ws[k], seqs[k], us[k], vs[k]) for k in order))
+    return path
+
+def _read_run(path, block=4096):
+    '''stream a run file back, block records at a time.'''
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(block * _RECORD.size)
+            if not data:    break
+            yield from _RECORD.iter_unpack(data)
+
+def kruskal_external(edges, n, chunk=1000000, directory=None):
+    '''
+    Kruskal for edge streams that don't fit in memory.
+
+    @type edges: iterable
+    @param edges: (u, v, w) with u, v in range(n), e.g. read from a file.
+
+    @type n: int
+    @param n: number of nodes.
+
+    @type chunk: int
+    @param chunk: edges sorted in memory at a time (one run file each).
+
+    @type directory: string
+    @param directory: where the run files go, default the system temp dir.
+
+    @rtype: tuple
+    @return: (total weight, [(u, v, w), ...] tree edges).
+    '''
+    runs = []
+    us, vs, ws, seqs = array('l'), array('l'), array('d'), array('q')
+    try:
+        for seq, (u, v, w) in enumerate(edges):
+            us.append(u)
+            vs.append(v)
+            ws.append(w)
+            seqs.append(seq)
+            if len(ws) == chunk:
+                runs.append(_write_run(us, vs, ws, seqs, directory))
+                us, vs, ws, seqs = array('l'), array('l'), array('d'), array('q')
+        if len(ws):
+            runs.append(_write_run(us, vs, ws, seqs, directory))
+        del us, vs, ws, seqs
+
+        uf = UnionFind(n)
+        tree = []
+        total = 0.0
+        for w, seq, u, v in heapq.merge(*[_read_run(path) for path in runs]):
+            if uf.union(u, v):
+                tree.append((u, v, w))
+                total += w
+                if uf.count == 1:   break
+        return total, tree
+    finally:
+        for path in runs:
+            os.remove(path)
+
+
+
+def _ranks(ws):
+    '''rank[k] = position of edge k in (ws[k], k) order, all different.'''
+    rank = array('l', [0]) * len(ws)
+    for r, k in enumerate(sorted(range(len(ws)), key=ws.__getitem__)):
+        rank[k] = r
+    return rank
+
+def _incident(n, us, vs):
+    '''CSR of the undirected graph: offsets, other end, edge number.'''
+    deg = [0] * (n + 1)
+    for u, v in zip(us, vs):
+        deg[u + 1] += 1
+        deg[v + 1] += 1
+    for x in range(n):
+        deg[x + 1] += deg[x]
+    offsets = array('l', deg)
+    nbrs  = array('l', [0]) * offsets[n]
+    edges = array('l', [0]) * offsets[n]
+    fill = deg[:n]
+    for k, (u, v) in enumerate(zip(us, vs)):
+        nbrs[fill[u]], edges[fill[u]] = v, k
+        fill[u] += 1
+        nbrs[fill[v]], edges[fill[v]] = u, k
+        fill[v] += 1
+    return offsets, nbrs, edges
+
+def prim_edges(n, us, vs, ws, d=4):
+    '''
+    Prim with an indexed heap (indexed_heap.py) on edge arrays, for sparse
+    graphs. O(|E| lg |V|). The heap priority of a node is the RANK of its
+    cheapest edge to the tree (so ties are broken by k, like Kruskal).
+
+    @rtype: list
+    @return: numbers k of the tree edges.
+    '''
+    from indexed_heap import IndexedHeap
+    rank = _ranks(ws)
+    offsets, nbrs, edges = _incident(n, us, vs)
+    best = array('l', [-1]) * n         #x -> cheapest edge from the tree.
+    done = bytearray(n)
+    heap = IndexedHeap(n, d)
+    picked = []
+    for root in range(n):               #one tree per connected component.
+        if done[root]:  continue
+        heap.push(root, -1)
+        while len(heap):
+            x, r = heap.pop()
+            done[x] = 1
+            if best[x] >= 0:    picked.append(best[x])
+            for i in range(offsets[x], offsets[x+1]):
+                y = nbrs[i]
+                if done[y]:     continue
+                k = edges[i]
+                if best[y] < 0 or rank[k] < rank[best[y]]:
+                    best[y] = k
+                    heap.update(y, rank[k])
+    return picked
+
+def _edge_before(v, x, p):
+    '''edge {v, x} before edge {p, x} in (u, v) order? (equal weights.)'''
+    return (min(v, x), max(v, x)) < (min(p, x), max(p, x))
+
+def prim_matrix(M):
+    '''
+    O(|V|^2) Prim on an adj matrix, for dense graphs. No heap: key[x] is the
+    cheapest edge from the tree to x, each step takes the smallest key (one
+    pass over key) and folds the new node's row into key (one pass over the
+    row). Both passes run over whole rows, see the Floyd-Warshall row update.
+
+    @type M: list of lists
+    @param M: adj_matrix_directed_weighted style, inf = no edge. treated as
+              undirected: {u, v} weighs min(M[u][v], M[v][u]).
+
+    @rtype: list
+    @return: tree edges as (u, v, w) with u < v.
+    '''
+    n = len(M)
+    inf = float('inf')
+    rows = []
+    for u, col in enumerate(zip(*M)):
+        row = [a if a <= b else b for a, b in zip(M[u], col)]
+        row[u] = inf                    #no self-loops.
+        rows.append(row)
+
+    done = -inf                         #key of nodes already in the tree.
+    key = [inf] * n
+    parent = [-1] * n
+    tree = []
+    for step in range(n):
+        m = min(filter(done.__lt__, key))
+        if m == inf:                    #new component: any node left.
+            x = next(x for x in range(n) if key[x] == inf)
+        else:
+            ties = [x for x in range(n) if key[x] == m]
+            x = min(ties, key=lambda x: (min(x, parent[x]), max(x, parent[x])))
+            tree.append((min(x, parent[x]), max(x, parent[x]), float(m)))
+        key[x] = done
+        row = rows[x]
+        for y in [y for y, w, kw in zip(range(n), row, key) if w <= kw and w < inf]:
+            if row[y] < key[y] or _edge_before(x, y, parent[y]):
+                key[y] = row[y]
+                parent[y] = x
+    return tree
+
+def prim(G):
+    '''
+    Minimum spanning tree (forest) of G, same result as kruskal(G).
+
+    @type G: list of dicts, dict of dicts, or weighted adj matrix
+    @param G: the weighted graph, treated as undirected. an adj matrix uses
+              the O(|V|^2) version, anything else the heap version.
+
+    @rtype: tuple
+    @return: (total weight, [(u, v, w), ...] tree edges).
+    '''
+    if type(G) == list and G and type(G[0]) == list:
+        tree = sorted(prim_matrix(G), key=lambda e: (e[2], e[0], e[1]))
+        return sum(w for u, v, w in tree), tree
+    nodes, us, vs, ws = undirected_edges(G)
+    return _tree(nodes, us, vs, ws, prim_edges(len(nodes), us, vs, ws))
+
+
+
+def _cheapest(task):
+    '''
+    Borůvka step on edges live[lo:hi]: cheapest edge (by rank) leaving each
+    component. worker side, reads the shared arrays.
+    '''
+    handles, lo, hi = task
+    blocks, views = attach_arrays(handles)
+    try:
+        return _cheapest_edges(*views, lo, hi)
+    finally:
+        release_arrays(blocks, views)
+
+def _cheapest_edges(us, vs, rank, comp, live, lo, hi):
+    best = {}
+    for k in live[lo:hi]:
+        cu, cv = comp[us[k]], comp[vs[k]]
+        if cu == cv:    continue
+        r = rank[k]
+        if r < best.get(cu, (r + 1, 0))[0]:     best[cu] = (r, k)
+        if r < best.get(cv, (r + 1, 0))[0]:     best[cv] = (r, k)
+    return best
+
+def boruvka_edges(n, us, vs, ws, workers=1, chunk=50000):
+    '''
+    Borůvka: every round, every component picks its cheapest outgoing edge
+    and all of them are added at once. Each round at least halves the number
+    of components, so there are <= lg |V| rounds of one pass over the edges.
+    The pass is split into chunks of edges, over worker processes if
+    workers > 1 (each one returns its best per component, then the parent
+    takes the min).
+
+    @rtype: list
+    @return: numbers k of the tree edges.
+    '''
+    rank = _ranks(ws)
+    uf = UnionFind(n)
+    picked = []
+    live = array('l', range(len(ws)))
+    while len(live):
+        comp = uf.find_many(range(n))
+        if workers > 1 and len(live) > chunk:
+            blocks, handles = share_arrays(us, vs, rank, comp, live)
+            try:
+                tasks = [(handles, lo, lo + chunk) for lo in range(0, len(live), chunk)]
+                parts = run_in_processes(_cheapest, tasks, workers)
+            finally:
+                release_arrays(blocks, unlink=True)
+        else:
+            parts = [_cheapest_edges(us, vs, rank, comp, live, 0, len(live))]
+
+        best = {}
+        for part in parts:
+            for c, (r, k) in part.items():
+                if r < best.get(c, (r + 1, 0))[0]:     best[c] = (r, k)
+        if not best:    break           #no edge leaves any component.
+        for r, k in best.values():
+            if uf.union(us[k], vs[k]):      #2 components can pick the same edge.
+                picked.append(k)
+        find = uf.find
+        live = array('l', [k for k in live if find(us[k]) != find(vs[k])])
+    return picked
+
+def boruvka(G, workers=1):
+    '''
+    Minimum spanning tree (forest) of G, same result as kruskal(G).
+
+    @rtype: tuple
+    @return: (total weight, [(u, v, w), ...] tree edges).
+    '''
+    nodes, us, vs, ws = undirected_edges(G)
+    return _tree(nodes, us, vs, ws, boruvka_edges(len(nodes), us, vs, ws, workers))
+
+
+
+def test_kruskal():
+    print("\nrunning test_kruskal()...")
+    for mode in ('sort', 'filter'):
+        total, tree = kruskal(adj_list_of_dicts, mode)
+        print("%-6s adj_list_of_dicts:" % mode, total, tree)
+    print("adj matrix:", kruskal(adj_matrix_directed_weighted)[0])
+
+    nodes, us, vs, ws = undirected_edges(adj_list_of_dicts)
+    total, tree = kruskal_external(zip(us, vs, ws), len(nodes), chunk=4)
+    print("external, runs of 4 edges:", total, tree)
+
+def bench_kruskal(n=2000, m=400000):
+    print("\nrunning bench_kruskal()...")
+    G = random_weighted_graph(n, m, max_weight=100000, seed=10)
+    start = time.time()
+    nodes, us, vs, ws = undirected_edges(G)
+    print("%d undirected edges, extracted in %.2fs" % (len(ws), time.time() - start))
+
+    start = time.time()
+    order = sorted(zip(ws, range(len(ws)), us, vs))     #the tuple way, for comparison.
+    print("sort (w, k, u, v) tuples:  %.2fs" % (time.time() - start))
+    del order
+    results = {}
+    for mode in ('sort', 'filter'):
+        start = time.time()
+        results[mode] = sorted(kruskal_edges(len(nodes), us, vs, ws, mode, seed=1))
+        print("kruskal %-6s %.2fs, %d tree edges" % (mode, time.time() - start, len(results[mode])))
+    print("same tree?", results['sort'] == results['filter'])
+
+    start = time.time()
+    total, tree = kruskal_external(zip(us, vs, ws), n, chunk=100000)
+    print("external (runs of 100000): %.2fs, same weight? %s" %
+          (time.time() - start, total == sum(ws[k] for k in results['sort'])))
+
+def test_prim_and_boruvka():
+    print("\nrunning test_prim_and_boruvka()...")
+    expected = kruskal(adj_list_of_dicts)
+    print("prim heap:  ", prim(adj_list_of_dicts))
+    print("prim matrix:", prim(adj_matrix_directed_weighted))
+    print("boruvka:    ", boruvka(adj_list_of_dicts))
+    print("all same as kruskal?", expected == prim(adj_list_of_dicts) ==
+          prim(adj_matrix_directed_weighted) == boruvka(adj_list_of_dicts, workers=2))
+
+    ties = {'a': {'b': 1, 'c': 1}, 'b': {'c': 1, 'd': 2}, 'c': {'d': 2}, 'd': {},
+            'e': {'f': 1}, 'f': {}}         #lots of ties, 2 components.
+    print("ties, forest:", kruskal(ties), "all same?",
+          kruskal(ties) == kruskal(ties, 'filter') == prim(ties) == boruvka(ties))
+
+def to_matrix(G):
+    inf = float('inf')
+    M = [[inf] * len(G) for x in range(len(G))]
+    for x in range(len(G)):
+        M[x][x] = 0
+        for y, w in G[x].items():
+            M[x][y] = min(M[x][y], w)
+    return M
+
+def bench_mst(n=800):
+    """
+    time every MST alg on graphs from sparse to dense, same n, all starting
+    from the adj matrix: the edge list algs pay for pulling the edges out.
+    """
+    print("\nrunning bench_mst()...")
+    for m in (2 * n, 10 * n, 50 * n, n * n // 2):
+        M = to_matrix(random_weighted_graph(n, m, max_weight=1000, seed=11))
+        start = time.time()
+        nodes, us, vs, ws = undirected_edges(M)
+        extract = time.time() - start
+        algs = (("kruskal", lambda: kruskal_edges(n, us, vs, ws)),
+                ("filter-kruskal", lambda: kruskal_edges(n, us, vs, ws, 'filter', seed=1)),
+                ("prim heap", lambda: prim_edges(n, us, vs, ws)),
+                ("prim matrix", lambda: prim_matrix(M)),
+                ("boruvka", lambda: boruvka_edges(n, us, vs, ws)),
+                ("boruvka x4", lambda: boruvka_edges(n, us, vs, ws, workers=4)))
+        times = {}
+        weights = set()
+        for name, run in algs:
+            start = time.time()
+            tree = run()
+            times[name] = time.time() - start
+            if name == "prim matrix":
+                weights.add(sum(w for u, v, w in tree))
+            else:
+                times[name] += extract
+                weights.add(sum(ws[k] for k in tree))
+        print("n=%d m=%-6d %s -> fastest: %s, same weight? %s" %
+              (n, len(ws), ", ".join("%s %.3fs" % item for item in times.items()),
+               min(times, key=times.get), len(weights) == 1))
+
+def main():
+    test_kruskal()
+    test_prim_and_boruvka()
+    bench_kruskal()
+    bench_mst()
+
+if __name__ == "__main__":
+    main()
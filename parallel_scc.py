@@ -0,0 +1,304 @@
+'''
+Parallel Strongly Connected Components using forward-backward (FW-BW)
+decomposition plus trimming.
+
+Kosaraju (scc() in topsort_and_scc.py) is linear, but it is 2 DFS runs that
+have to happen in order, so it can't use more than one core. FW-BW splits
+the graph into pieces that can't share an SCC, so the pieces can be solved
+independently (i.e. in parallel):
+
+    1) trim: a node with no in-edges or no out-edges (inside the piece) can't
+       be on a cycle, so it is an SCC by itself. remove it, repeat.
+    2) pick a pivot p. F = nodes p can reach, B = nodes that can reach p.
+       F & B is exactly the SCC of p.
+    3) every other SCC is entirely inside one of: F - B, B - F, or the rest
+       (S - F - B). those 3 pieces are independent subproblems.
+
+The parent process does FW-BW splits until there are enough pieces to keep
+the workers busy, then the pieces are dealt out to worker processes.
+The graph is converted to CSR arrays (see csr.py) which are placed in shared
+memory, so workers only get sent the node ids of their piece.
+
+Orzan's "coloring" decomposition is another way to make independent pieces;
+FW-BW + trimming already handles the giant-SCC-plus-many-small-ones shape
+that dependency graphs usually have, so we only do FW-BW here.
+
+Benchmark: bench_scc_parallel() times 1, 2, 4, 8, 16 workers. The parallel
+speedup is against workers=1 (the same FW-BW, no processes). You only get
+one when the graph splits into several big pieces AND the machine has the
+cores. scc() is timed too, but only as an algorithmic baseline: its visited
+list makes it O(V^2), so beating it says nothing about parallelism.
+'''
+
+import time
+
+from graphs import *
+from csr import node_list, to_csr, reverse_csr, share_arrays, attach_arrays, release_arrays
+from process_pool import run_in_processes
+from topsort_and_scc import scc
+
+
+def _reach(s, S, offsets, targets):
+    '''nodes in S reachable from s (following edges in offsets/targets).'''
+    seen = {s}
+    stk  = [s]
+    while stk:
+        x = stk.pop()
+        for k in range(offsets[x], offsets[x+1]):
+            y = targets[k]
+            if y in S and y not in seen:
+                seen.add(y)
+                stk.append(y)
+    return seen
+
+def _trim(S, offsets, targets, rev_offsets, rev_targets, out):
+    '''
+    Repeatedly remove nodes of S with in or out degree 0 (inside S).
+    Each removed node is a 1 node SCC and gets appended to out.
+    Returns what is left of S.
+    '''
+    outdeg = {}
+    indeg  = {}
+    for x in S:
+        outdeg[x] = sum(1 for k in range(offsets[x], offsets[x+1]) if targets[k] in S)
+        indeg[x]  = sum(1 for k in range(rev_offsets[x], rev_offsets[x+1]) if rev_targets[k] in S)
+
+    to_trim = [x for x in S if outdeg[x] == 0 or indeg[x] == 0]
+    S = set(S)
+    while to_trim:
+        x = to_trim.pop()
+        if x not in S:  continue        #already trimmed.
+        S.discard(x)
+        out.append([x])
+        for k in range(offsets[x], offsets[x+1]):           #lose an in-edge.
+            y = targets[k]
+            if y in S:
+                indeg[y] -= 1
+                if indeg[y] == 0:   to_trim.append(y)
+        for k in range(rev_offsets[x], rev_offsets[x+1]):   #lose an out-edge.
+            y = rev_targets[k]
+            if y in S:
+                outdeg[y] -= 1
+                if outdeg[y] == 0:  to_trim.append(y)
+    return S
+
+def _fwbw_split(S, offsets, targets, rev_offsets, rev_targets, out):
+    '''
+    One round of trim + FW-BW on piece S. Found SCCs are appended to out,
+    returns the (up to 3) independent pieces that are left.
+    '''
+    S = _trim(S, offsets, targets, rev_offsets, rev_targets, out)
+    if not S:
+        return []
+    pivot = next(iter(S))
+    F = _reach(pivot, S, offsets, targets)
+    B = _reach(pivot, S, rev_offsets, rev_targets)
+    component = F & B
+    out.append(list(component))
+    pieces = (F - component, B - component, S - F - B)
+    return [p for p in pieces if p]
+
+def _fwbw(S, offsets, targets, rev_offsets, rev_targets):
+    '''Solve piece S completely, returns its list of SCCs (lists of ids).'''
+    out = []
+    pending = [S]       #explicit stack instead of recursion.
+    while pending:
+        pending.extend(_fwbw_split(pending.pop(), offsets, targets,
+                                   rev_offsets, rev_targets, out))
+    return out
+
+def _solve_piece(task):
+    '''worker side: attach to the shared graph and solve one piece.'''
+    handles, piece = task
+    blocks, views = attach_arrays(handles)
+    try:
+        return _fwbw(set(piece), *views)
+    finally:
+        release_arrays(blocks, views)
+
+
+
+def fb_components(G, workers=4, min_piece=64):
+    '''
+    Strongly connected components of G using FW-BW in parallel.
+
+    @type G: list of lists, list of sets, dict of sets
+    @param G: directed graph.
+
+    @type workers: int
+    @param workers: number of worker processes. 1 means solve everything in
+                    this process (the sequential path).
+
+    @type min_piece: int
+    @param min_piece: pieces smaller than this are not worth splitting
+                      further in the parent before handing them out.
+
+    @rtype: list
+    @return: list of SCCs, each a list of node names.
+    '''
+    nodes, index, offsets, targets = to_csr(G)
+    rev_offsets, rev_targets = reverse_csr(offsets, targets)
+    graph = (offsets, targets, rev_offsets, rev_targets)
+
+    if workers <= 1:
+        found = _fwbw(set(range(len(nodes))), *graph)
+    else:
+        #split in the parent until there is enough work for every worker.
+        found   = []
+        pending = [set(range(len(nodes)))]
+        while pending and len(pending) < 4 * workers:
+            big = [p for p in pending if len(p) >= min_piece]
+            if not big: break
+            pending = [p for p in pending if len(p) < min_piece]
+            for p in big:
+                pending.extend(_fwbw_split(p, *graph, found))
+
+        #biggest pieces first so round robin spreads them across workers.
+        pending.sort(key=len, reverse=True)
+        blocks, handles = share_arrays(*graph)
+        try:
+            tasks = [(handles, list(p)) for p in pending]
+            for comps in run_in_processes(_solve_piece, tasks, workers):
+                found.extend(comps)
+        finally:
+            release_arrays(blocks, unlink=True)
+
+    return [[nodes[i] for i in comp] for comp in found]
+
+def scc_parallel(G, workers=4):
+    '''
+    Parallel scc(): same shape, {representative: SCC id}, one entry per SCC.
+
+    Same SCCs as scc(), but not the same representatives and ids: scc()
+    picks them in Kosaraju's dfs order, and that order is exactly the
+    sequential part FW-BW avoids. Here the representative is the SCC's
+    first node in G (node_list() order) and ids are 0, 1, 2, ... in that
+    order, so the map is the same whatever order the workers finish in.
+
+    Use scc_labels() for EVERY node -> its SCC id, fb_components() for the
+    members of every SCC as lists.
+
+    @rtype: dict
+    @return: representative -> SCC id.
+    '''
+    sccs = {}
+    for x, i in scc_labels(G, workers).items():
+        if i == len(sccs):  sccs[x] = i     #first node of SCC i.
+    return sccs
+
+def scc_labels(G, workers=4):
+    '''
+    EVERY node -> its SCC id, ids and order as in scc_parallel().
+
+    @rtype: dict
+    @return: node -> SCC id.
+    '''
+    nodes = node_list(G)
+    comp_of = {}
+    for comp in fb_components(G, workers):
+        for x in comp:  comp_of[x] = comp[0]
+    ids = {}
+    sccs = {}
+    for x in nodes:
+        sccs[x] = ids.setdefault(comp_of[x], len(ids))
+    return sccs
+
+
+
+def kosaraju_members(G, sccs):
+    '''
+    Every node -> scc()'s id for its SCC, from scc()'s representatives.
+
+    scc() numbers SCCs in the order its 2nd dfs pass starts them, and
+    the representative is where each one starts. Rerunning that pass, from
+    the representatives in id order and never entering visited nodes,
+    visits exactly the members of each SCC again.
+    '''
+    label = {}
+    for r in sorted(sccs, key=sccs.get):
+        label[r] = sccs[r]
+        stk = [r]
+        while stk:
+            x = stk.pop()
+            for y in G[x]:
+                if y not in label:
+                    label[y] = sccs[r]
+                    stk.append(y)
+    return label
+
+def same_partition(label, other):
+    '''
+    True iff 2 node -> component id maps split the nodes the same way (ids
+    can differ, but have to match 1 to 1).
+    '''
+    if label.keys() != other.keys():    return False
+    forward, backward = {}, {}
+    for x in label:
+        a, b = label[x], other[x]
+        if forward.setdefault(a, b) != b or backward.setdefault(b, a) != a:
+            return False
+    return True
+
+def test_scc_parallel():
+    print("\nrunning test_scc_parallel()...")
+    for name, G in (("graph3", graph3), ("graph_scc", graph_scc), ("graph1", graph1)):
+        comps = fb_components(G, workers=2, min_piece=2)
+        print(name, "sccs:", sorted(sorted(c) for c in comps))
+        print(name, "scc_parallel:", scc_parallel(G, workers=2))
+        labels = scc_labels(G, workers=2)
+        print(name, "scc_labels:", labels)
+        if type(G) == dict:     #reverse() (used by scc()) only does dicts.
+            print(name, "same as scc()?", same_partition(kosaraju_members(G, scc(G)), labels),
+                  "same number of sccs?", len(scc_parallel(G, workers=2)) == len(scc(G)))
+    wrong = dict(scc_labels(graph_scc, workers=1))
+    wrong['a'], wrong['h'] = wrong['h'], wrong['a']
+    print("swapped 2 nodes, still the same?",
+          same_partition(kosaraju_members(graph_scc, scc(graph_scc)), wrong))
+
+def bench_scc_parallel(n=10000, m=25000, pieces=16):
+    '''
+    Benchmark graph: `pieces` random graphs glued together by one-way edges,
+    so there are several big SCCs in independent FW-BW pieces.
+
+    Parallel speedup is against workers=1, the same FW-BW in one process.
+    scc() is timed separately as an algorithmic baseline (its recursive dfs
+    + visited list is O(V^2), so n stays small).
+    '''
+    import sys
+    print("\nrunning bench_scc_parallel()...")
+    size = n // pieces
+    G = {}
+    for p in range(pieces):
+        sub = random_graph(size, m // pieces, seed=p)
+        for x, nbrs in enumerate(sub):
+            G[x + p*size] = {y + p*size for y in nbrs}
+    for p in range(1, pieces):
+        G[(p-1)*size].add(p*size)       #piece p-1 -> piece p, no cycles.
+
+    limit = sys.getrecursionlimit()
+    sys.setrecursionlimit(max(limit, 4 * n))    #scc()'s dfs recurses per node.
+    try:
+        start = time.time()
+        expected = kosaraju_members(G, scc(G))
+        sequential = time.time() - start
+    finally:
+        sys.setrecursionlimit(limit)
+    print("scc() (Kosaraju, O(V^2)): %.3fs (%d sccs)" % (sequential, len(set(expected.values()))))
+    one = None
+    for workers in (1, 2, 4, 8, 16):
+        start = time.time()
+        found = scc_labels(G, workers=workers)
+        elapsed = time.time() - start
+        one = one or elapsed
+        print("workers=%2d: %.3fs, parallel speedup over workers=1 %.2fx %s" %
+              (workers, elapsed, one / elapsed,
+               "ok" if same_partition(expected, found) else "MISMATCH"))
+    print("FW-BW workers=1 vs scc(): %.1fx faster, from the algorithm, not parallelism" %
+          (sequential / one))
+
+def main():
+    test_scc_parallel()
+    bench_scc_parallel()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+'''
+MANY paths from ONE predecessor array at once.
+
+find_path() rebuilds one path by walking edge_to from t back to s, append()
++ reverse(), and gives back a string when there's no path. For paths to 100k
+targets from the same s we want:
+    offsets, nodes, reachable = batch_paths(edge_to, s, targets)
+    path k = nodes[offsets[k]:offsets[k+1]]     (s first, targets[k] last)
+    reachable[k] = 0 if targets[k] can't be reached from s (empty path).
+A CSR layout like csr.py's: 2 flat arrays, no per-path objects.
+
+edge_to is an ARRAY of ints, edge_to[x] = predecessor of x, -1 = none (what
+dijkstra_csr() returns; bellman_ford.spfa() too).
+
+How:
+    1. POINTER JUMPING for every node's depth below s: anc = edge_to,
+       dist = 1 (0 for roots). each round
+           dist[x] += dist[anc[x]];  anc[x] = anc[anc[x]]
+       doubles how far up anc points, so after log2(depth) rounds anc[x] is
+       x's root and dist[x] its depth. x is reachable iff its root is s.
+       (a cycle in edge_to never gets to a root: unreachable.)
+    2. offsets = running sum of (depth + 1) of the targets.
+    3. fill: paths from the same s SHARE their beginnings. each target
+       walks up only until a node that is already in the output (where[x]
+       = its position), copies s ... x from there with one slice assignment
+       (memcpy) and writes just the new nodes after it. python work = number
+       of DIFFERENT tree nodes on all the paths, not the size of the output.
+
+    >>> dist, edge_to = dijkstra_csr(offsets, targets, weights, s)
+    >>> offs, nodes, reachable = batch_paths(edge_to, s, range(n))
+'''
+
+import time
+from array import array
+from itertools import accumulate
+from operator import add
+
+from graphs import *
+from csr import to_csr
+from bfs import bfs, find_path
+
+
+def path_depths(edge_to, s):
+    '''
+    Pointer jumping, see top of file.
+
+    @rtype: tuple
+    @return: (root, depth) lists: root[x] = where x's predecessor chain ends
+             (-1 if it never ends, a cycle), depth[x] = its length.
+    '''
+    n = len(edge_to)
+    anc = [x if p < 0 else p for x, p in enumerate(edge_to)]
+    dist = [0 if p < 0 else 1 for p in edge_to]
+    if n:   anc[s], dist[s] = s, 0          #s is the root, whatever edge_to says.
+    for r in range(n.bit_length() + 1):
+        jumped = list(map(anc.__getitem__, anc))
+        if jumped == anc:   break
+        dist = list(map(add, dist, map(dist.__getitem__, anc)))
+        anc = jumped
+    root = [a if anc[a] == a else -1 for a in anc]
+    return root, dist
+
+def batch_paths(edge_to, s, targets):
+    '''
+    @type edge_to: array, list
+    @param edge_to: edge_to[x] = predecessor of x on its path from s, -1 = none.
+
+    @type s: int
+    @param s: source.
+
+    @type targets: iterable of ints
+    @param targets: nodes to get the paths to.
+
+    @rtype: tuple
+    @return: (offsets, nodes, reachable): path to targets[k] is
+             nodes[offsets[k]:offsets[k+1]], s first. reachable is a
+             bytearray, 0 = no path (and an empty slice).
+    '''
+    targets = list(targets)
+    root, depth = path_depths(edge_to, s)
+    reachable = bytearray(root[t] == s for t in targets)
+    lengths = [depth[t] + 1 if ok else 0 for t, ok in zip(targets, reachable)]
+    offsets = array('l', [0])
+    offsets.extend(accumulate(lengths))
+    out = array('l', [0]) * offsets[-1]
+
+    where = array('l', [-1]) * len(edge_to)     #x -> its position in out, once written.
+    for k, t in enumerate(targets):
+        if not reachable[k]:    continue
+        chain = []
+        x = t
+        while where[x] < 0 and x != s:          #walk up to the first written node.
+            chain.append(x)
+            x = edge_to[x]
+        lo = offsets[k]
+        d = depth[x]
+        if where[x] < 0:                        #x is s, first time.
+            out[lo] = s
+        else:                                   #copy s ... x, in C.
+            out[lo:lo + d + 1] = out[where[x] - d:where[x] + 1]
+        where[x] = lo + d
+        chain.reverse()
+        out[lo + d + 1:offsets[k+1]] = array('l', chain)
+        for i, y in enumerate(chain, lo + d + 1):
+            where[y] = i
+    return offsets, out, reachable
+
+def path_of(offsets, nodes, reachable, k):
+    '''@return: path k as a tuple like find_path() (None if unreachable).'''
+    return tuple(nodes[offsets[k]:offsets[k+1]]) if reachable[k] else None
+
+def edge_to_array(edge_to, index):
+    '''bfs()/dfs() edge_to dict -> array over the csr ids in index.'''
+    arr = array('l', [-1]) * len(index)
+    for x, p in edge_to.items():
+        if p is not None:
+            arr[index[x]] = index[p]
+    return arr
+
+
+
+def paths_one_by_one(edge_to, s, targets):
+    '''the slow way, find_path()'s walk for every target.'''
+    paths = []
+    for t in targets:
+        path = [t]
+        while path[-1] != s and edge_to[path[-1]] >= 0:
+            path.append(edge_to[path[-1]])
+        if path[-1] != s:
+            paths.append(None)
+            continue
+        path.reverse()
+        paths.append(tuple(path))
+    return paths
+
+def test_batch_paths():
+    print("\nrunning test_batch_paths()...")
+    nodes, index, offsets, targets = to_csr(graph3)
+    edge_to = edge_to_array(bfs(graph3, 'h'), index)
+    offs, out, reachable = batch_paths(edge_to, index['h'], range(len(nodes)))
+    print("offsets:", list(offs), "reachable:", list(reachable))
+    for x in ('d', 'a'):
+        p = path_of(offs, out, reachable, index[x])
+        print("h -> %s:" % x, p and tuple(nodes[i] for i in p), " find_path:", find_path(graph3, bfs, 'h', x))
+    looped = array('l', [-1, 0, 3, 2, 1])       #2 <-> 3 is a cycle, 4 hangs off 1.
+    print("with a cycle:", list(batch_paths(looped, 0, range(5))[2]))
+
+def bench_batch_paths(n=200000, m=1000000, queries=100000):
+    from random import Random
+    from lca import random_tree
+    print("\nrunning bench_batch_paths()...")
+    G = random_graph(n, m, seed=26)
+    nodes, index, offsets, targets = to_csr(G)
+    rng = Random(27)
+    for name, edge_to in (("bfs tree", edge_to_array(bfs(G, 0), index)),
+                          ("deep tree", array('l', [-1 if p is None else p for p in
+                                                    random_tree(n, seed=28, reach=2000).values()]))):
+        wanted = [rng.randrange(n) for i in range(queries)]
+        start = time.time()
+        slow = paths_one_by_one(edge_to, 0, wanted)
+        t_slow = time.time() - start
+        start = time.time()
+        offs, out, reachable = batch_paths(edge_to, 0, wanted)
+        t_batch = time.time() - start
+        same = slow == [path_of(offs, out, reachable, k) for k in range(queries)]
+        print("%-9s %d paths, %d nodes: one by one %.2fs, batch %.2fs, same? %s" %
+              (name, queries, len(out), t_slow, t_batch, same))
+
+def main():
+    test_batch_paths()
+    bench_batch_paths()
+
+if __name__ == "__main__":
+    main()
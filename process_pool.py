@@ -0,0 +1,88 @@
+'''
+Tiny process pool: fan a list of independent tasks out over worker processes.
+
+Why not multiprocessing.Pool or concurrent.futures.ProcessPoolExecutor?
+Both do 'import queue' internally, and when you run any script from this
+directory python finds OUR queue.py (the demo Queue class) first instead of
+the standard library one, so they blow up with:
+    ImportError: cannot import name 'Empty' from 'queue'
+multiprocessing.Process and multiprocessing.Pipe don't need the stdlib queue,
+so we build a (static, chunked) pool out of those.
+
+Tasks are dealt out round robin, each worker runs its share and sends back
+its results through a pipe. Results come back in the same order as tasks.
+
+The task function has to be a top level function (not a closure/lambda) so
+it can be found by the child process.
+'''
+
+import multiprocessing as mp
+
+
+def _worker(conn, func, tasks):
+    try:
+        conn.send([func(t) for t in tasks])
+    except BaseException as err:        #ship the error back to the parent.
+        conn.send(err)
+    conn.close()
+
+def run_in_processes(func, tasks, workers=2):
+    '''
+    Same as [func(t) for t in tasks] but split across worker processes.
+
+    workers <= 1 (or 0/1 tasks) runs everything in this process, which is
+    the "sequential path" benchmarks compare against.
+
+    @type func: function
+    @param func: top level function taking one task.
+
+    @type tasks: list
+    @param tasks: picklable task args.
+
+    @type workers: int
+    @param workers: number of processes to use.
+
+    @rtype: list
+    @return: func(t) for every t in tasks, in order.
+    '''
+    tasks = list(tasks)
+    workers = min(workers, len(tasks))
+    if workers <= 1:
+        return [func(t) for t in tasks]
+
+    procs = []
+    for w in range(workers):
+        recv_end, send_end = mp.Pipe(duplex=False)
+        p = mp.Process(target=_worker, args=(send_end, func, tasks[w::workers]))
+        p.start()
+        send_end.close()        #parent only reads.
+        procs.append((p, recv_end))
+
+    results = [None] * len(tasks)
+    error = None
+    for w, (p, recv_end) in enumerate(procs):
+        chunk = recv_end.recv()     #recv before join, else big results deadlock.
+        p.join()
+        if isinstance(chunk, BaseException):
+            error = chunk
+            continue
+        results[w::workers] = chunk
+    if error is not None:
+        raise error
+    return results
+
+
+
+def _square(x):
+    return x * x
+
+def test_run_in_processes():
+    print("\nrunning test_run_in_processes()...")
+    print("1 worker: ", run_in_processes(_square, range(10), workers=1))
+    print("3 workers:", run_in_processes(_square, range(10), workers=3))
+
+def main():
+    test_run_in_processes()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+'''
+Radix heap: a monotone priority queue for integer priorities.
+
+"Monotone" means you never push something smaller than the last thing you
+popped. Dijkstra with non-negative integer weights is monotone: every new
+distance is (popped distance + weight) >= popped distance.
+
+Instead of comparing items like a binary heap does, bucket them by the
+highest bit where their priority differs from `last` (the last popped
+priority):
+    bucket[0]  : priority == last
+    bucket[b]  : highest differing bit is bit b-1
+When bucket[0] is empty, find the first non-empty bucket, make its minimum
+the new `last`, and re-bucket its items. Every item can only move to a lower
+bucket, so it moves at most ~64 times in total: O(log C) amortized per item
+where C is the biggest weight, no comparisons against other items.
+
+Like heapq, an update with a smaller priority just adds another entry, and
+pop() skips entries that are out of date (lazy deletion).
+
+    >>> h = RadixHeap()
+    >>> h.update('a', 5); h.update('b', 3); h.update('a', 4)
+    >>> h.pop(), h.pop()
+    (('b', 3), ('a', 4))
+'''
+
+
+class RadixHeap(object):
+
+    def __init__(self):
+        self.last    = 0
+        self.buckets = [[] for i in range(65)]
+        self.best    = {}       #key -> current priority (keys still queued).
+
+    def __len__(self):
+        return len(self.best)
+
+    def __contains__(self, key):
+        return key in self.best
+
+    def update(self, key, priority):
+        '''push key, or lower its priority if the new one is smaller.'''
+        if priority != int(priority):
+            raise ValueError("radix heap needs integer priorities, got %r" % (priority,))
+        priority = int(priority)
+        if priority < self.last:
+            raise ValueError("radix heap is monotone, %d < last popped %d"
+                             % (priority, self.last))
+        old = self.best.get(key)
+        if old is not None and old <= priority:
+            return
+        self.best[key] = priority
+        self.buckets[(priority ^ self.last).bit_length()].append((priority, key))
+
+    push = update
+
+    def pop(self):
+        '''remove and return (key, priority) with the smallest priority.'''
+        buckets, best = self.buckets, self.best
+        while True:
+            if not buckets[0]:
+                i = 1
+                while i < len(buckets) and not buckets[i]:
+                    i += 1
+                if i == len(buckets):
+                    raise IndexError("pop from empty radix heap")
+                items = buckets[i]
+                buckets[i] = []
+                last = self.last = min(items)[0]
+                for item in items:
+                    buckets[(item[0] ^ last).bit_length()].append(item)
+            priority, key = buckets[0].pop()
+            if best.get(key) == priority:   #else a stale entry, skip.
+                del best[key]
+                return key, priority
+
+
+
+def test_radix_heap():
+    print("\nrunning test_radix_heap()...")
+    h = RadixHeap()
+    for key, p in [('a', 5), ('b', 9), ('c', 1), ('d', 7), ('e', 3)]:
+        h.update(key, p)
+    h.update('b', 2)
+    print("len:", len(h), "pops:", [h.pop() for i in range(len(h))])
+
+def main():
+    test_radix_heap()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+'''
+Reachability index: answer "can u reach v?" without traversing the graph on
+every query.
+
+Without an index the only way is to run a traversal from u (bfs(G, u) or
+dfs_recursive(G, u)) and check if v is in the edge_to it returns, so every
+query costs O(|V| + |E|).
+
+The index is built in 3 steps:
+    1) collapse every SCC into 1 node (nodes in the same SCC can all reach
+       each other). what's left is the "condensation", which is a DAG.
+    2) topological rank of every DAG node. if rank(u) > rank(v), u can't
+       reach v.
+    3) GRAIL interval labels: do d randomized DFS's over the DAG. in each one
+       node x gets the interval [low(x), post(x)] where post(x) is its post
+       order number and low(x) is the smallest post number of anything below
+       it. if u reaches v then v's interval is inside u's in EVERY traversal,
+       so a single interval that is not nested proves "no" in O(1).
+       the 1st traversal also keeps pre order numbers: if v is inside u's
+       DFS tree interval then the answer is "yes" in O(1).
+
+Only if none of the O(1) checks decide does the query fall back to a DFS
+over the DAG, and that DFS skips (prunes) every child whose labels already
+say it can't reach v.
+
+Index size is O(|V| + d * #sccs) ints plus the condensation DAG, all kept in
+flat arrays (see csr.py) so the size is predictable; index_bytes() reports it.
+
+    >>> idx = ReachabilityIndex(graph3)
+    >>> idx.reachable('a', 'h'), idx.reachable('h', 'a')
+    (True, False)
+'''
+
+import time
+from array import array
+from random import Random
+
+from graphs import *
+from csr import node_list
+from parallel_scc import fb_components
+
+
+class ReachabilityIndex(object):
+
+    def __init__(self, G, d=2, seed=None):
+        '''
+        @type G: list of lists, list of sets, dict of sets
+        @param G: directed graph, may have cycles.
+
+        @type d: int
+        @param d: number of GRAIL traversals (labels per node). more labels
+                  answer more "no" queries in O(1), but cost more memory.
+
+        @type seed: int
+        @param seed: seed for the randomized traversals.
+        '''
+        start = time.time()
+
+        #step 1: condense SCCs into DAG nodes.
+        nodes = node_list(G)
+        self.index = {x: i for i, x in enumerate(nodes)}
+        comps = fb_components(G, workers=1)
+        C = len(comps)
+        self.comp_of = array('l', [0]) * len(nodes)
+        for c, members in enumerate(comps):
+            for x in members:
+                self.comp_of[self.index[x]] = c
+
+        dag = [set() for c in range(C)]
+        for x in nodes:
+            cx = self.comp_of[self.index[x]]
+            for y in G[x]:
+                cy = self.comp_of[self.index[y]]
+                if cx != cy:    dag[cx].add(cy)
+        self.offsets = array('l', [0])
+        self.targets = array('l')
+        for c in range(C):
+            self.targets.extend(dag[c])
+            self.offsets.append(len(self.targets))
+
+        #step 2: topological rank (Kahn's alg, repeatedly remove in-degree 0).
+        indeg = array('l', [0]) * C
+        for c in self.targets:  indeg[c] += 1
+        ready = [c for c in range(C) if indeg[c] == 0]
+        roots = list(ready)
+        self.rank = array('l', [0]) * C
+        r = 0
+        while ready:
+            c = ready.pop()
+            self.rank[c] = r
+            r += 1
+            for k in range(self.offsets[c], self.offsets[c+1]):
+                y = self.targets[k]
+                indeg[y] -= 1
+                if indeg[y] == 0:   ready.append(y)
+
+        #step 3: d randomized DFS's for GRAIL labels.
+        rng = Random(seed)
+        self.low  = []
+        self.post = []
+        for i in range(d):
+            rng.shuffle(roots)
+            low, post, pre = self._label(roots, rng)
+            self.low.append(low)
+            self.post.append(post)
+            if i == 0:  self.pre = pre
+
+        self.build_time = time.time() - start
+
+    def _label(self, roots, rng):
+        '''one randomized iterative DFS over the DAG, returns low/post/pre.'''
+        C = len(self.rank)
+        offsets, targets = self.offsets, self.targets
+        low  = array('l', [0]) * C
+        post = array('l', [0]) * C
+        pre  = array('l', [0]) * C
+        visited = bytearray(C)
+        pre_count = post_count = 0
+        for r in roots:
+            if visited[r]:  continue
+            visited[r] = 1
+            pre[r] = pre_count
+            pre_count += 1
+            children = list(targets[offsets[r]:offsets[r+1]])
+            rng.shuffle(children)
+            stk = [(r, iter(children))]
+            while stk:
+                x, it = stk[-1]
+                for y in it:
+                    if not visited[y]:
+                        visited[y] = 1
+                        pre[y] = pre_count
+                        pre_count += 1
+                        children = list(targets[offsets[y]:offsets[y+1]])
+                        rng.shuffle(children)
+                        stk.append((y, iter(children)))
+                        break
+                else:   #all children done, x is finished (post order).
+                    stk.pop()
+                    post[x] = post_count
+                    lo = post_count
+                    for k in range(offsets[x], offsets[x+1]):
+                        if low[targets[k]] < lo:    lo = low[targets[k]]
+                    low[x] = lo
+                    post_count += 1
+        return low, post, pre
+
+    def _contains(self, cu, cv):
+        '''False means cu can NOT reach cv, True means maybe.'''
+        for low, post in zip(self.low, self.post):
+            if low[cv] < low[cu] or post[cv] > post[cu]:
+                return False
+        return True
+
+    def _reachable(self, cu, cv):
+        if cu == cv:                        return True
+        if self.rank[cu] > self.rank[cv]:   return False
+        if not self._contains(cu, cv):      return False
+        post = self.post[0]
+        if self.pre[cu] <= self.pre[cv] and post[cv] <= post[cu]:
+            return True                     #v is in u's DFS tree.
+
+        #pruned DFS fallback.
+        offsets, targets, rank, pre = self.offsets, self.targets, self.rank, self.pre
+        rv, pv, qv = rank[cv], pre[cv], post[cv]
+        seen = {cu}
+        stk  = [cu]
+        while stk:
+            x = stk.pop()
+            for k in range(offsets[x], offsets[x+1]):
+                y = targets[k]
+                if y in seen or rank[y] > rv:   continue
+                if pre[y] <= pv and qv <= post[y]:
+                    return True             #v is in y's DFS tree.
+                if not self._contains(y, cv):   continue
+                seen.add(y)
+                stk.append(y)
+        return False
+
+    def reachable(self, u, v):
+        '''
+        Is there a path from u to v? (a node always reaches itself.)
+        '''
+        return self._reachable(self.comp_of[self.index[u]],
+                               self.comp_of[self.index[v]])
+
+    def reachable_many(self, pairs):
+        '''
+        Batch version of reachable().
+
+        @type pairs: list of tuples
+        @param pairs: (u, v) queries.
+
+        @rtype: list
+        @return: list of True/False, one per pair.
+        '''
+        index, comp_of, query = self.index, self.comp_of, self._reachable
+        return [query(comp_of[index[u]], comp_of[index[v]]) for u, v in pairs]
+
+    def index_bytes(self):
+        '''bytes used by the flat arrays of the index (not the name dict).'''
+        arrays = [self.comp_of, self.offsets, self.targets, self.rank, self.pre]
+        arrays += self.low + self.post
+        return sum(len(arr) * arr.itemsize for arr in arrays)
+
+
+
+def test_reachability_index():
+    print("\nrunning test_reachability_index()...")
+    idx = ReachabilityIndex(graph3, seed=1)
+    print("graph3 a -> h:", idx.reachable('a', 'h'))
+    print("graph3 h -> a:", idx.reachable('h', 'a'))
+    print("graph3 h -> c:", idx.reachable('h', 'c'))   #same scc.
+    idx = ReachabilityIndex(graph_scc, seed=1)
+    print("graph_scc a -> d:", idx.reachable('a', 'd'))
+    print("graph_scc batch:", idx.reachable_many([('a', 'c'), ('d', 'g'), ('h', 'a')]))
+    print("build time: %.6fs, index bytes: %d" % (idx.build_time, idx.index_bytes()))
+
+def bench_reachability_index(n=20000, m=30000, queries=200000):
+    '''
+    compare the index against a bfs() per query on a random graph, and check
+    a sample of answers against bfs().
+    '''
+    from bfs import bfs
+    print("\nrunning bench_reachability_index()...")
+    G = random_graph(n, m, seed=7)
+    idx = ReachabilityIndex(G, seed=7)
+    print("n=%d m=%d sccs=%d dag edges=%d" %
+          (n, m, len(idx.rank), len(idx.targets)))
+    print("build time: %.3fs, index bytes: %d" % (idx.build_time, idx.index_bytes()))
+
+    rng = Random(7)
+    pairs = [(rng.randrange(n), rng.randrange(n)) for i in range(queries)]
+    start = time.time()
+    answers = idx.reachable_many(pairs)
+    elapsed = time.time() - start
+    print("%d queries: %.3fs (%.0f queries/s), %d reachable" %
+          (queries, elapsed, queries / elapsed, sum(answers)))
+
+    start = time.time()
+    ok = all((v in bfs(G, u)) == ans for (u, v), ans in zip(pairs[:50], answers))
+    elapsed = time.time() - start
+    print("bfs per query: %.0f queries/s, answers match? %s" % (50 / elapsed, ok))
+
+def main():
+    test_reachability_index()
+    bench_reachability_index()
+
+if __name__ == "__main__":
+    main()
@@ -12,6 +12,7 @@ from graphs import *
 #why does this have a different effect than 'import graphs' ?
 
 from dfs import dfs_recursive
+from cycles import find_cycle
 
 def reverse(G):
     '''
@@ -127,11 +128,17 @@ def topsort(G):
     For ex, steps to make a cake, order to take school courses, etc.
 
 
+    Raises ValueError (with the cycle found) if G is not a DAG, b/c then
+    there is no valid order and revpost would be meaningless.
+
     Dependencies:
         dfs_ordering
+        find_cycle
     '''
     #check if G is a DAG. if G has CYCLE, exit.
-    #TODO
+    cycle = find_cycle(G)
+    if cycle is not None:
+        raise ValueError("G is not a DAG, found cycle %s" % (cycle,))
 
     #run dfs_ordering on G for EVERY node to get a complete topsort.
     orderings = dfs_ordering(G)
@@ -154,9 +161,18 @@ def topsort(G):
 def test_topsort():
     print("\nrunning test_topsort()...")                    
     print("\ngraph3")
-    print("topsort graph3:", topsort(graph3))
+    try:
+        print("topsort graph3:", topsort(graph3))
+    except ValueError as err:
+        print("topsort graph3:", err)       #graph3 has cycles.
     print("\ngraph_scc")
-    print("topsort graph_scc:", topsort(graph_scc))
+    try:
+        print("topsort graph_scc:", topsort(graph_scc))
+    except ValueError as err:
+        print("topsort graph_scc:", err)
+    print("\ngraph3 without its cycles")
+    print("topsort:", topsort({'a': set('bcdef'), 'b': set('ce'), 'c': set('d'),
+                               'd': set('e'), 'e': set('f'), 'f': set()}))
 
 
 
@@ -171,7 +187,7 @@ def scc(G):
     2) for every node x in dfs_ordering.revpost(), run dfs.
 
     Dependencies:
-        topological sort
+        dfs_ordering (reverse post order, same as topological sort)
         reverse graph
 
     Alternate SCC algs:
@@ -190,15 +206,17 @@ def scc(G):
             dfs(G, y)                           #recursive call.
 
     #run dfs_ordering on reverse(G)) to get rev post ordering, 1st dfs run.
-    #(i.e. run topsort on G_reverse)
+    #(i.e. run topsort on G_reverse, but G_reverse usually has cycles which
+    #topsort() refuses, so ask dfs_ordering directly.)
     G_reverse = reverse(G)
-    topsort_order = topsort(G_reverse)  #topsort_order is just reverse post.
+    topsort_order = dfs_ordering(G_reverse)['revpost']
     
     #for every node x in dfs_ordering.revpost(), run dfs. 2nd dfs run.
+    #2nd run has to be on G (not G_reverse), else it walks out of the SCC.
     count = 0
     for node in topsort_order:
         if node in visited: continue    #belongs to another SCC, skip over.
-        dfs(G_reverse, node)
+        dfs(G, node)
         sccs[node] = count
         count += 1
 
@@ -214,8 +232,9 @@ def test_scc():
     my_sccs = scc(graph_scc)
     print("\nsccs graph_scc:", my_sccs)
     '''
-    output: graph3 only has 1 strongly connected component, the entire graph
-    sccs graph3: {'c': 0}
+    output: graph3 has 3 strongly connected components: {a}, {b}, and
+    {c,d,e,f,g,h} (a and b have no in-edges from the big cycle).
+    sccs graph3: {'c': 0, 'b': 1, 'a': 2}
 
     output: graph3 has 3 strongly connected component: 
     1st) node 'h' and its' SCC (just node 'h' by itself)
@@ -0,0 +1,193 @@
+'''
+Transitive closure and transitive reduction of a DAG using bitset rows.
+
+Transitive closure: add edge x -> y whenever there is ANY path from x to y.
+("which courses do I need before this one, directly or not?")
+
+Transitive reduction: the fewest edges with the same reachability, i.e.
+drop x -> y whenever there is another (longer) path from x to y.
+("which prerequisites do I actually have to list?")
+
+Naive closure runs a DFS from every node: O(|V| * (|V| + |E|)) with a python
+loop per edge per source. Instead:
+    * every node x gets a ROW: a python int used as a bitset, bit y is set
+      if x can reach y.
+    * go through the nodes in reverse topological order, so every successor
+      is done before x. then row(x) is just the OR of (bit y | row(y)) over
+      the successors y of x.
+One OR of 2 big ints handles |V| nodes at once (in C, 64 bits per step), so
+the cost is O(|E| * |V| / 64) word ops. Memory for all rows is |V|^2 bits.
+
+For the reduction: x -> y is redundant iff y is in row(z) of some other
+successor z of x. so keep_children(x) = children(x) - OR of their rows.
+
+Chunked mode: if |V|^2 bits don't fit in memory, only keep the bits for the
+target columns [lo, lo + chunk) at a time and make one pass per chunk.
+Each pass needs |V| * chunk bits.
+
+The topological order comes from topological_order() in csr.py (Kahn's alg)
+instead of topsort(): it isn't recursive and it tells us if G has a cycle.
+'''
+
+import time
+
+from graphs import *
+from csr import node_list, to_csr, topological_order
+
+
+def _csr_dag(G):
+    nodes, index, offsets, targets = to_csr(G)
+    order = topological_order(offsets, targets)
+    if order is None:
+        raise ValueError("G has a cycle, transitive closure/reduction needs a DAG")
+    return nodes, offsets, targets, order
+
+def _rows(offsets, targets, order, lo, hi):
+    '''bitset rows, only for target columns lo <= y < hi (bit 0 is node lo).'''
+    rows = [0] * (len(offsets) - 1)
+    for x in reversed(order):           #successors before predecessors.
+        r = 0
+        for k in range(offsets[x], offsets[x+1]):
+            y = targets[k]
+            r |= rows[y]
+            if lo <= y < hi:    r |= 1 << (y - lo)
+        rows[x] = r
+    return rows
+
+def _bits(r):
+    '''positions of the 1 bits of r.'''
+    while r:
+        low = r & -r
+        yield low.bit_length() - 1
+        r ^= low
+
+def _as_graph(G, nodes, children):
+    '''children[i] is a list of node ids, convert back to the shape of G.'''
+    if type(G) == dict:
+        return {nodes[i]: {nodes[j] for j in children[i]} for i in range(len(nodes))}
+    return [set(children[i]) for i in range(len(nodes))]
+
+
+
+def transitive_closure_rows(G):
+    '''
+    Compact transitive closure.
+
+    @type G: list of lists, list of sets, dict of sets
+    @param G: a DAG.
+
+    @rtype: tuple
+    @return: (nodes, rows) where bit j of rows[i] is set iff nodes[i] can
+             reach nodes[j] (by a path of 1 or more edges).
+    '''
+    nodes, offsets, targets, order = _csr_dag(G)
+    return nodes, _rows(offsets, targets, order, 0, len(nodes))
+
+def transitive_closure_chunks(G, chunk=4096):
+    '''
+    Memory bounded transitive closure: yields (lo, rows) one column chunk at
+    a time, bit j of rows[i] is set iff nodes[i] reaches nodes[lo + j].
+    Only one chunk's rows are alive at a time (|V| * chunk bits).
+
+    @rtype: generator
+    @return: (lo, rows) for lo = 0, chunk, 2*chunk, ...
+             (nodes are in node_list(G) order.)
+    '''
+    nodes, offsets, targets, order = _csr_dag(G)
+    for lo in range(0, len(nodes), chunk):
+        yield lo, _rows(offsets, targets, order, lo, lo + chunk)
+
+def transitive_closure(G):
+    '''
+    Transitive closure as a graph of the same shape as G (list of sets or
+    dict of sets). This is the big, non-compact form, so only use it for
+    small graphs; see transitive_closure_rows().
+    '''
+    nodes, rows = transitive_closure_rows(G)
+    return _as_graph(G, nodes, [list(_bits(r)) for r in rows])
+
+def transitive_reduction(G, chunk=None):
+    '''
+    Transitive reduction of DAG G, same shape as G.
+
+    @type chunk: int
+    @param chunk: if given, only keep chunk columns of the closure in memory
+                  at a time (slower, one pass per chunk).
+    '''
+    nodes, offsets, targets, order = _csr_dag(G)
+    n = len(nodes)
+    chunk = chunk or max(n, 1)
+
+    redundant = set()       #(x, y) edges implied by a longer path.
+    for lo in range(0, n, chunk):
+        rows = _rows(offsets, targets, order, lo, lo + chunk)
+        for x in range(n):
+            reach = 0           #everything reachable through x's children.
+            for k in range(offsets[x], offsets[x+1]):
+                reach |= rows[targets[k]]
+            if not reach:   continue
+            for k in range(offsets[x], offsets[x+1]):
+                y = targets[k]
+                if lo <= y < lo + chunk and (reach >> (y - lo)) & 1:
+                    redundant.add((x, y))
+
+    children = [[targets[k] for k in range(offsets[x], offsets[x+1])
+                 if (x, targets[k]) not in redundant] for x in range(n)]
+    return _as_graph(G, nodes, children)
+
+
+
+courses = {     #course -> courses that need it first.
+    'intro':        {'data structs', 'discrete math', 'algorithms'},
+    'discrete math':{'data structs', 'algorithms'},
+    'data structs': {'algorithms'},
+    'algorithms':   {'graph algs'},
+    'graph algs':   set()
+}
+
+def test_transitive():
+    print("\nrunning test_transitive()...")
+    closure = transitive_closure(courses)
+    print("closure of intro:", sorted(closure['intro']))
+    reduced = transitive_reduction(courses)
+    for x in courses:
+        print("reduced %s -> %s" % (x, sorted(reduced[x])))
+    print("chunked reduction same?", transitive_reduction(courses, chunk=2) == reduced)
+    try:
+        transitive_closure(graph3)
+    except ValueError as err:
+        print("graph3:", err)
+
+def bench_transitive(n=3000, m=15000, checked=200):
+    '''bitset closure vs a bfs() from (some of the) sources.'''
+    from bfs import bfs
+    print("\nrunning bench_transitive()...")
+    G = random_dag(n, m, seed=3)
+
+    start = time.time()
+    nodes, rows = transitive_closure_rows(G)
+    elapsed = time.time() - start
+    print("bitset closure: %.3fs, %d closure edges, %d bytes of rows" %
+          (elapsed, sum(bin(r).count('1') for r in rows),
+           sum((r.bit_length() + 7) // 8 for r in rows)))
+
+    start = time.time()
+    ok = all(set(_bits(rows[x])) == set(bfs(G, x)) - {x} for x in range(checked))
+    elapsed = time.time() - start
+    print("bfs from every node (estimated): %.3fs, same answer? %s" %
+          (elapsed * n / checked, ok))
+
+    start = time.time()
+    reduced = transitive_reduction(G)
+    print("reduction: %.3fs, %d -> %d edges" %
+          (time.time() - start, sum(map(len, G)), sum(map(len, reduced))))
+    start = time.time()
+    print("chunked reduction (chunk=500) same? %s (%.3fs)" %
+          (transitive_reduction(G, chunk=500) == reduced, time.time() - start))
+
+def main():
+    test_transitive()
+    bench_transitive()
+
+if __name__ == "__main__":
+    main()
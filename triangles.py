@@ -0,0 +1,244 @@
+'''
+Triangle counting + clustering coefficients on an UNDIRECTED graph (directed
+graphs are taken as undirected, self-loops ignored).
+
+    t[x]   = number of triangles x is in
+    total  = number of triangles in the graph (each counted once)
+    cc[x]  = local clustering coefficient = t[x] / (d(d-1)/2), d = degree of x,
+             i.e. the fraction of pairs of x's neighbours that are linked.
+             0 when d < 2.
+
+The obvious way, len(nbrs[x] & nbrs[y]) for every edge x - y, does huge
+intersections at hubs: a node with 10k neighbours gets intersected 10k
+times with 10k-sized sets.
+
+Fix = ORIENT every edge from the lower to the higher ranked end, rank =
+(degree, id). Every triangle is then found exactly once, from its lowest
+ranked corner u: u -> v, u -> w, v -> w. And nobody has more than sqrt(2m)
+out-edges (a node with k out-edges points at k nodes of at least its degree,
+so k*k <= 2m), hubs included. O(m^1.5) total.
+
+For each u, the out-lists of u and of every v in out(u) are intersected,
+2 ways:
+    * 'bitmap': mark out(u) in a bytearray, then the common nodes of out(v)
+      are compress(out(v), map(mark.__getitem__, out(v))), no python loop
+      per element. default.
+    * 'merge': out-lists are SORTED arrays, walk both with 2 pointers.
+
+workers > 1 splits u into node ranges of about equal WORK (sum of the
+out-degrees of u's out-neighbours) and counts each range in its own process,
+reading the oriented CSR from shared memory (csr.share_arrays()).
+
+    >>> nodes, total, t, cc = triangles(G)
+'''
+
+import time
+from array import array
+from itertools import compress
+from random import Random
+
+from graphs import *
+from csr import to_csr, share_arrays, attach_arrays, release_arrays
+from process_pool import run_in_processes
+
+
+def orient(G):
+    '''
+    Undirected simple version of G, oriented low -> high (degree, id).
+
+    @rtype: tuple
+    @return: (nodes, degree, offsets, targets): out-lists sorted by id.
+    '''
+    nodes, index, offsets, targets = to_csr(G)
+    n = len(nodes)
+    nbrs = [set() for x in range(n)]
+    for x in range(n):
+        for y in targets[offsets[x]:offsets[x+1]]:
+            if x != y:
+                nbrs[x].add(y)
+                nbrs[y].add(x)
+    degree = array('l', map(len, nbrs))
+    out_offsets = array('l', [0])
+    out_targets = array('l')
+    for x in range(n):
+        rx = (degree[x], x)
+        out_targets.extend(sorted(y for y in nbrs[x] if (degree[y], y) > rx))
+        out_offsets.append(len(out_targets))
+    return nodes, degree, out_offsets, out_targets
+
+def _count_range(offsets, targets, lo, hi, mode='bitmap'):
+    '''
+    Triangles whose lowest corner is in range(lo, hi).
+
+    @rtype: tuple
+    @return: (total, t): t[x] = those triangles x is in (any corner).
+    '''
+    n = len(offsets) - 1
+    t = array('l', [0]) * n
+    total = 0
+    mark = bytearray(n)
+    for u in range(lo, hi):
+        a, b = offsets[u], offsets[u+1]
+        if b - a < 2:   continue
+        out_u = targets[a:b]
+        if mode == 'bitmap':
+            for w in out_u:     mark[w] = 1
+        for v in out_u:
+            out_v = targets[offsets[v]:offsets[v+1]]
+            if not len(out_v):  continue
+            if mode == 'bitmap':
+                common = list(compress(out_v, map(mark.__getitem__, out_v)))
+            else:
+                common = _merge(out_u, out_v)
+            if common:
+                c = len(common)
+                total += c
+                t[u] += c
+                t[v] += c
+                for w in common:    t[w] += 1
+        if mode == 'bitmap':
+            for w in out_u:     mark[w] = 0
+    return total, t
+
+def _merge(xs, ys):
+    '''common elements of 2 sorted sequences.'''
+    i, j = 0, 0
+    common = []
+    while i < len(xs) and j < len(ys):
+        if xs[i] < ys[j]:       i += 1
+        elif xs[i] > ys[j]:     j += 1
+        else:
+            common.append(xs[i])
+            i += 1
+            j += 1
+    return common
+
+def _count_task(task):
+    '''worker side: count one node range on the shared oriented CSR.'''
+    handles, lo, hi, mode = task
+    blocks, views = attach_arrays(handles)
+    try:
+        return _count_range(*views, lo, hi, mode)
+    finally:
+        release_arrays(blocks, views)
+
+def work_ranges(offsets, targets, parts):
+    '''
+    Split range(n) into at most parts ranges of about equal work, work of u
+    = sum of out-degrees of its out-neighbours (what _count_range scans).
+    '''
+    n = len(offsets) - 1
+    outdeg = [offsets[x+1] - offsets[x] for x in range(n)]
+    cost = [sum(map(outdeg.__getitem__, targets[offsets[u]:offsets[u+1]])) + 1
+            for u in range(n)]
+    share = sum(cost) / parts
+    ranges = []
+    lo, acc = 0, 0
+    for u in range(n):
+        acc += cost[u]
+        if acc >= share * (len(ranges) + 1) and len(ranges) < parts - 1:
+            ranges.append((lo, u + 1))
+            lo = u + 1
+    if lo < n:  ranges.append((lo, n))
+    return ranges
+
+def triangles(G, mode='bitmap', workers=1):
+    '''
+    @type G: list of sets, list of lists, dict of sets
+    @param G: undirected graph (directed ones are taken as undirected).
+
+    @type mode: string
+    @param mode: 'bitmap' or 'merge', how out-lists are intersected.
+
+    @type workers: int
+    @param workers: > 1 counts node ranges in that many processes.
+
+    @rtype: tuple
+    @return: (nodes, total, t, cc): t[i], cc[i] are triangles and local
+             clustering coefficient of nodes[i].
+    '''
+    if mode not in ('bitmap', 'merge'):
+        raise ValueError("mode must be 'bitmap' or 'merge', not %r" % mode)
+    nodes, degree, offsets, targets = orient(G)
+    n = len(nodes)
+    if workers > 1 and n:
+        blocks, handles = share_arrays(offsets, targets)
+        try:
+            tasks = [(handles, lo, hi, mode) for lo, hi in
+                     work_ranges(offsets, targets, 4 * workers)]
+            parts = run_in_processes(_count_task, tasks, workers)
+        finally:
+            release_arrays(blocks, unlink=True)
+        total = sum(part[0] for part in parts)
+        t = array('l', map(sum, zip(*[part[1] for part in parts])))
+    else:
+        total, t = _count_range(offsets, targets, 0, n, mode)
+    cc = array('d', [2.0 * tx / (d * (d - 1)) if d > 1 else 0.0
+                     for tx, d in zip(t, degree)])
+    return nodes, total, t, cc
+
+def average_clustering(cc):
+    return sum(cc) / len(cc) if len(cc) else 0.0
+
+
+
+def triangles_sets(G):
+    '''the slow way: nested set intersection on every edge, to check against.'''
+    nodes, index, offsets, targets = to_csr(G)
+    nbrs = [set() for x in nodes]
+    for x in range(len(nodes)):
+        for y in targets[offsets[x]:offsets[x+1]]:
+            if x != y:
+                nbrs[x].add(y)
+                nbrs[y].add(x)
+    t = [sum(len(nbrs[x] & nbrs[y]) for y in nbrs[x]) // 2 for x in range(len(nodes))]
+    return sum(t) // 3, t
+
+def hub_graph(n, m, hubs, hub_degree, seed=None):
+    '''random undirected graph plus a few hubs linked to hub_degree nodes each.'''
+    rng = Random(seed)
+    G = [set() for x in range(n)]
+    def link(u, v):
+        if u != v:
+            G[u].add(v)
+            G[v].add(u)
+    for i in range(m):
+        link(rng.randrange(n), rng.randrange(n))
+    for h in range(hubs):
+        for v in rng.sample(range(n), hub_degree):
+            link(h, v)
+    return G
+
+def test_triangles():
+    print("\nrunning test_triangles()...")
+    bowtie = {'a': {'b', 'c'}, 'b': {'a', 'c'}, 'c': {'a', 'b', 'd', 'e'},
+              'd': {'c', 'e'}, 'e': {'c', 'd'}}
+    nodes, total, t, cc = triangles(bowtie)
+    print("bowtie: %d triangles" % total, dict(zip(nodes, t)),
+          {x: round(c, 3) for x, c in zip(nodes, cc)})
+    G = hub_graph(300, 1500, 3, 100, seed=17)
+    expected = triangles_sets(G)
+    for mode, workers in (('bitmap', 1), ('merge', 1), ('bitmap', 2)):
+        nodes, total, t, cc = triangles(G, mode, workers)
+        print("%-6s workers=%d: %d triangles, same as sets? %s" %
+              (mode, workers, total, (total, list(t)) == expected))
+
+def bench_triangles(n=20000, m=100000, hubs=20, hub_degree=8000):
+    print("\nrunning bench_triangles()...")
+    G = hub_graph(n, m, hubs, hub_degree, seed=18)
+    start = time.time()
+    expected = triangles_sets(G)
+    print("nested set intersection: %.2fs, %d triangles" % (time.time() - start, expected[0]))
+    for mode, workers in (('bitmap', 1), ('merge', 1), ('bitmap', 4)):
+        start = time.time()
+        nodes, total, t, cc = triangles(G, mode, workers)
+        print("%-6s workers=%d: %.2fs, same? %s, average clustering %.4f" %
+              (mode, workers, time.time() - start, (total, list(t)) == expected,
+               average_clustering(cc)))
+
+def main():
+    test_triangles()
+    bench_triangles()
+
+if __name__ == "__main__":
+    main()